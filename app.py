@@ -1,11 +1,17 @@
+import os
 import streamlit as st
 import numpy as np
-import pandas as pd
-import pickle
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.patches import FancyArrowPatch
-from sklearn.tree import plot_tree, export_text, _tree
+import core
+from core import FEATURE_NAMES, FEATURE_LABELS, CLASS_NAMES, risk_color, risk_label
+from reports import patient_report
+from sensitivity import sweep
+from tree_view import path_nodes, tree_payload, tree_view
+import metrics
+from resources import (load_audit_log, load_counterfactual_engine, load_drift_monitor,
+                       load_leaf_index, load_model_registry, load_prediction_cache,
+                       load_render_cache, load_risk_rules, risk_rules_stamp, start_metrics_server)
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from rerun_memo import figure_png, fit_width, session_memo, show_image
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -19,6 +25,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Section outputs are memoized per session on their inputs; see rerun_memo.
+memo = session_memo()
+memo.start_run()
+memo.section("Page setup")
+
 # ─────────────────────────────────────────────────────────────────
 # CUSTOM CSS  — dark clinical aesthetic
 # ─────────────────────────────────────────────────────────────────
@@ -194,72 +205,36 @@ h3 { font-family: 'DM Sans', sans-serif !important; color: #8ab4d4 !important; f
 # ─────────────────────────────────────────────────────────────────
 # LOAD MODEL
 # ─────────────────────────────────────────────────────────────────
-@st.cache_resource
-def load_model():
-    with open("heart_disease_model.pkl", "rb") as f:
-        return pickle.load(f)
-
+memo.section("Model + resources")
 try:
-    model = load_model()
+    registry = load_model_registry()
 except FileNotFoundError:
-    st.error("❌  `heart_disease_model.pkl` not found.  Place it in the same folder as `app.py`.")
+    st.error(f"❌  `{os.path.basename(core.MODEL_PATH)}` not found.  Place it in the same folder as `app.py`.")
+    st.stop()
+except ValueError as e:
+    st.error(f"❌  Model rejected: {e}")
     st.stop()
 
-FEATURE_NAMES = ['age','sex','cp','trestbps','chol','fbs','restecg',
-                 'thalach','exang','oldpeak','slope','ca','thal']
-FEATURE_LABELS = ['Age','Sex','Chest Pain Type','Resting BP','Cholesterol',
-                  'Fasting Blood Sugar','Rest ECG','Max Heart Rate',
-                  'Exercise Angina','ST Depression','ST Slope',
-                  'Major Vessels','Thalassemia']
-CLASS_NAMES = ['No Disease', 'Heart Disease']
-
-
-# ─────────────────────────────────────────────────────────────────
-# HELPERS
-# ─────────────────────────────────────────────────────────────────
-def get_decision_path(model, input_array):
-    tree_    = model.tree_
-    feat_idx = model.tree_.feature
-    node     = 0
-    path     = []
-    while tree_.feature[node] != _tree.TREE_UNDEFINED:
-        fidx      = feat_idx[node]
-        fname     = FEATURE_LABELS[fidx]
-        thr       = tree_.threshold[node]
-        val       = input_array[0, fidx]
-        if val <= thr:
-            direction = "LEFT  ≤"
-            node = tree_.children_left[node]
-            side = "left"
-        else:
-            direction = "RIGHT >"
-            node = tree_.children_right[node]
-            side = "right"
-        path.append({"feature": fname, "value": val, "threshold": thr,
-                     "direction": direction, "side": side})
-    vals     = tree_.value[node][0]
-    cls_idx  = int(np.argmax(vals))
-    conf     = vals[cls_idx] / vals.sum() * 100
-    path.append({"leaf": True, "class": CLASS_NAMES[cls_idx], "confidence": conf,
-                 "samples": int(vals.sum()), "cls_idx": cls_idx})
-    return path
-
-
-def risk_color(prob):
-    if prob < 0.30: return "#2ecc71"
-    if prob < 0.55: return "#f39c12"
-    return "#e74c3c"
-
+# One version for the whole rerun, even if a retrain is swapped in meanwhile.
+active       = registry.current()
+model, tree  = active.model, active.tree
+lookup_table = active.table
 
-def risk_label(prob):
-    if prob < 0.30: return "LOW RISK"
-    if prob < 0.55: return "MODERATE RISK"
-    return "HIGH RISK"
+start_metrics_server()
+render_cache     = load_render_cache(tree.fingerprint(), model)
+prediction_cache = load_prediction_cache()
+leaf_index       = load_leaf_index(tree.fingerprint(), tree)
+cf_engine        = load_counterfactual_engine(tree.fingerprint(), leaf_index)
+drift_monitor    = load_drift_monitor(tree.fingerprint(), tree)
+audit_log        = load_audit_log()
+rules_stamp      = risk_rules_stamp()
+risk_rules       = load_risk_rules(rules_stamp)
 
 
 # ─────────────────────────────────────────────────────────────────
 # SIDEBAR  — Patient Input
 # ─────────────────────────────────────────────────────────────────
+memo.section("Sidebar")
 with st.sidebar:
     st.markdown("""
     <div style='text-align:center; padding: 1rem 0 1.5rem 0;'>
@@ -325,18 +300,30 @@ st.markdown("""
 <hr style='border:none; border-top:1px solid #1e2d4a; margin:1rem 0 1.5rem 0;'>
 """, unsafe_allow_html=True)
 
-# ── Build input array ─────────────────────────────────────────────
+# ── Build input vector ────────────────────────────────────────────
+memo.section("Prediction")
 input_values = [age, sex_val, cp_val, trestbps, chol, fbs_v,
                 ecg_v, thalach, exang_v, oldpeak, slope_v, ca, thal_v]
-input_array  = np.array([input_values])
-input_df     = pd.DataFrame([input_values], columns=FEATURE_NAMES)
+model_key    = tree.fingerprint()
+patient_key  = (model_key, tuple(input_values))
 
-# ── Always show live prediction ───────────────────────────────────
-pred      = model.predict(input_array)[0]
-prob      = model.predict_proba(input_array)[0]
+# ── Always show live prediction (cached across sessions) ─────────
+result    = prediction_cache.lookup(tree, input_values, lookup_table)
+pred      = result["pred"]
+prob      = result["proba"]
 disease_p = prob[1]
 no_dis_p  = prob[0]
-path      = get_decision_path(model, input_array)
+path      = result["path"]
+# Counted once per patient per session, not on every widget rerun.
+memo.get("drift", patient_key,
+         lambda: drift_monitor.update(input_values, pred, result["leaf"]))
+if audit_log is not None:
+    ctx        = get_script_run_ctx()
+    session_id = ctx.session_id if ctx is not None else None
+    # One audit row per patient shown in this session; written off the rerun.
+    memo.get("audit", patient_key,
+             lambda: audit_log.record(input_values, pred, disease_p, result["leaf"],
+                                      active.version, session=session_id))
 
 # ── Result Banner ─────────────────────────────────────────────────
 if pred == 1:
@@ -380,7 +367,7 @@ with col2:
 with col3:
     st.markdown(f"""
     <div class='metric-box'>
-        <div class='metric-value' style='color:#8ab4d4;'>{model.get_depth()}</div>
+        <div class='metric-value' style='color:#8ab4d4;'>{tree.meta['max_depth']}</div>
         <div class='metric-label'>Tree Depth</div>
     </div>""", unsafe_allow_html=True)
 with col4:
@@ -395,16 +382,18 @@ st.markdown("<br>", unsafe_allow_html=True)
 # ─────────────────────────────────────────────────────────────────
 # TABS
 # ─────────────────────────────────────────────────────────────────
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "📜  Decision Path",
     "🌳  Tree Visualization",
     "📊  Feature Importance",
-    "🧾  Patient Summary"
+    "🧾  Patient Summary",
+    "🎚️  What-If"
 ])
 
 
 # ── TAB 1: Decision Path ──────────────────────────────────────────
 with tab1:
+    memo.section("Decision Path")
     st.markdown("### How this prediction was made")
     st.markdown("""
     <p style='color:#8ab4d4; font-size:0.9rem;'>
@@ -413,38 +402,86 @@ with tab1:
     </p>
     """, unsafe_allow_html=True)
 
-    for i, step in enumerate(path):
-        if step.get("leaf"):
-            leaf_cls = "rule-leaf-danger" if step["cls_idx"] == 1 else "rule-leaf-safe"
-            st.markdown(f"""
-            <div class='rule-step {leaf_cls}'>
-                🏁 &nbsp; <strong>FINAL LEAF</strong> &nbsp;→&nbsp;
-                <strong>{step['class']}</strong>
-                &nbsp;&nbsp;|&nbsp;&nbsp; Confidence: {step['confidence']:.1f}%
-                &nbsp;&nbsp;|&nbsp;&nbsp; Samples in node: {step['samples']}
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            side_css = "rule-step-left" if step["side"] == "left" else "rule-step-right"
-            arrow    = "←" if step["side"] == "left" else "→"
-            st.markdown(f"""
-            <div class='rule-step {side_css}'>
-                <span style='color:#8ab4d4;'>Step {i+1}</span>
-                &nbsp;&nbsp;
-                <strong style='color:#fff;'>{step['feature']}</strong>
-                &nbsp;=&nbsp; <span style='color:#f1c40f;'>{step['value']:.1f}</span>
-                &nbsp;&nbsp;
-                <span style='color:#555;'>threshold: {step['threshold']:.2f}</span>
-                &nbsp;&nbsp;
-                <span style='color:#aaa;'>{arrow} Go {step['direction']}</span>
-            </div>
-            """, unsafe_allow_html=True)
+    def path_blocks():
+        blocks = []
+        for i, step in enumerate(path):
+            if step.get("leaf"):
+                leaf_cls = "rule-leaf-danger" if step["cls_idx"] == 1 else "rule-leaf-safe"
+                blocks.append(f"""
+                <div class='rule-step {leaf_cls}'>
+                    🏁 &nbsp; <strong>FINAL LEAF</strong> &nbsp;→&nbsp;
+                    <strong>{step['class']}</strong>
+                    &nbsp;&nbsp;|&nbsp;&nbsp; Confidence: {step['confidence']:.1f}%
+                    &nbsp;&nbsp;|&nbsp;&nbsp; Samples in node: {step['samples']}
+                </div>
+                """)
+            else:
+                side_css = "rule-step-left" if step["side"] == "left" else "rule-step-right"
+                arrow    = "←" if step["side"] == "left" else "→"
+                blocks.append(f"""
+                <div class='rule-step {side_css}'>
+                    <span style='color:#8ab4d4;'>Step {i+1}</span>
+                    &nbsp;&nbsp;
+                    <strong style='color:#fff;'>{step['feature']}</strong>
+                    &nbsp;=&nbsp; <span style='color:#f1c40f;'>{step['value']:.1f}</span>
+                    &nbsp;&nbsp;
+                    <span style='color:#555;'>threshold: {step['threshold']:.2f}</span>
+                    &nbsp;&nbsp;
+                    <span style='color:#aaa;'>{arrow} Go {step['direction']}</span>
+                </div>
+                """)
+        return blocks
+
+    for block in memo.get("path_blocks", patient_key, path_blocks):
+        st.markdown(block, unsafe_allow_html=True)
+
+    # Full leaf region: the tightest bound on each feature along the path
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("**Leaf Region**")
+    st.markdown("""
+    <p style='color:#8ab4d4; font-size:0.85rem;'>
+    Every patient inside this box lands in the same leaf.
+    Features not listed can take any value.
+    </p>
+    """, unsafe_allow_html=True)
+    leaf_css = "rule-leaf-danger" if pred == 1 else "rule-leaf-safe"
+    for bound in memo.get("leaf_region", (model_key, result["leaf"]),
+                          lambda: leaf_index.describe(result["leaf"])):
+        st.markdown(f"""
+        <div class='rule-step {leaf_css}'>▣ &nbsp; {bound}</div>
+        """, unsafe_allow_html=True)
+
+    # Counterfactuals: nearest opposite-class leaves, age and sex held fixed
+    st.markdown("<br>", unsafe_allow_html=True)
+    other_cls = CLASS_NAMES[1 - int(pred)]
+    st.markdown(f"**Smallest Changes to Reach “{other_cls}”**")
+    counterfactuals = memo.get("counterfactuals", patient_key,
+                               lambda: cf_engine.search(input_values, k=3))
+    if not counterfactuals:
+        st.markdown("""
+        <p style='color:#8ab4d4; font-size:0.85rem;'>
+        No reachable leaf of the other class without changing age or sex.
+        </p>
+        """, unsafe_allow_html=True)
+    for rank, cf in enumerate(counterfactuals, 1):
+        cf_css  = "rule-leaf-danger" if other_cls == CLASS_NAMES[1] else "rule-leaf-safe"
+        changes = " &nbsp;·&nbsp; ".join(
+            f"<strong style='color:#fff;'>{lbl}</strong> {old:g} → "
+            f"<span style='color:#f1c40f;'>{new:g}</span>"
+            for lbl, old, new in cf["changes"])
+        st.markdown(f"""
+        <div class='rule-step {cf_css}'>
+            <span style='color:#8ab4d4;'>#{rank}</span> &nbsp; {changes}
+            &nbsp;&nbsp;|&nbsp;&nbsp; {other_cls} p = {cf['proba'][1 - int(pred)]*100:.1f}%
+        </div>
+        """, unsafe_allow_html=True)
 
     # Probability bar
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("**Probability Breakdown**")
     c1, c2 = st.columns(2)
-    with c1:
+    def draw_probability_bar():
+        import matplotlib.pyplot as plt   # deferred: not needed for first paint
         fig, ax = plt.subplots(figsize=(5, 2.5))
         fig.patch.set_facecolor('#111827')
         ax.set_facecolor('#111827')
@@ -464,12 +501,15 @@ with tab1:
             spine.set_edgecolor('#1e2d4a')
         ax.grid(axis='x', color='#1e2d4a', alpha=0.5)
         plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
+        return figure_png(fig)
+
+    with c1:
+        show_image(memo.get("probability_bar", tuple(prob.tolist()), draw_probability_bar))
 
 
 # ── TAB 2: Tree Visualization ─────────────────────────────────────
 with tab2:
+    memo.section("Tree Visualization")
     st.markdown("### Decision Tree Structure")
     st.markdown("""
     <p style='color:#8ab4d4; font-size:0.9rem;'>
@@ -482,37 +522,35 @@ with tab2:
     depth_choice = st.radio("Display depth", [3, 4, 5, "Full"], horizontal=True, index=0)
     show_depth   = None if depth_choice == "Full" else int(depth_choice)
 
-    fig, ax = plt.subplots(figsize=(22, 10))
-    fig.patch.set_facecolor('#0a0e1a')
-    ax.set_facecolor('#0a0e1a')
-    plot_tree(
-        model,
-        feature_names = FEATURE_LABELS,
-        class_names   = CLASS_NAMES,
-        filled        = True,
-        rounded       = True,
-        fontsize      = 8,
-        max_depth     = show_depth,
-        ax            = ax
-    )
-    ax.set_title(
-        f"Heart Disease Decision Tree  (depth shown: {show_depth or 'full'})",
-        color='#c8d8f0', fontsize=13,
-        fontfamily='serif', pad=12
-    )
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+    # The tree goes to the browser once as JSON; a new patient only moves the highlight.
+    tree_view(memo.get("tree_json", model_key, lambda: tree_payload(tree)),
+              path=path_nodes(path), depth=show_depth)
+    st.caption("Click a node to fold it · drag to pan · scroll to zoom · "
+               "the yellow path is this patient's")
+
+    if model is None:
+        st.info("The static drawing and text rules need the scikit-learn pickle; "
+                "this session was loaded from a `.hdt` artifact.")
+    else:
+        with st.expander("🖼️  Static image (matplotlib)"):
+            show_image(memo.get("tree_image", (model_key, show_depth),
+                                lambda: fit_width(render_cache.tree_image(model, model_key,
+                                                                          show_depth))))
 
-    st.markdown("<br>", unsafe_allow_html=True)
-    with st.expander("📄  View Raw Text Rules"):
-        rules = export_text(model, feature_names=FEATURE_LABELS,
-                            max_depth=6, spacing=3, show_weights=True)
-        st.code(rules, language="text")
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        def text_rules():
+            from sklearn.tree import export_text
+            return export_text(model, feature_names=FEATURE_LABELS,
+                               max_depth=6, spacing=3, show_weights=True)
+
+        with st.expander("📄  View Raw Text Rules"):
+            st.code(memo.get("text_rules", model_key, text_rules), language="text")
 
 
 # ── TAB 3: Feature Importance ─────────────────────────────────────
 with tab3:
+    memo.section("Feature Importance")
     st.markdown("### Feature Importance Analysis")
     st.markdown("""
     <p style='color:#8ab4d4; font-size:0.9rem;'>
@@ -521,52 +559,64 @@ with tab3:
     </p>
     """, unsafe_allow_html=True)
 
-    importances = model.feature_importances_
-    fi_df = pd.DataFrame({
-        'Feature':    FEATURE_LABELS,
-        'Importance': importances,
-        'Pct':        importances * 100
-    }).sort_values('Importance', ascending=True)
-
-    top5_min = fi_df['Importance'].nlargest(5).min()
-    bar_colors = ['#e74c3c' if v >= top5_min else '#2c4a6e'
-                  for v in fi_df['Importance']]
-
-    fig, ax = plt.subplots(figsize=(10, 7))
-    fig.patch.set_facecolor('#111827')
-    ax.set_facecolor('#111827')
-
-    bars = ax.barh(fi_df['Feature'], fi_df['Pct'],
-                   color=bar_colors, edgecolor='none', height=0.65)
-    for bar, val in zip(bars, fi_df['Pct']):
-        if val > 0.3:
-            ax.text(val + 0.3, bar.get_y() + bar.get_height()/2,
-                    f'{val:.2f}%', va='center', color='#c8d8f0',
-                    fontsize=8.5, fontfamily='monospace')
-
-    ax.set_xlabel('Importance (%)', color='#8ab4d4', fontsize=10)
-    ax.tick_params(colors='#8ab4d4', labelsize=9)
-    ax.set_xlim(0, fi_df['Pct'].max() * 1.25)
-    for spine in ax.spines.values():
-        spine.set_edgecolor('#1e2d4a')
-    ax.grid(axis='x', color='#1e2d4a', alpha=0.6)
-
-    red_p  = mpatches.Patch(color='#e74c3c', label='Top 5 Features')
-    blue_p = mpatches.Patch(color='#2c4a6e', label='Other Features')
-    ax.legend(handles=[red_p, blue_p], facecolor='#111827',
-              edgecolor='#1e2d4a', labelcolor='#8ab4d4', fontsize=9)
-
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close()
+    def importance_table():
+        import pandas as pd
+        importances = np.asarray(tree.meta['feature_importances'])
+        return pd.DataFrame({
+            'Feature':    FEATURE_LABELS,
+            'Importance': importances,
+            'Pct':        importances * 100
+        }).sort_values('Importance', ascending=True)
+
+    fi_df = memo.get("importance_table", model_key, importance_table)
+
+    def draw_importance():
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
+
+        top5_min = fi_df['Importance'].nlargest(5).min()
+        bar_colors = ['#e74c3c' if v >= top5_min else '#2c4a6e'
+                      for v in fi_df['Importance']]
+
+        fig, ax = plt.subplots(figsize=(10, 7))
+        fig.patch.set_facecolor('#111827')
+        ax.set_facecolor('#111827')
+
+        bars = ax.barh(fi_df['Feature'], fi_df['Pct'],
+                       color=bar_colors, edgecolor='none', height=0.65)
+        for bar, val in zip(bars, fi_df['Pct']):
+            if val > 0.3:
+                ax.text(val + 0.3, bar.get_y() + bar.get_height()/2,
+                        f'{val:.2f}%', va='center', color='#c8d8f0',
+                        fontsize=8.5, fontfamily='monospace')
+
+        ax.set_xlabel('Importance (%)', color='#8ab4d4', fontsize=10)
+        ax.tick_params(colors='#8ab4d4', labelsize=9)
+        ax.set_xlim(0, fi_df['Pct'].max() * 1.25)
+        for spine in ax.spines.values():
+            spine.set_edgecolor('#1e2d4a')
+        ax.grid(axis='x', color='#1e2d4a', alpha=0.6)
+
+        red_p  = mpatches.Patch(color='#e74c3c', label='Top 5 Features')
+        blue_p = mpatches.Patch(color='#2c4a6e', label='Other Features')
+        ax.legend(handles=[red_p, blue_p], facecolor='#111827',
+                  edgecolor='#1e2d4a', labelcolor='#8ab4d4', fontsize=9)
+
+        plt.tight_layout()
+        return figure_png(fig)
+
+    show_image(memo.get("importance_chart", model_key, draw_importance))
 
     # Top 5 table
+    def top5_table():
+        top5 = fi_df.sort_values('Importance', ascending=False).head(5).reset_index(drop=True)
+        top5.index += 1
+        top5['Importance (%)'] = top5['Pct'].apply(lambda x: f"{x:.3f}%")
+        return top5[['Feature','Importance (%)']]
+
     st.markdown("<br>", unsafe_allow_html=True)
-    top5 = fi_df.sort_values('Importance', ascending=False).head(5).reset_index(drop=True)
-    top5.index += 1
-    top5['Importance (%)'] = top5['Pct'].apply(lambda x: f"{x:.3f}%")
     st.dataframe(
-        top5[['Feature','Importance (%)']],
+        memo.get("top5_table", model_key, top5_table),
         use_container_width=True
     )
 
@@ -574,44 +624,50 @@ with tab3:
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("**This Patient's Feature Values vs Feature Importance**")
 
-    fig2, ax2 = plt.subplots(figsize=(10, 7))
-    fig2.patch.set_facecolor('#111827')
-    ax2.set_facecolor('#111827')
-
-    sorted_labels = fi_df['Feature'].tolist()
-    sorted_imps   = fi_df['Importance'].tolist()
-
-    # normalize patient values for overlay
-    patient_vals_ordered = []
-    for lbl in sorted_labels:
-        idx = FEATURE_LABELS.index(lbl)
-        patient_vals_ordered.append(input_values[idx])
-
-    ax2.barh(sorted_labels, [i*100 for i in sorted_imps],
-             color='#2c4a6e', edgecolor='none', height=0.65, label='Importance %')
-
-    # Normalised patient value dots
-    max_imp = max(sorted_imps) * 100
-    for i, (lbl, pv) in enumerate(zip(sorted_labels, patient_vals_ordered)):
-        norm_pv = min(pv / 300 * max_imp, max_imp)
-        ax2.plot(norm_pv, i, 'o', color='#f39c12', markersize=7, zorder=5)
-
-    ax2.set_xlabel('Importance (%)', color='#8ab4d4', fontsize=10)
-    ax2.tick_params(colors='#8ab4d4', labelsize=9)
-    for spine in ax2.spines.values():
-        spine.set_edgecolor('#1e2d4a')
-    ax2.grid(axis='x', color='#1e2d4a', alpha=0.6)
-    imp_patch = mpatches.Patch(color='#2c4a6e', label='Feature Importance')
-    dot_patch = mpatches.Patch(color='#f39c12', label='Patient Value (scaled)')
-    ax2.legend(handles=[imp_patch, dot_patch], facecolor='#111827',
-               edgecolor='#1e2d4a', labelcolor='#8ab4d4', fontsize=9)
-    plt.tight_layout()
-    st.pyplot(fig2)
-    plt.close()
+    def draw_patient_importance():
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
+
+        fig2, ax2 = plt.subplots(figsize=(10, 7))
+        fig2.patch.set_facecolor('#111827')
+        ax2.set_facecolor('#111827')
+
+        sorted_labels = fi_df['Feature'].tolist()
+        sorted_imps   = fi_df['Importance'].tolist()
+
+        # normalize patient values for overlay
+        patient_vals_ordered = []
+        for lbl in sorted_labels:
+            idx = FEATURE_LABELS.index(lbl)
+            patient_vals_ordered.append(input_values[idx])
+
+        ax2.barh(sorted_labels, [i*100 for i in sorted_imps],
+                 color='#2c4a6e', edgecolor='none', height=0.65, label='Importance %')
+
+        # Normalised patient value dots
+        max_imp = max(sorted_imps) * 100
+        for i, (lbl, pv) in enumerate(zip(sorted_labels, patient_vals_ordered)):
+            norm_pv = min(pv / 300 * max_imp, max_imp)
+            ax2.plot(norm_pv, i, 'o', color='#f39c12', markersize=7, zorder=5)
+
+        ax2.set_xlabel('Importance (%)', color='#8ab4d4', fontsize=10)
+        ax2.tick_params(colors='#8ab4d4', labelsize=9)
+        for spine in ax2.spines.values():
+            spine.set_edgecolor('#1e2d4a')
+        ax2.grid(axis='x', color='#1e2d4a', alpha=0.6)
+        imp_patch = mpatches.Patch(color='#2c4a6e', label='Feature Importance')
+        dot_patch = mpatches.Patch(color='#f39c12', label='Patient Value (scaled)')
+        ax2.legend(handles=[imp_patch, dot_patch], facecolor='#111827',
+                   edgecolor='#1e2d4a', labelcolor='#8ab4d4', fontsize=9)
+        plt.tight_layout()
+        return figure_png(fig2)
+
+    show_image(memo.get("patient_importance_chart", patient_key, draw_patient_importance))
 
 
 # ── TAB 4: Patient Summary ────────────────────────────────────────
 with tab4:
+    memo.section("Patient Summary")
     st.markdown("### Patient Clinical Summary")
 
     data_display = {
@@ -630,17 +686,18 @@ with tab4:
         "Thalassemia":          thal
     }
 
-    # Risk flags
-    flags = []
-    if age > 55:     flags.append(("Age > 55", "#e74c3c"))
-    if sex_val == 1: flags.append(("Male Sex", "#f39c12"))
-    if cp_val == 0:  flags.append(("Typical Angina", "#e74c3c"))
-    if trestbps > 140: flags.append(("High Resting BP", "#f39c12"))
-    if chol > 240:   flags.append(("High Cholesterol", "#f39c12"))
-    if exang_v == 1: flags.append(("Exercise Angina", "#e74c3c"))
-    if oldpeak > 1.5: flags.append(("High ST Depression", "#e74c3c"))
-    if ca > 0:       flags.append(("Vessels Affected", "#e74c3c"))
-    if thal_v == 3:  flags.append(("Reversible Thal Defect", "#e74c3c"))
+    # Risk flags: the rule file batch scoring and reports use too.
+    def flag_blocks():
+        flags = risk_rules.flags(input_values)
+        return [f"""
+                <div style='background:#111827; border:1px solid {fc}33;
+                            border-left:3px solid {fc}; border-radius:6px;
+                            padding:0.4rem 0.8rem; margin:0.3rem 0;
+                            font-family:"DM Mono",monospace; font-size:0.78rem;
+                            color:{fc};'>
+                    ⚠ {flag}
+                </div>
+                """ for flag, fc in flags]
 
     c1, c2 = st.columns([3, 2])
 
@@ -661,17 +718,10 @@ with tab4:
 
     with c2:
         st.markdown("**Risk Flags**")
+        flags = memo.get("risk_flags", (patient_key, rules_stamp), flag_blocks)
         if flags:
-            for flag, fc in flags:
-                st.markdown(f"""
-                <div style='background:#111827; border:1px solid {fc}33;
-                            border-left:3px solid {fc}; border-radius:6px;
-                            padding:0.4rem 0.8rem; margin:0.3rem 0;
-                            font-family:"DM Mono",monospace; font-size:0.78rem;
-                            color:{fc};'>
-                    ⚠ {flag}
-                </div>
-                """, unsafe_allow_html=True)
+            for block in flags:
+                st.markdown(block, unsafe_allow_html=True)
         else:
             st.markdown("""
             <div style='color:#2ecc71; font-family:"DM Mono",monospace;
@@ -698,7 +748,77 @@ with tab4:
         </div>
         """, unsafe_allow_html=True)
 
+        st.markdown("<br>", unsafe_allow_html=True)
+        # Same generator as `python reports.py` uses for whole cohorts.
+        st.download_button("🖨️  Download printable report",
+                           memo.get("report", (patient_key, rules_stamp),
+                                    lambda: patient_report(input_values, pred, prob, path,
+                                                           active.version, risk_rules)),
+                           file_name="heart_report.html", mime="text/html",
+                           use_container_width=True)
+
+# ── TAB 5: What-If Sensitivity ────────────────────────────────────
+with tab5:
+    memo.section("What-If")
+    st.markdown("### What-If Sensitivity")
+    st.markdown("""
+    <p style='color:#8ab4d4; font-size:0.9rem;'>
+    Each panel varies one feature across its full range while the others stay
+    at this patient's values. Dashed lines mark thresholds where the predicted class flips.
+    </p>
+    """, unsafe_allow_html=True)
+
+    def draw_what_if():
+        import time
+        import matplotlib.pyplot as plt
+
+        t0     = time.perf_counter()
+        sweeps = sweep(tree, input_values)
+        sweep_ms = (time.perf_counter() - t0) * 1e3
+
+        fig, axes = plt.subplots(5, 3, figsize=(12, 14))
+        fig.patch.set_facecolor('#111827')
+        for ax, sw in zip(axes.flat, sweeps):
+            ax.set_facecolor('#111827')
+            ax.plot(sw["grid"], sw["disease_p"] * 100, drawstyle='steps-mid',
+                    color='#e74c3c', linewidth=1.6)
+            ax.plot(sw["current"], disease_p * 100, 'o', color='#f39c12', markersize=6, zorder=5)
+            for thr, _, after in sw["flips"]:
+                ax.axvline(thr, color='#e74c3c' if after == 1 else '#2ecc71',
+                           linestyle='--', linewidth=1)
+            ax.set_title(sw["label"], color='#c8d8f0', fontsize=9)
+            ax.set_ylim(-5, 105)
+            ax.tick_params(colors='#8ab4d4', labelsize=7)
+            for spine in ax.spines.values():
+                spine.set_edgecolor('#1e2d4a')
+            ax.grid(color='#1e2d4a', alpha=0.5)
+        for ax in list(axes.flat)[len(sweeps):]:
+            ax.set_visible(False)
+        fig.supylabel('Disease probability (%)', color='#8ab4d4', fontsize=10)
+        plt.tight_layout()
+        return sweeps, sweep_ms, figure_png(fig)
+
+    sweeps, sweep_ms, what_if_png = memo.get("what_if", patient_key, draw_what_if)
+    show_image(what_if_png)
+
+    flips = [(sw["label"], thr, after) for sw in sweeps for thr, _, after in sw["flips"]]
+    if flips:
+        for label, thr, after in flips:
+            fc = "#e74c3c" if after == 1 else "#2ecc71"
+            st.markdown(f"""
+            <div class='rule-step' style='border-left:3px solid {fc};'>
+                <strong style='color:#fff;'>{label}</strong> crossing {thr:.2f}
+                &nbsp;→&nbsp; <span style='color:{fc};'>{CLASS_NAMES[after]}</span>
+            </div>
+            """, unsafe_allow_html=True)
+    else:
+        st.markdown("No single-feature change flips this prediction.")
+    st.caption(f"{len(sweeps)} sweeps · {sum(len(sw['grid']) for sw in sweeps)} rows "
+               f"scored in one batch · {sweep_ms:.1f} ms")
+
+
 # ── Footer ────────────────────────────────────────────────────────
+memo.section("Footer")
 st.markdown("""
 <hr style='border:none; border-top:1px solid #1e2d4a; margin-top:3rem;'>
 <p style='text-align:center; font-family:"DM Mono",monospace; font-size:0.72rem;
@@ -707,3 +827,32 @@ st.markdown("""
     FOR EDUCATIONAL & RESEARCH USE ONLY · NOT FOR CLINICAL DIAGNOSIS
 </p>
 """, unsafe_allow_html=True)
+st.caption(f"Model {active.version} · generation {active.generation} · loaded {active.loaded_at}")
+
+# ── Rerun timing ──────────────────────────────────────────────────
+rerun_ms = memo.finish()
+with st.expander("⏱️  Rerun timing"):
+    st.caption(f"This rerun: {rerun_ms:.0f} ms · last {len(memo.history)} reruns: "
+               + " · ".join(f"{ms:.0f}" for ms in memo.history))
+    st.dataframe([{"Section":    t["section"],
+                   "ms":         round(t["ms"], 1),
+                   "Reused":     ", ".join(t["reused"]),
+                   "Recomputed": ", ".join(t["computed"])} for t in memo.timings],
+                 use_container_width=True, hide_index=True)
+
+# ── Performance panel (hidden; open the app with ?perf=1) ─────────
+if st.query_params.get("perf"):
+    with st.expander("📈  Performance", expanded=True):
+        if not metrics.ENABLED:
+            st.info("Metrics are disabled (HEART_METRICS=0).")
+        rows = metrics.snapshot()
+        st.dataframe([{"Metric":  r["metric"],
+                       "Labels":  ", ".join(f"{k}={v}" for k, v in r["labels"].items()),
+                       "Count":   r["count"],
+                       "p50 ms":  round(r["p50_ms"], 3) if "p50_ms" in r else None,
+                       "p95 ms":  round(r["p95_ms"], 3) if "p95_ms" in r else None,
+                       "p99 ms":  round(r["p99_ms"], 3) if "p99_ms" in r else None}
+                      for r in rows],
+                     use_container_width=True, hide_index=True)
+        st.download_button("Download Prometheus metrics", metrics.prometheus_text(),
+                           file_name="heart_metrics.prom", mime="text/plain")
@@ -0,0 +1,338 @@
+"""
+Append-only prediction audit log in SQLite.
+
+Every prediction is recorded with its 13 inputs, `disease_p`, class, leaf
+id, model version, session / patient id and a timestamp.  `record()` only
+appends a tuple to an in-memory deque; a background writer thread flushes
+the deque in batches, one transaction per batch, so a request never waits
+on disk.  The database runs in WAL mode, so lookups read while the writer
+appends, through indexes on (session, ts), (patient, ts) and ts.
+
+Retention deletes rows older than N days, in chunks; `compact()` then
+checkpoints the WAL and VACUUMs the file.
+
+    python audit_log.py                                  # self-check + throughput
+    python audit_log.py query audit_log.db --session abc --limit 20
+    python audit_log.py compact audit_log.db --days 90
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+import metrics
+from core import FEATURE_NAMES
+
+COLUMNS = ["ts", "session", "patient", "model", "class", "disease_p", "leaf"] + FEATURE_NAMES
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS predictions (
+    id        INTEGER PRIMARY KEY,
+    ts        REAL NOT NULL,
+    session   TEXT,
+    patient   TEXT,
+    model     TEXT NOT NULL,
+    class     INTEGER NOT NULL,
+    disease_p REAL NOT NULL,
+    leaf      INTEGER NOT NULL,
+    {", ".join(f"{name} REAL NOT NULL" for name in FEATURE_NAMES)}
+);
+CREATE INDEX IF NOT EXISTS predictions_session ON predictions (session, ts);
+CREATE INDEX IF NOT EXISTS predictions_patient ON predictions (patient, ts);
+CREATE INDEX IF NOT EXISTS predictions_ts      ON predictions (ts);
+"""
+INSERT = (f"INSERT INTO predictions ({', '.join(COLUMNS)}) "
+          f"VALUES ({', '.join('?' * len(COLUMNS))})")
+
+DAY = 86_400.0
+
+
+def connect(path, timeout=30.0):
+    db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class AuditLog:
+    """Batched, asynchronous writer for the predictions table.
+
+    `record` never blocks; if the writer falls more than `max_queue`
+    rows behind, new rows are dropped and counted (see stats()).
+    """
+
+    def __init__(self, path, batch_size=4096, flush_interval=0.25, max_queue=1_000_000,
+                 retention_days=None):
+        self.path           = path
+        self.batch_size     = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue      = max_queue
+        self.retention_days = retention_days
+        self.written        = 0
+        self.batches        = 0
+        self.dropped        = 0
+        self.deleted        = 0
+        self.flush_ms       = 0.0
+        self.errors         = 0
+        self._pending       = deque()
+        self._inflight      = 0
+        self._lock          = threading.Lock()
+        self._wake          = threading.Event()
+        self._stop          = threading.Event()
+        self._flushed       = threading.Condition()
+        self._thread        = None
+        self._last_retention = 0.0
+        with connect(path) as db:
+            db.executescript(SCHEMA)
+        db.close()
+
+    # ── Request side ─────────────────────────────────────────────
+    def record(self, values, pred, disease_p, leaf, model, session=None, patient=None,
+               ts=None):
+        """Queue one prediction; O(1), no I/O."""
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            metrics.count("audit_dropped")
+            return
+        self._pending.append((time.time() if ts is None else ts, session, patient, model,
+                              int(pred), float(disease_p), int(leaf), *map(float, values)))
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    # ── Writer side ──────────────────────────────────────────────
+    def _write(self, db):
+        """Write everything queued, batch_size rows per transaction."""
+        pending = self._pending
+        while pending:
+            with self._lock:
+                rows = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+                self._inflight = len(rows)
+            t0 = time.perf_counter()
+            try:
+                with metrics.timer("audit_flush"):
+                    with db:
+                        db.executemany(INSERT, rows)
+            except sqlite3.Error:
+                with self._lock:                    # keep them for the next attempt
+                    pending.extendleft(reversed(rows))
+                    self._inflight = 0
+                raise
+            self.flush_ms = (time.perf_counter() - t0) * 1e3
+            with self._lock:
+                self.written  += len(rows)
+                self._inflight = 0
+            self.batches += 1
+            metrics.count("audit_rows", len(rows))
+        with self._flushed:
+            self._flushed.notify_all()
+
+    def _run(self):
+        db = connect(self.path)
+        try:
+            while True:
+                stop = self._stop.is_set()
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                try:
+                    self._write(db)
+                    if self.retention_days and time.time() - self._last_retention > 3600:
+                        self._last_retention = time.time()
+                        self.deleted += expire(db, self.retention_days)
+                except sqlite3.Error as e:          # never let the writer die
+                    self.errors += 1
+                    print(f"audit: {type(e).__name__}: {e}", file=sys.stderr)
+                    if stop:
+                        print(f"audit: {len(self._pending)} rows not written", file=sys.stderr)
+                        return
+                    time.sleep(self.flush_interval)
+                if stop and not self._pending:
+                    return
+        finally:
+            db.close()
+
+    def flush(self, timeout=10.0):
+        """Block until everything queued so far is on disk (for tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            target = self.written + self._inflight + len(self._pending)
+        with self._flushed:
+            while self.written < target and time.monotonic() < deadline:
+                self._wake.set()
+                self._flushed.wait(0.05)
+        return self.written >= target
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Write what is queued, then stop the thread."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+
+    # ── Reads ────────────────────────────────────────────────────
+    def query(self, **kw):
+        return query(self.path, **kw)
+
+    def stats(self):
+        try:
+            size = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal")
+                       if os.path.exists(p))
+        except OSError:
+            size = 0
+        return {"path": self.path, "queued": len(self._pending), "written": self.written,
+                "batches": self.batches, "dropped": self.dropped, "errors": self.errors,
+                "deleted": self.deleted, "last_flush_ms": self.flush_ms,
+                "retention_days": self.retention_days, "bytes": size}
+
+
+# ─────────────────────────────────────────────────────────────────
+# LOOKUP / RETENTION
+# ─────────────────────────────────────────────────────────────────
+def query(path, session=None, patient=None, since=None, until=None, limit=100):
+    """Most recent predictions first, filtered on the indexed columns.
+
+    `since` / `until` are Unix timestamps.
+    """
+    where, args = [], []
+    for col, val in (("session", session), ("patient", patient)):
+        if val is not None:
+            where.append(f"{col} = ?")
+            args.append(val)
+    if since is not None:
+        where.append("ts >= ?")
+        args.append(since)
+    if until is not None:
+        where.append("ts < ?")
+        args.append(until)
+    sql = (f"SELECT {', '.join(COLUMNS)} FROM predictions"
+           + (f" WHERE {' AND '.join(where)}" if where else "")
+           + " ORDER BY ts DESC LIMIT ?")
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30.0)
+    try:
+        rows = db.execute(sql, (*args, int(limit))).fetchall()
+    finally:
+        db.close()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def expire(db, days, chunk=50_000):
+    """Delete rows older than `days`, `chunk` rows per transaction; returns the count."""
+    cutoff, deleted = time.time() - days * DAY, 0
+    while True:
+        with db:
+            n = db.execute("DELETE FROM predictions WHERE id IN (SELECT id FROM predictions "
+                           "WHERE ts < ? LIMIT ?)", (cutoff, chunk)).rowcount
+        deleted += n
+        if n < chunk:
+            return deleted
+
+
+def compact(path, days=None):
+    """Apply retention (if `days`), checkpoint the WAL and VACUUM; returns (deleted, bytes)."""
+    db = connect(path)
+    try:
+        deleted = expire(db, days) if days else 0
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.execute("VACUUM")
+    finally:
+        db.close()
+    return deleted, os.path.getsize(path)
+
+
+# ─────────────────────────────────────────────────────────────────
+# SELF-CHECK
+# ─────────────────────────────────────────────────────────────────
+def _selfcheck(rows, threads):
+    import tempfile
+    import numpy as np
+    from risk_rules import random_rows
+
+    with tempfile.TemporaryDirectory(prefix="audit-") as tmp:
+        path = os.path.join(tmp, "audit.db")
+        log = AuditLog(path).start()
+        X = random_rows(rows // threads, seed=3).tolist()
+        lat = []
+        t0 = time.time()
+
+        def client(t):
+            for i, values in enumerate(X):
+                s = time.perf_counter()
+                log.record(values, i & 1, 0.5, 7, "selfcheck", session=f"s{t}-{i % 100}",
+                           patient=f"p{i}", ts=t0 - (400 * DAY if i % 10 == 0 else 0))
+                lat.append(time.perf_counter() - s)
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=client, args=(t,)) for t in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        enqueue_s = time.perf_counter() - start
+        assert log.flush(60), "writer did not catch up"
+        total_s = time.perf_counter() - start
+        log.stop()
+        n = len(X) * threads
+        st = log.stats()
+        assert st["written"] == n and st["dropped"] == 0, st
+
+        lat = np.array(lat) * 1e6
+        print(f"{n:,} records from {threads} threads: "
+              f"enqueue p50 {np.percentile(lat, 50):.1f} µs, p99 {np.percentile(lat, 99):.1f} µs ({n / enqueue_s:,.0f}/s)")
+        print(f"on disk in {total_s:.2f}s: {n / total_s:,.0f} predictions/sec sustained, "
+              f"{st['batches']} batches, {st['bytes'] / n:.0f} bytes/row")
+
+        s = time.perf_counter()
+        hits = query(path, session="s0-42", limit=1000)
+        q_ms = (time.perf_counter() - s) * 1e3
+        assert len(hits) == len(X) // 100 and all(h["session"] == "s0-42" for h in hits)
+        assert hits[0]["ts"] >= hits[-1]["ts"]
+        first = query(path, patient="p1", limit=1)[0]
+        assert [first[f] for f in FEATURE_NAMES] == X[1]
+        print(f"session lookup: {len(hits)} rows in {q_ms:.2f} ms (indexed)")
+
+        deleted, size = compact(path, days=365)
+        assert deleted == sum(1 for i in range(len(X)) if i % 10 == 0) * threads
+        print(f"compact(365 days): deleted {deleted:,} old rows, file now {size / 2**20:.1f} MiB")
+    print("OK")
+
+
+def main(argv=None):
+    import argparse
+    import json
+    ap  = argparse.ArgumentParser(description="Prediction audit log.")
+    sub = ap.add_subparsers(dest="cmd")
+    c = sub.add_parser("check", help="self-check and throughput (default)")
+    c.add_argument("--rows", type=int, default=400_000)
+    c.add_argument("--threads", type=int, default=4)
+    q = sub.add_parser("query", help="print matching predictions as JSON lines")
+    q.add_argument("db")
+    q.add_argument("--session")
+    q.add_argument("--patient")
+    q.add_argument("--since-hours", type=float)
+    q.add_argument("--limit", type=int, default=100)
+    k = sub.add_parser("compact", help="apply retention, checkpoint and VACUUM")
+    k.add_argument("db")
+    k.add_argument("--days", type=float)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "query":
+        since = time.time() - args.since_hours * 3600 if args.since_hours else None
+        for row in query(args.db, args.session, args.patient, since, limit=args.limit):
+            print(json.dumps(row))
+    elif args.cmd == "compact":
+        deleted, size = compact(args.db, args.days)
+        print(f"✅  deleted {deleted:,} rows · {size / 2**20:.1f} MiB  →  {args.db}")
+    else:
+        _selfcheck(getattr(args, "rows", 400_000), getattr(args, "threads", 4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Streaming batch scorer for cohort extracts (CSV or Parquet).
+
+Reads the 13 FEATURE_NAMES columns in fixed-size chunks, scores each chunk
+with one compiled-tree traversal and appends the results to a CSV, so peak
+memory depends on --chunksize, not on file size.  A checkpoint next to the
+output records the last completed chunk; --resume continues from there.
+
+    python batch_score.py cohort.csv scored.csv --chunksize 100000
+    python batch_score.py cohort.parquet scored.csv --resume
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import FEATURE_NAMES, MODEL_PATH, risk_labels
+from model_artifact import load_tree
+from risk_rules import default_rules
+
+OUTPUT_COLUMNS = ["row", "class", "disease_p", "risk_label", "leaf", "flags"]
+
+
+# ─────────────────────────────────────────────────────────────────
+# INPUT
+# ─────────────────────────────────────────────────────────────────
+def is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def iter_chunks(path, chunksize, skip_rows=0, id_col=None):
+    """Yield DataFrames of at most `chunksize` rows, starting at `skip_rows`."""
+    columns = FEATURE_NAMES + ([id_col] if id_col else [])
+    if is_parquet(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌  Parquet input needs pyarrow:  pip install pyarrow")
+        pf = pq.ParquetFile(path)
+        missing = [c for c in columns if c not in pf.schema_arrow.names]
+        if missing:
+            raise ValueError(f"{path}: missing columns {missing}")
+        seen = 0
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            if seen + batch.num_rows <= skip_rows:
+                seen += batch.num_rows
+                continue
+            df = batch.to_pandas()
+            if seen < skip_rows:
+                df = df.iloc[skip_rows - seen:]
+            seen += batch.num_rows
+            yield df
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"{path}: missing columns {missing}")
+        if not skip_rows:
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+            return
+        # Resume: seek past the header and the rows already scored, then parse
+        # from there (skiprows=range(...) would build a set of every row number).
+        with open(path, "rb") as f:
+            skip_lines(f, skip_rows + 1)
+            if not f.read(1):
+                return
+            f.seek(-1, os.SEEK_CUR)
+            yield from pd.read_csv(f, header=None, names=list(header), usecols=columns,
+                                   chunksize=chunksize)
+
+
+def skip_lines(f, n, block=1 << 20):
+    """Advance binary file `f` past its next `n` newlines without parsing them."""
+    while n:
+        buf = f.read(block)
+        if not buf:
+            return
+        found = buf.count(b"\n")
+        if found < n:
+            n -= found
+            continue
+        pos = -1
+        for _ in range(n):
+            pos = buf.index(b"\n", pos + 1)
+        f.seek(pos + 1 - len(buf), os.SEEK_CUR)
+        return
+
+
+def feature_matrix(df):
+    return df[FEATURE_NAMES].to_numpy(dtype=np.float64)
+
+
+# ─────────────────────────────────────────────────────────────────
+# SCORING
+# ─────────────────────────────────────────────────────────────────
+def score_frame(tree, df, start_row, id_col=None):
+    X   = feature_matrix(df)
+    res = tree.score(X, return_path=False)
+    disease_p = res.proba[:, 1]
+    out = pd.DataFrame({
+        "row":        np.arange(start_row, start_row + len(df)),
+        "class":      res.pred,
+        "disease_p":  disease_p,
+        "risk_label": risk_labels(disease_p),
+        "leaf":       res.leaf,
+        "flags":      default_rules().bitsets(X),
+    })
+    if id_col:
+        out.insert(0, id_col, df[id_col].to_numpy())
+    return out
+
+
+# ─────────────────────────────────────────────────────────────────
+# CHECKPOINT
+# ─────────────────────────────────────────────────────────────────
+def checkpoint_path(out_path):
+    return out_path + ".ckpt"
+
+
+def read_checkpoint(out_path, input_path, chunksize):
+    try:
+        with open(checkpoint_path(out_path)) as f:
+            ck = json.load(f)
+    except FileNotFoundError:
+        return None
+    if ck["input"] != os.path.abspath(input_path) or ck["chunksize"] != chunksize:
+        raise SystemExit(f"❌  {checkpoint_path(out_path)} belongs to a different run "
+                         f"({ck['input']}, chunksize {ck['chunksize']})")
+    return ck
+
+
+def write_checkpoint(out_path, ck):
+    tmp = checkpoint_path(out_path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(ck, f)
+    os.replace(tmp, checkpoint_path(out_path))
+
+
+# ─────────────────────────────────────────────────────────────────
+# RUN
+# ─────────────────────────────────────────────────────────────────
+def run(input_path, out_path, tree, chunksize=100_000, resume=False,
+        id_col=None, log=sys.stderr):
+    ck = read_checkpoint(out_path, input_path, chunksize) if resume else None
+    if ck is None:
+        ck = {"input": os.path.abspath(input_path), "chunksize": chunksize,
+              "chunks_done": 0, "rows_done": 0, "out_bytes": 0}
+
+    t0   = time.perf_counter()
+    rows = 0
+    with open(out_path, "a+b") as f:
+        # Drop anything written after the last checkpoint (a half-written chunk).
+        f.truncate(ck["out_bytes"])
+        f.seek(ck["out_bytes"])
+        if ck["out_bytes"] == 0:
+            cols = ([id_col] if id_col else []) + OUTPUT_COLUMNS
+            f.write((",".join(cols) + "\n").encode())
+        for df in iter_chunks(input_path, chunksize, ck["rows_done"], id_col):
+            out = score_frame(tree, df, ck["rows_done"], id_col)
+            f.write(out.to_csv(header=False, index=False).encode())
+            f.flush()
+            os.fsync(f.fileno())
+            rows += len(df)
+            ck["chunks_done"] += 1
+            ck["rows_done"]   += len(df)
+            ck["out_bytes"]    = f.tell()
+            write_checkpoint(out_path, ck)
+            print(f"chunk {ck['chunks_done']:>6}  rows {ck['rows_done']:>12,}", file=log)
+
+    elapsed = time.perf_counter() - t0
+    rate    = rows / elapsed if elapsed > 0 else float("inf")
+    print(f"✅  scored {rows:,} rows in {elapsed:.2f}s  ({rate:,.0f} rows/sec)"
+          f"  →  {out_path}", file=log)
+    return rows, elapsed
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    ap = argparse.ArgumentParser(description="Score a cohort file in streaming chunks.")
+    ap.add_argument("input", help="CSV or Parquet file with the 13 feature columns")
+    ap.add_argument("output", help="CSV file to write scores to")
+    ap.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    ap.add_argument("--chunksize", type=int, default=100_000)
+    ap.add_argument("--id-col", help="column to carry through to the output")
+    ap.add_argument("--resume", action="store_true",
+                    help="continue from the last completed chunk")
+    args = ap.parse_args(argv)
+
+    tree = load_tree(args.model)
+    run(args.input, args.output, tree, args.chunksize, args.resume, args.id_col)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Reproducible benchmark suite for the prediction paths and renderers.
+
+Uses the bundled model and synthetic patients drawn (seeded) from the
+sidebar domains.  Measures:
+
+    single   per-call latency of sklearn predict / predict_proba, the
+             compiled tree, the lookup table and get_decision_path
+    batch    rows/sec and peak traced memory at each --sizes batch size
+    render   tree_view JSON payload, plot_tree (depth 3 and full) and export_text
+
+Results are written as JSON; --compare checks a run against a saved
+baseline and exits 1 when any metric regressed by more than --threshold.
+
+    python benchmark.py --out bench.json
+    python benchmark.py --sizes 1e3,1e5 --compare bench.json
+    python benchmark.py --compare bench.json --current other.json
+"""
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from core import FEATURE_DOMAINS, FEATURE_NAMES, MODEL_PATH
+
+SECTIONS      = ("single", "batch", "render")
+DEFAULT_SIZES = "1e3,1e4,1e5,1e6,1e7"
+
+
+def synthetic_patients(n, seed=0, dtype=np.float32):
+    """(n, 13) patients drawn uniformly from every feature's sidebar domain."""
+    rng = np.random.default_rng(seed)
+    X   = np.empty((n, len(FEATURE_NAMES)), dtype=dtype)
+    for f, name in enumerate(FEATURE_NAMES):
+        X[:, f] = rng.choice(FEATURE_DOMAINS[name], n)
+    return X
+
+
+def _metric(value, unit, better="lower", gate=True):
+    # gate=False: recorded and shown by --compare, never counted as a regression.
+    return {"value": float(value), "unit": unit, "better": better, "gate": gate}
+
+
+def _latency(fn, rows, warmup=20):
+    """p50/p95/p99/mean µs of fn(row) over `rows`, one call per row."""
+    for row in rows[:warmup]:
+        fn(row)
+    times = np.empty(len(rows))
+    clock = time.perf_counter_ns
+    for i, row in enumerate(rows):
+        t0 = clock()
+        fn(row)
+        times[i] = clock() - t0
+    p50, p95, p99 = np.percentile(times, [50, 95, 99]) / 1e3
+    return p50, p95, p99, times.mean() / 1e3
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _peak_bytes(fn):
+    """Peak memory traced while fn() runs, above what was live before."""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+# ─────────────────────────────────────────────────────────────────
+# SECTIONS
+# ─────────────────────────────────────────────────────────────────
+def bench_single(model, tree, table, n_calls, log):
+    from core import get_decision_path
+    X    = synthetic_patients(n_calls, seed=1, dtype=np.float64)
+    rows = [X[i:i + 1] for i in range(n_calls)]
+    vals = X.tolist()
+    cases = {"tree_score":    (lambda r: tree.score(r), rows),
+             "lookup_table":  (table.predict_one, vals) if table is not None else None,
+             "decision_path": (lambda r: get_decision_path(tree, r), rows)}
+    if model is not None:
+        cases = {"sklearn_predict":       (model.predict, rows),
+                 "sklearn_predict_proba": (model.predict_proba, rows), **cases}
+    out = {}
+    for name, case in cases.items():
+        if case is None:
+            continue
+        p50, p95, p99, mean = _latency(*case)
+        log(f"  single  {name:<24} p50 {p50:>9.1f} µs · p99 {p99:>9.1f} µs")
+        for q, v in (("p50", p50), ("p95", p95), ("p99", p99), ("mean", mean)):
+            # Tail latencies on a shared machine are too noisy to gate on.
+            out[f"single.{name}.{q}_us"] = _metric(v, "µs", gate=q in ("p50", "mean"))
+    return out
+
+
+def bench_batch(model, tree, table, sizes, repeat, log):
+    out = {}
+    for n in sizes:
+        X = synthetic_patients(n)
+        cases = {"tree_score": lambda: tree.score(X, return_path=False),
+                 "tree_score_path": lambda: tree.score(X)}
+        if table is not None:
+            cases["lookup_table"] = lambda: table.lookup(X)
+        if model is not None:
+            cases = {"sklearn_predict_proba": lambda: model.predict_proba(X), **cases}
+        reps = max(1, min(repeat, int(1e6 // n) or 1))
+        for name, fn in cases.items():
+            secs = _best(fn, reps)
+            peak = _peak_bytes(fn)
+            log(f"  batch   {name:<24} {n:>10,} rows  {n / secs:>14,.0f} rows/s · "
+                f"peak {peak / 2**20:>8.1f} MiB")
+            out[f"batch.{name}.{n}.rows_per_sec"] = _metric(n / secs, "rows/s", "higher")
+            out[f"batch.{name}.{n}.peak_mib"]     = _metric(peak / 2**20, "MiB")
+        del X
+    return out
+
+
+def bench_render(model, tree, repeat, log):
+    from tree_view import tree_payload
+    secs = _best(lambda: tree_payload(tree), repeat * 100)
+    log(f"  render  {'tree_view_json':<24} {secs * 1e3:>9.3f} ms")
+    out = {"render.tree_view_json_ms": _metric(secs * 1e3, "ms")}
+    if model is None:
+        log("  render  plot_tree skipped: needs the scikit-learn pickle")
+        return out
+    from sklearn.tree import export_text
+    from core import FEATURE_LABELS
+    from render_cache import render_tree
+    for depth in (3, None):
+        secs = _best(lambda: render_tree(model, depth), repeat)
+        name = f"plot_tree_depth_{depth or 'full'}"
+        log(f"  render  {name:<24} {secs * 1e3:>9.1f} ms")
+        out[f"render.{name}_ms"] = _metric(secs * 1e3, "ms")
+    secs = _best(lambda: export_text(model, feature_names=FEATURE_LABELS, max_depth=6,
+                                     spacing=3, show_weights=True), repeat * 10)
+    log(f"  render  {'export_text':<24} {secs * 1e3:>9.1f} ms")
+    out["render.export_text_ms"] = _metric(secs * 1e3, "ms")
+    return out
+
+
+def environment(model_path, tree):
+    import sklearn
+    return {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "sklearn": sklearn.__version__, "platform": platform.platform(),
+            "cpus": os.cpu_count(), "model": os.path.basename(model_path),
+            "fingerprint": tree.fingerprint()}
+
+
+def run(model_path=MODEL_PATH, sections=SECTIONS, sizes=(1_000,), single_calls=2000,
+        repeat=3, log=print):
+    import warnings
+    warnings.filterwarnings("ignore")
+    from lookup_table import LookupTable
+    from model_artifact import load_any
+    model, tree = load_any(model_path)
+    try:
+        table = LookupTable.from_tree(tree)
+    except ValueError:
+        table = None
+    metrics = {}
+    if "single" in sections:
+        metrics.update(bench_single(model, tree, table, single_calls, log))
+    if "batch" in sections:
+        metrics.update(bench_batch(model, tree, table, sizes, repeat, log))
+    if "render" in sections:
+        metrics.update(bench_render(model, tree, 1, log))
+    return {"environment": environment(model_path, tree), "metrics": metrics}
+
+
+# ─────────────────────────────────────────────────────────────────
+# COMPARE
+# ─────────────────────────────────────────────────────────────────
+def compare(baseline, current, threshold=0.15):
+    """Rows (metric, base, cur, change, regressed) for metrics in both runs.
+
+    `change` is signed so that positive always means worse.
+    """
+    rows = []
+    for name, cur in current["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None or not base["value"]:
+            continue
+        rel = (cur["value"] - base["value"]) / base["value"]
+        worse = rel if cur["better"] == "lower" else -rel
+        rows.append((name, base, cur, worse, cur.get("gate", True) and worse > threshold))
+    return rows
+
+
+def print_comparison(rows, baseline, current, threshold):
+    b_env, c_env = baseline["environment"], current["environment"]
+    for key in ("sklearn", "numpy", "python", "cpus", "fingerprint"):
+        if b_env.get(key) != c_env.get(key):
+            print(f"note: {key} differs: baseline {b_env.get(key)} · current {c_env.get(key)}")
+    print(f"{'metric':<52} {'baseline':>14} {'current':>14} {'worse by':>9}")
+    for name, base, cur, worse, regressed in rows:
+        flag = "❌" if regressed else ("  " if cur.get("gate", True) else " ·")
+        print(f"{name:<52} {base['value']:>14,.2f} {cur['value']:>14,.2f} "
+              f"{worse * 100:>+8.1f}% {flag}")
+    bad   = sum(r[4] for r in rows)
+    gated = sum(r[2].get("gate", True) for r in rows)
+    print(f"\n{'❌' if bad else '✅'}  {bad} of {gated} gated metrics regressed by more than "
+          f"{threshold * 100:.0f}%  (· = informational)")
+    return bad
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Benchmark prediction latency, throughput "
+                                             "and rendering.")
+    ap.add_argument("--model", default=MODEL_PATH)
+    ap.add_argument("--only", default=",".join(SECTIONS),
+                    help=f"comma-separated sections from {','.join(SECTIONS)}")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help="batch sizes, e.g. 1e3,1e5")
+    ap.add_argument("--single-calls", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3, help="best-of repeats per batch")
+    ap.add_argument("--out", help="write this run's JSON here")
+    ap.add_argument("--compare", metavar="BASELINE", help="saved JSON to compare against")
+    ap.add_argument("--current", help="compare this saved JSON instead of running")
+    ap.add_argument("--threshold", type=float, default=0.15,
+                    help="relative slowdown counted as a regression (default 0.15)")
+    args = ap.parse_args(argv)
+
+    if args.current:
+        with open(args.current) as f:
+            result = json.load(f)
+    else:
+        sections = [s for s in args.only.split(",") if s]
+        unknown  = set(sections) - set(SECTIONS)
+        if unknown:
+            ap.error(f"unknown sections {sorted(unknown)}")
+        sizes  = [int(float(s)) for s in args.sizes.split(",") if s]
+        result = run(args.model, sections, sizes, args.single_calls, args.repeat)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"✅  wrote {args.out}  ({len(result['metrics'])} metrics)")
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    print()
+    rows = compare(baseline, result, args.threshold)
+    return 1 if print_comparison(rows, baseline, result, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Generate a standalone Python/NumPy scorer from the fitted tree.
+
+The emitted module imports nothing but NumPy (and only predict_batch needs
+it), so it can be embedded where unpickling sklearn objects is not allowed:
+
+    predict_one(age, sex, cp, ...)  → (class, (p_no, p_yes), leaf)   nested ifs only
+    predict_batch(X)                → (classes, proba, leaves)       np.where per split, by depth
+
+sklearn compares float32(x) <= threshold.  predict_batch casts X to
+float32 and uses the thresholds as-is.  predict_one works on plain Python
+floats, so each threshold is rewritten as the float64 cut point that
+gives the same answer as the float32 comparison.
+
+    python codegen.py --out heart_tree_generated.py --verify --bench
+"""
+import hashlib
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+
+from core import CLASS_NAMES, FEATURE_NAMES
+
+HEADER = '''"""
+Heart disease decision tree, generated by codegen.py. Do not edit.
+
+Source fingerprint: {fingerprint}
+Nodes: {nodes} · depth: {depth} · classes: {classes}
+"""
+'''
+
+
+def scalar_test(thr):
+    """(op, cut) so that `x op cut` on a float64 x == (float32(x) <= thr)."""
+    t32 = np.float32(thr)
+    if float(t32) > thr:
+        t32 = np.nextafter(t32, np.float32(-np.inf))
+    up  = np.nextafter(t32, np.float32(np.inf))
+    mid = (float(t32) + float(up)) / 2          # exact in float64
+    # At the midpoint float32 rounds to even: left if t32's mantissa is even.
+    even = int(np.array(t32).view(np.uint32)) % 2 == 0
+    return ("<=" if even else "<"), mid
+
+
+def _emit_one(tree, lines):
+    def walk(node, indent):
+        pad = "    " * indent
+        if tree.is_leaf[node]:
+            p   = tree.proba[node]
+            cls = tree.classes[int(np.argmax(p))]
+            lines.append(f"{pad}return {int(cls)}, ({float(p[0])!r}, {float(p[1])!r}), {node}")
+            return
+        op, cut = scalar_test(tree.threshold[node])
+        lines.append(f"{pad}if {FEATURE_NAMES[tree.feature[node]]} {op} {cut!r}:")
+        walk(int(tree.children_left[node]), indent + 1)
+        lines.append(f"{pad}else:")
+        walk(int(tree.children_right[node]), indent + 1)
+
+    lines.append(f"def predict_one({', '.join(FEATURE_NAMES)}):")
+    lines.append('    """Branch-only scorer for one patient: (class, (p_no, p_yes), leaf)."""')
+    walk(0, 1)
+
+
+def _emit_batch(tree, lines):
+    depth = np.zeros(tree.node_count, dtype=int)
+    for node in range(tree.node_count):
+        if not tree.is_leaf[node]:
+            depth[tree.children_left[node]]  = depth[node] + 1
+            depth[tree.children_right[node]] = depth[node] + 1
+
+    lines.append("def predict_batch(X):")
+    lines.append('    """Vectorized scorer: (classes, proba (n, 2), leaves) for an (n, 13) array."""')
+    lines.append("    import numpy as np")
+    lines.append("    X    = np.asarray(X, dtype=np.float32).reshape(-1, 13)")
+    lines.append("    node = np.zeros(len(X), dtype=np.int64)")
+    for d in range(int(depth.max())):
+        lines.append(f"    # depth {d}")
+        for node in np.flatnonzero((depth == d) & ~tree.is_leaf):
+            f, thr = int(tree.feature[node]), float(tree.threshold[node])
+            left, right = int(tree.children_left[node]), int(tree.children_right[node])
+            cond = f"X[:, {f}] <= {thr!r}"
+            if node == 0:
+                lines.append(f"    node = np.where({cond}, {left}, {right})")
+            else:
+                lines.append(f"    node = np.where(node == {node}, "
+                             f"np.where({cond}, {left}, {right}), node)")
+    lines.append("    proba = np.array(_PROBA)[node]")
+    lines.append("    return np.array(CLASSES)[np.argmax(proba, axis=1)], proba, node")
+
+
+def generate(tree):
+    lines = [HEADER.format(fingerprint=tree.fingerprint(), nodes=tree.node_count,
+                           depth=tree.max_depth, classes=CLASS_NAMES).rstrip(), ""]
+    lines.append(f"FEATURE_NAMES = {FEATURE_NAMES!r}")
+    lines.append(f"CLASS_NAMES   = {CLASS_NAMES!r}")
+    lines.append(f"CLASSES       = {[int(c) for c in tree.classes]!r}")
+    lines.append("_PROBA = [")
+    for p in tree.proba:
+        lines.append(f"    ({float(p[0])!r}, {float(p[1])!r}),")
+    lines.append("]")
+    lines += ["", ""]
+    _emit_one(tree, lines)
+    lines += ["", ""]
+    _emit_batch(tree, lines)
+    return "\n".join(lines) + "\n"
+
+
+def load_generated(path):
+    name = "heart_tree_generated_" + hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod  = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+# ─────────────────────────────────────────────────────────────────
+# VERIFY / BENCH
+# ─────────────────────────────────────────────────────────────────
+def verify(gen, model, tree):
+    """Compare against the sklearn model (or the compiled tree for .hdt).
+
+    Uses tree_engine.exhaustive_grid: every bin-edge combination over the
+    sidebar domains.
+    """
+    from tree_engine import exhaustive_grid
+    X = exhaustive_grid(tree)
+    ref_pred  = model.predict(X) if model is not None else tree.predict(X)
+    ref_proba = model.predict_proba(X) if model is not None else tree.predict_proba(X)
+    ref_leaf  = model.apply(X) if model is not None else tree.apply(X)[0]
+
+    pred, proba, leaf = gen.predict_batch(X)
+    bad_batch = int(((pred != ref_pred) | (leaf != ref_leaf)
+                     | (proba != ref_proba).any(axis=1)).sum())
+    bad_one = 0
+    predict_one = gen.predict_one
+    for i, row in enumerate(X.tolist()):
+        c, p, l = predict_one(*row)
+        bad_one += (c != ref_pred[i]) or (l != ref_leaf[i]) or (p[1] != ref_proba[i, 1])
+    return len(X), bad_batch, bad_one
+
+
+def bench(gen, model, tree, sizes=(1_000, 100_000, 1_000_000)):
+    from tree_engine import check_grid
+    row = [54.0, 1.0, 0.0, 130.0, 240.0, 0.0, 0.0, 150.0, 0.0, 1.0, 0.0, 0.0, 1.0]
+    X1  = np.array([row])
+
+    def per_call(fn, n):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - t0) / n * 1e6
+
+    print(f"{'single row':<28} {'µs/call':>10}")
+    if model is not None:
+        print(f"{'model.predict_proba':<28} {per_call(lambda: model.predict_proba(X1), 500):>10.1f}")
+    print(f"{'tree_engine score':<28} {per_call(lambda: tree.score(X1), 2000):>10.1f}")
+    print(f"{'generated predict_batch':<28} {per_call(lambda: gen.predict_batch(X1), 2000):>10.1f}")
+    print(f"{'generated predict_one':<28} {per_call(lambda: gen.predict_one(*row), 100_000):>10.2f}")
+    print()
+    print(f"{'batch rows':>10} {'predict_proba':>15} {'predict_batch':>15}   (rows/sec)")
+    for n in sizes:
+        X  = check_grid(tree, n)
+        t0 = time.perf_counter()
+        if model is not None:
+            model.predict_proba(X)
+        t1 = time.perf_counter()
+        gen.predict_batch(X)
+        t2 = time.perf_counter()
+        ref = f"{n / (t1 - t0):>15,.0f}" if model is not None else f"{'—':>15}"
+        print(f"{n:>10,} {ref} {n / (t2 - t1):>15,.0f}")
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    from core import MODEL_PATH
+    from model_artifact import load_any
+    ap = argparse.ArgumentParser(description="Generate a standalone scorer module.")
+    ap.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    ap.add_argument("--out", default="heart_tree_generated.py")
+    ap.add_argument("--verify", action="store_true", help="exhaustive check against the model")
+    ap.add_argument("--bench", action="store_true", help="latency vs model.predict_proba")
+    args = ap.parse_args(argv)
+
+    model, tree = load_any(args.model)
+    with open(args.out, "w") as f:
+        f.write(generate(tree))
+    print(f"✅  wrote {args.out}")
+    gen = load_generated(args.out)
+    rc  = 0
+    if args.verify:
+        n, bad_batch, bad_one = verify(gen, model, tree)
+        ok = bad_batch == 0 and bad_one == 0
+        rc = 0 if ok else 1
+        print(f"{'OK ' if ok else 'MISMATCH'}  {n:,} grid rows · predict_batch {bad_batch} "
+              f"· predict_one {bad_one} disagreements")
+    if args.bench:
+        bench(gen, model, tree)
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Columnar cohort I/O: Arrow IPC / Feather, Parquet and CSV through pyarrow.
+
+Only the FEATURE_NAMES columns (plus an optional id column) are read.
+Feather / Arrow IPC files are memory-mapped, so reading them allocates
+nothing.  The feature matrix for the scorer is then built straight from
+the Arrow buffers, with no pandas frame in between:
+
+  packed   a `features` column of fixed_size_list<double>[13] is already a
+           row-major (n, 13) float64 block, so the matrix is a zero-copy view
+  columns  13 float64 columns are zero-copy views; they are gathered into
+           the matrix with one copy (other dtypes are cast first)
+
+Scores go back out as Arrow record batches (IPC file or Parquet).
+
+    python columnar.py convert cohort.csv cohort.feather [--packed]
+    python columnar.py score cohort.feather scored.arrow --id-col pid
+    python columnar.py bench cohort.csv        # vs pandas CSV: time and bytes copied
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from core import FEATURE_NAMES, MODEL_PATH, RISK_LABELS, risk_band
+
+PACKED_COLUMN = "features"
+IPC_SUFFIXES  = (".feather", ".arrow", ".ipc")
+
+
+def _pa():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Columnar I/O needs pyarrow:  pip install pyarrow") from None
+    return pyarrow
+
+
+def file_format(path):
+    p = path.lower()
+    if p.endswith(IPC_SUFFIXES):
+        return "ipc"
+    if p.endswith((".parquet", ".pq")):
+        return "parquet"
+    if p.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"{path}: expected .feather/.arrow/.ipc, .parquet or .csv")
+
+
+# ─────────────────────────────────────────────────────────────────
+# READ
+# ─────────────────────────────────────────────────────────────────
+def _projection(names, id_col=None):
+    """Columns to read: the packed column if present, else the 13 features."""
+    extra = [id_col] if id_col else []
+    if PACKED_COLUMN in names:
+        cols = [PACKED_COLUMN] + extra
+    else:
+        cols = FEATURE_NAMES + extra
+    missing = [c for c in cols if c not in names]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    return cols
+
+
+def iter_batches(path, id_col=None, batch_rows=262_144):
+    """Record batches with only the columns the scorer needs."""
+    pa = _pa()
+    fmt = file_format(path)
+    if fmt == "ipc":
+        # Batches are slices of the mapped file: nothing is read until touched.
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        cols = _projection(reader.schema.names, id_col)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(cols)
+            for start in range(0, batch.num_rows, batch_rows):
+                yield batch.slice(start, batch_rows)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path, memory_map=True)
+        cols = _projection(pf.schema_arrow.names, id_col)
+        yield from pf.iter_batches(batch_size=batch_rows, columns=cols)
+    else:
+        import pyarrow.csv as pcsv
+        names = pcsv.open_csv(path).schema.names
+        cols = _projection(names, id_col)
+        reader = pcsv.open_csv(path,
+                               read_options=pcsv.ReadOptions(block_size=batch_rows * 64),
+                               convert_options=pcsv.ConvertOptions(include_columns=cols))
+        yield from reader
+
+
+def input_schema(path, id_col=None):
+    """Schema of the projected columns, read without touching any rows."""
+    pa = _pa()
+    fmt = file_format(path)
+    if fmt == "ipc":
+        schema = pa.ipc.open_file(pa.memory_map(path)).schema
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path)
+    else:
+        import pyarrow.csv as pcsv
+        schema = pcsv.open_csv(path).schema
+    return pa.schema([schema.field(c) for c in _projection(schema.names, id_col)])
+
+
+def read_table(path, id_col=None):
+    """Whole projected table (memory-mapped for IPC files)."""
+    pa = _pa()
+    fmt = file_format(path)
+    if fmt == "ipc":
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        return table.select(_projection(table.schema.names, id_col))
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        names = pq.read_schema(path).names
+        return pq.read_table(path, columns=_projection(names, id_col), memory_map=True)
+    import pyarrow.csv as pcsv
+    cols = _projection(pcsv.open_csv(path).schema.names, id_col)
+    return pcsv.read_csv(path, convert_options=pcsv.ConvertOptions(include_columns=cols))
+
+
+def table_from_bytes(data, name, id_col=None):
+    """Projected table from an in-memory file (e.g. an upload); IPC reads are zero-copy."""
+    pa = _pa()
+    buf = pa.py_buffer(data)
+    fmt = file_format(name)
+    if fmt == "ipc":
+        table = pa.ipc.open_file(pa.BufferReader(buf)).read_all()
+        return table.select(_projection(table.schema.names, id_col))
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(pa.BufferReader(buf))
+        return pf.read(columns=_projection(pf.schema_arrow.names, id_col))
+    import pyarrow.csv as pcsv
+    names = pcsv.open_csv(pa.BufferReader(buf)).schema.names
+    return pcsv.read_csv(pa.BufferReader(buf), convert_options=pcsv.ConvertOptions(
+        include_columns=_projection(names, id_col)))
+
+
+def _zero_copy(chunked):
+    """float64 view of a column when it is one null-free float64 chunk, else None."""
+    pa = _pa()
+    if chunked.num_chunks == 1 and chunked.null_count == 0 \
+            and chunked.type == pa.float64():
+        return chunked.chunk(0).to_numpy(zero_copy_only=True)
+    return None
+
+
+def feature_matrix(data):
+    """(X, bytes_copied) for a record batch or table.
+
+    X is a C-contiguous (n, 13) float64 array in FEATURE_NAMES order.
+    `bytes_copied` counts what had to be materialized; 0 for a
+    single-chunk packed column.
+    """
+    pa = _pa()
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    n = data.num_rows
+    if PACKED_COLUMN in data.column_names:
+        col = data.column(PACKED_COLUMN)
+        if not (pa.types.is_fixed_size_list(col.type) and col.type.list_size == len(FEATURE_NAMES)):
+            raise ValueError(f"'{PACKED_COLUMN}' must be fixed_size_list<double>"
+                             f"[{len(FEATURE_NAMES)}], got {col.type}")
+        if col.null_count:
+            raise ValueError(f"'{PACKED_COLUMN}' has {col.null_count} null rows")
+        copied = 0
+        if col.num_chunks != 1:
+            col = col.combine_chunks()
+            copied += n * len(FEATURE_NAMES) * 8
+            values = col.flatten()
+        else:
+            values = col.chunk(0).flatten()
+        flat = _zero_copy(pa.chunked_array([values])) if len(values) else np.empty(0)
+        if flat is None:
+            flat = values.to_numpy(zero_copy_only=False).astype(np.float64)
+            copied += flat.nbytes
+        return flat.reshape(n, len(FEATURE_NAMES)), copied
+
+    X = np.empty((n, len(FEATURE_NAMES)), dtype=np.float64)
+    copied = X.nbytes
+    for j, name in enumerate(FEATURE_NAMES):
+        col  = data.column(name)
+        view = _zero_copy(col)
+        if view is None:
+            if col.null_count:
+                raise ValueError(f"column '{name}' has {col.null_count} nulls")
+            view = col.cast(pa.float64()).to_numpy()
+            copied += view.nbytes
+        X[:, j] = view
+    return X, copied
+
+
+# ─────────────────────────────────────────────────────────────────
+# SCORE + WRITE
+# ─────────────────────────────────────────────────────────────────
+def score_batch(tree, batch, id_col=None, start_row=0):
+    """Scores for one record batch as a record batch; returns (batch, bytes_copied)."""
+    pa = _pa()
+    from risk_rules import default_rules
+    X, copied = feature_matrix(batch)
+    res  = tree.score(X, return_path=False)
+    p    = res.proba[:, 1]
+    band = risk_band(p).astype(np.int8)
+    cols = {
+        "row":        pa.array(np.arange(start_row, start_row + len(X), dtype=np.int64)),
+        "class":      pa.array(res.pred),
+        "disease_p":  pa.array(p),
+        "risk_label": pa.DictionaryArray.from_arrays(pa.array(band),
+                                                     pa.array(RISK_LABELS)),
+        "leaf":       pa.array(res.leaf.astype(np.int32)),
+        "flags":      pa.array(default_rules().bitsets(X)),
+    }
+    if id_col:
+        cols = {id_col: batch.column(id_col), **cols}
+    return pa.RecordBatch.from_pydict(cols), copied
+
+
+class BatchWriter:
+    """Record batches → Arrow IPC file (.arrow/.feather) or Parquet."""
+
+    def __init__(self, path, schema):
+        pa = _pa()
+        self.path = path
+        if file_format(path) == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, schema)
+        elif file_format(path) == "ipc":
+            self._writer = pa.ipc.new_file(path, schema)
+        else:
+            raise ValueError(f"{path}: scores are written as .arrow/.feather or .parquet")
+
+    def write(self, batch):
+        if hasattr(self._writer, "write_batch"):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+def run(input_path, out_path, tree, id_col=None, batch_rows=262_144, log=sys.stderr):
+    """Stream `input_path` through the scorer into `out_path`; returns (rows, seconds, copied)."""
+    pa = _pa()
+    t0 = time.perf_counter()
+    rows, copied = 0, 0
+    # Output schema from an empty batch, so a cohort with no rows still
+    # produces a valid (empty) output file.
+    empty  = pa.RecordBatch.from_pylist([], schema=input_schema(input_path, id_col))
+    writer = BatchWriter(out_path, score_batch(tree, empty, id_col)[0].schema)
+    try:
+        for batch in iter_batches(input_path, id_col, batch_rows):
+            out, c = score_batch(tree, batch, id_col, rows)
+            writer.write(out)
+            rows   += batch.num_rows
+            copied += c
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - t0
+    rate    = rows / elapsed if elapsed > 0 else float("inf")
+    print(f"✅  scored {rows:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec, "
+          f"{copied / 2**20:,.1f} MiB copied into feature matrices)  →  {out_path}", file=log)
+    return rows, elapsed, copied
+
+
+def convert(input_path, out_path, packed=False, id_col=None):
+    """Rewrite a cohort file as float64 columns (or one packed column).
+
+    IPC output is uncompressed so it can be memory-mapped zero-copy.
+    """
+    pa = _pa()
+    table = read_table(input_path, id_col)
+    X, _  = feature_matrix(table)
+    if packed:
+        cols = {PACKED_COLUMN: pa.FixedSizeListArray.from_arrays(pa.array(X.ravel()),
+                                                                 len(FEATURE_NAMES))}
+    else:
+        cols = {name: pa.array(np.ascontiguousarray(X[:, j]))
+                for j, name in enumerate(FEATURE_NAMES)}
+    if id_col:
+        cols = {id_col: table.column(id_col), **cols}
+    out = pa.table(cols)
+    if file_format(out_path) == "ipc":
+        with pa.ipc.new_file(out_path, out.schema,
+                             options=pa.ipc.IpcWriteOptions(compression=None)) as w:
+            w.write_table(out, max_chunksize=1 << 20)
+    elif file_format(out_path) == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(out, out_path)
+    else:
+        raise ValueError(f"{out_path}: convert writes .feather/.arrow or .parquet")
+    return out.num_rows
+
+
+# ─────────────────────────────────────────────────────────────────
+# BENCHMARK
+# ─────────────────────────────────────────────────────────────────
+def bench(csv_path, repeat=3, log=print):
+    """Time file → feature matrix per format; bytes copied and speedup vs pandas CSV."""
+    import shutil
+    import tempfile
+    import tracemalloc
+    import pandas as pd
+    pa = _pa()
+
+    tmp = tempfile.mkdtemp(prefix="columnar-")
+    try:
+        files = {"parquet": os.path.join(tmp, "c.parquet"),
+                 "feather": os.path.join(tmp, "c.feather"),
+                 "feather packed": os.path.join(tmp, "p.feather")}
+        convert(csv_path, files["parquet"])
+        convert(csv_path, files["feather"])
+        convert(csv_path, files["feather packed"], packed=True)
+
+        # Each case returns (X, source) so the source stays alive while it is measured.
+        def pandas_csv():
+            df = pd.read_csv(csv_path, usecols=FEATURE_NAMES)
+            return df[FEATURE_NAMES].to_numpy(dtype=np.float64), df
+
+        def arrow(path):
+            def load():
+                table = read_table(path)
+                return feature_matrix(table)[0], table
+            return load
+
+        cases = [("pandas CSV (batch_score)", pandas_csv), ("arrow CSV", arrow(csv_path))]
+        cases += [(name, arrow(path)) for name, path in files.items()]
+
+        rows, base = [], None
+        for name, fn in cases:
+            fn()
+            secs = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn()
+                secs = min(secs, time.perf_counter() - t0)
+            # Copies = numpy/pandas allocations (tracemalloc) + Arrow pool allocations.
+            pool0 = pa.total_allocated_bytes()
+            tracemalloc.start()
+            X, source = fn()
+            pool = pa.total_allocated_bytes() - pool0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            base = base or secs
+            rows.append((name, secs, len(X), pool + peak, base / secs))
+            del X, source
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    log(f"{'source':<26} {'ms':>9} {'Mrows/s':>8} {'MiB copied':>11} {'speedup':>8}")
+    for name, secs, n, copied, speedup in rows:
+        log(f"{name:<26} {secs * 1e3:>9.1f} {n / secs / 1e6:>8.1f} "
+            f"{copied / 2**20:>11.1f} {speedup:>7.1f}×")
+    return rows
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    ap  = argparse.ArgumentParser(description="Arrow / Parquet / Feather cohort I/O.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("convert", help="rewrite a cohort as uncompressed Feather or Parquet")
+    c.add_argument("input")
+    c.add_argument("output")
+    c.add_argument("--packed", action="store_true",
+                   help=f"one fixed_size_list '{PACKED_COLUMN}' column (zero-copy matrix)")
+    c.add_argument("--id-col")
+    s = sub.add_parser("score", help="score a cohort into Arrow record batches")
+    s.add_argument("input")
+    s.add_argument("output", help=".arrow/.feather or .parquet")
+    s.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    s.add_argument("--id-col")
+    s.add_argument("--batch-rows", type=int, default=262_144)
+    b = sub.add_parser("bench", help="file → feature matrix per format vs pandas CSV")
+    b.add_argument("csv")
+    b.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "convert":
+        n = convert(args.input, args.output, args.packed, args.id_col)
+        print(f"✅  {n:,} rows  →  {args.output}")
+    elif args.cmd == "score":
+        from model_artifact import load_tree
+        run(args.input, args.output, load_tree(args.model), args.id_col, args.batch_rows)
+    else:
+        bench(args.csv, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Shared prediction core for the Heart Disease app.
+
+Everything here is importable without Streamlit so the batch tools, the
+HTTP service and the app all agree on feature order, labels and risk bands.
+"""
+import os
+import pickle
+
+import numpy as np
+
+from metrics import timed
+
+# Pickle or .hdt artifact (see model_artifact); override with HEART_MODEL_PATH.
+MODEL_PATH = os.environ.get(
+    "HEART_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "heart_disease_model.pkl"))
+
+FEATURE_NAMES = ['age','sex','cp','trestbps','chol','fbs','restecg',
+                 'thalach','exang','oldpeak','slope','ca','thal']
+FEATURE_LABELS = ['Age','Sex','Chest Pain Type','Resting BP','Cholesterol',
+                  'Fasting Blood Sugar','Rest ECG','Max Heart Rate',
+                  'Exercise Angina','ST Depression','ST Slope',
+                  'Major Vessels','Thalassemia']
+CLASS_NAMES = ['No Disease', 'Heart Disease']
+
+# Every value the sidebar widgets can produce, in FEATURE_NAMES order.
+FEATURE_DOMAINS = {
+    'age':      np.arange(29, 78),
+    'sex':      np.array([0, 1]),
+    'cp':       np.array([0, 1, 2, 3]),
+    'trestbps': np.arange(94, 201),
+    'chol':     np.arange(126, 565),
+    'fbs':      np.array([0, 1]),
+    'restecg':  np.array([0, 1, 2]),
+    'thalach':  np.arange(71, 203),
+    'exang':    np.array([0, 1]),
+    'oldpeak':  np.round(np.arange(0, 63) * 0.1, 1),
+    'slope':    np.array([0, 1, 2]),
+    'ca':       np.array([0, 1, 2, 3]),
+    'thal':     np.array([1, 2, 3]),
+}
+
+
+# ─────────────────────────────────────────────────────────────────
+# MODEL
+# ─────────────────────────────────────────────────────────────────
+def load_model(path=MODEL_PATH):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def model_stamp(path=MODEL_PATH):
+    """(path, mtime_ns, size): changes whenever the model file is replaced."""
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+# ─────────────────────────────────────────────────────────────────
+# HELPERS
+# ─────────────────────────────────────────────────────────────────
+def patient_vector(patient):
+    """The 13 feature values in FEATURE_NAMES order.
+
+    Accepts a {feature_name: value} mapping or a 13-value sequence; raises
+    ValueError on missing, unknown or non-numeric features.
+    """
+    if isinstance(patient, dict):
+        missing = [f for f in FEATURE_NAMES if f not in patient]
+        unknown = [k for k in patient if k not in FEATURE_NAMES]
+        if missing or unknown:
+            raise ValueError(f"missing features {missing}, unknown features {unknown}; "
+                             f"expected {FEATURE_NAMES}")
+        values = [patient[f] for f in FEATURE_NAMES]
+    elif isinstance(patient, (list, tuple)):
+        values = list(patient)
+        if len(values) != len(FEATURE_NAMES):
+            raise ValueError(f"expected {len(FEATURE_NAMES)} values {FEATURE_NAMES}, "
+                             f"got {len(values)}")
+    else:
+        raise ValueError("patient must be an object keyed by feature name or a list")
+    try:
+        values = [float(v) for v in values]
+    except (TypeError, ValueError):
+        raise ValueError("feature values must be numeric") from None
+    if not np.isfinite(values).all():
+        raise ValueError("feature values must be finite")
+    return values
+
+
+@timed("decision_path")
+def get_decision_path(tree, input_array, nodes=None):
+    """Human-readable steps for row 0 of `input_array`.
+
+    `tree` is a compiled tree (see tree_engine).  Pass `nodes` when the
+    node path is already known from a scoring pass to skip re-traversal.
+    """
+    if nodes is None:
+        nodes = tree.score(input_array).path[0]
+    nodes = [int(n) for n in nodes if n >= 0]
+    path  = []
+    for node, nxt in zip(nodes[:-1], nodes[1:]):
+        fidx  = int(tree.feature[node])
+        thr   = float(tree.threshold[node])
+        val   = input_array[0, fidx]
+        if nxt == tree.children_left[node]:
+            direction = "LEFT  ≤"
+            side = "left"
+        else:
+            direction = "RIGHT >"
+            side = "right"
+        path.append({"feature": FEATURE_LABELS[fidx], "value": val, "threshold": thr,
+                     "direction": direction, "side": side, "node": node})
+    leaf     = nodes[-1]
+    vals     = tree.proba[leaf]
+    cls_idx  = int(np.argmax(vals))
+    conf     = vals[cls_idx] / vals.sum() * 100
+    path.append({"leaf": True, "class": CLASS_NAMES[cls_idx], "confidence": conf,
+                 "samples": int(tree.n_node_samples[leaf]), "cls_idx": cls_idx,
+                 "node": leaf})
+    return path
+
+
+# Disease probability cut-offs: < 0.30 low, < 0.55 moderate, else high.
+RISK_BANDS  = [0.30, 0.55]
+RISK_LABELS = ["LOW RISK", "MODERATE RISK", "HIGH RISK"]
+RISK_COLORS = ["#2ecc71", "#f39c12", "#e74c3c"]
+
+
+def risk_band(prob):
+    """Band index (0 low · 1 moderate · 2 high); works on scalars and arrays."""
+    return np.searchsorted(RISK_BANDS, prob, side="right")
+
+
+def risk_color(prob):
+    return RISK_COLORS[int(risk_band(prob))]
+
+
+def risk_label(prob):
+    return RISK_LABELS[int(risk_band(prob))]
+
+
+def risk_labels(probs):
+    return np.array(RISK_LABELS)[risk_band(probs)]
+
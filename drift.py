@@ -0,0 +1,503 @@
+"""
+Streaming input-drift monitor.
+
+Every scored row (13 features, predicted class, leaf id) is counted into
+fixed-bin histograms in constant memory:
+
+    features  bins cut at the tree's split thresholds on that feature, plus
+              a few evenly spaced edges across the sidebar domain so drift
+              between splits (e.g. in chol) still shows
+    class     predicted class counts
+    leaf      leaf hit counts
+
+A sliding window of the last `window` rows is kept as a ring of `blocks`
+sub-histograms: an update increments one slot per group in the current
+block (a plain list, so that is 15 dict lookups and list increments),
+and when the block fills it is retired into the ring, replacing the
+oldest.  Updates are O(1) per row and memory does not grow with traffic.
+
+The window is compared against a reference distribution with PSI (every
+group) and a binned two-sample KS test (features).  The reference comes
+from a cohort file (`python drift.py reference`), or the leaf and class
+frequencies of the training set (n_node_samples at the leaves), with the
+feature histograms frozen from the first full window.
+
+State is saved to an .npz file every `interval` seconds by a background
+thread and resumed on start, as long as it was built for the same tree
+and window.
+
+    python drift.py                                  # self-check on synthetic drift
+    python drift.py reference cohort.csv --out drift_reference.npz
+    python drift.py report --state drift_state.npz
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import metrics
+from core import CLASS_NAMES, FEATURE_DOMAINS, FEATURE_LABELS, FEATURE_NAMES, MODEL_PATH
+
+DOMAIN_BINS = 8
+PSI_BANDS   = (0.10, 0.25)                  # < 0.10 stable · < 0.25 moderate · else major
+PSI_STATUS  = ("stable", "moderate", "major")
+MIN_ROWS    = 100
+
+
+def feature_edges(tree, fidx, domain_bins=DOMAIN_BINS):
+    """Sorted bin edges for feature `fidx`: every split threshold plus
+    `domain_bins - 1` edges halfway between sidebar values (one between
+    every pair of values for small categorical domains).
+
+    A value falls in bin k when edges[k-1] < float32(x) <= edges[k], the
+    same side of every split as the tree sends it.
+    """
+    from tree_engine import split_thresholds
+    edges = set(split_thresholds(tree, fidx).tolist())
+    dom   = np.unique(FEATURE_DOMAINS[FEATURE_NAMES[fidx]].astype(np.float64))
+    if len(dom) > domain_bins:
+        cuts = np.linspace(0, len(dom) - 1, domain_bins + 1)[1:-1].astype(int)
+    else:
+        cuts = np.arange(len(dom) - 1)
+    edges.update(((dom[cuts] + dom[cuts + 1]) / 2).tolist())
+    return np.array(sorted(edges))
+
+
+def psi(p_counts, q_counts):
+    """Population stability index of counts `p` against reference `q`."""
+    k = len(p_counts)
+    p = (p_counts + 0.5) / (p_counts.sum() + 0.5 * k)
+    q = (q_counts + 0.5) / (q_counts.sum() + 0.5 * k)
+    return float(((p - q) * np.log(p / q)).sum())
+
+
+def ks(p_counts, q_counts):
+    """(D, p-value) of a two-sample KS test on binned counts.
+
+    The asymptotic p-value; binning makes it conservative.
+    """
+    from scipy.special import kolmogorov
+    n, m = p_counts.sum(), q_counts.sum()
+    if not n or not m:
+        return 0.0, 1.0
+    d = float(np.abs(np.cumsum(p_counts) / n - np.cumsum(q_counts) / m).max())
+    return d, float(kolmogorov(d * np.sqrt(n * m / (n + m))))
+
+
+def psi_status(value):
+    return PSI_STATUS[int(np.searchsorted(PSI_BANDS, value, side="right"))]
+
+
+class DriftMonitor:
+    """Sliding-window histograms of what the model sees, for one tree."""
+
+    def __init__(self, tree, window=10_000, blocks=10, domain_bins=DOMAIN_BINS):
+        if window < blocks or blocks < 2:
+            raise ValueError(f"need window >= blocks >= 2, got window={window}, blocks={blocks}")
+        self.tree        = tree
+        self.fingerprint = tree.fingerprint()
+        self.window      = window
+        self.block_size  = window // blocks
+        self.edges       = [feature_edges(tree, f, domain_bins) for f in range(len(FEATURE_NAMES))]
+        self.leaves      = np.flatnonzero(tree.is_leaf)
+
+        # One flat counts vector: 13 feature histograms, then classes, then leaves.
+        sizes  = [len(e) + 1 for e in self.edges] + [len(tree.classes), len(self.leaves)]
+        starts = np.concatenate([[0], np.cumsum(sizes)])
+        self.groups = [slice(int(a), int(b)) for a, b in zip(starts[:-1], starts[1:])]
+        self.size   = int(starts[-1])
+        self._class_slot = {c.item(): self.groups[-2].start + i for i, c in enumerate(tree.classes)}
+        self._leaf_slot  = np.full(tree.node_count, -1, dtype=np.intp)
+        self._leaf_slot[self.leaves] = self.groups[-1].start + np.arange(len(self.leaves))
+        self._leaf_list  = self._leaf_slot.tolist()
+        self._edge_lists = [e.tolist() for e in self.edges]
+        self._bin_of     = []
+        for f, name in enumerate(FEATURE_NAMES):
+            dom = np.unique(FEATURE_DOMAINS[name].astype(np.float64))
+            self._bin_of.append(dict(zip(dom.tolist(), (self.groups[f].start + self._bins(f, dom)).tolist())))
+
+        # Retired blocks; slot `current` is stale while _live fills.
+        self.blocks      = np.zeros((blocks, self.size), dtype=np.int64)
+        self.block_rows  = np.zeros(blocks, dtype=np.int64)
+        self.current     = 0
+        self.retired     = np.zeros(self.size, dtype=np.int64)
+        self.retired_rows = 0
+        self._live       = [0] * self.size
+        self._live_rows  = 0
+        self.reference   = np.zeros(self.size, dtype=np.float64)
+        self.ref_known   = np.zeros(len(self.groups), dtype=bool)
+        self.ref_source  = None
+        self.saved_at    = None
+        self.state_path  = None
+        self._lock       = threading.Lock()
+        self._stop       = threading.Event()
+        self._thread     = None
+        self.set_reference_from_tree()
+
+    def _bins(self, f, values):
+        """Global slot offsets within feature f's histogram for float values."""
+        return np.searchsorted(self.edges[f], np.asarray(values, dtype=np.float32), side="left")
+
+    # ── Updates ──────────────────────────────────────────────────
+    def slots(self, values, pred, leaf):
+        """The 15 counter slots one row increments."""
+        out = [bins.get(v) for bins, v in zip(self._bin_of, values)]
+        if None in out:                       # off the sidebar grid: bisect
+            for f, v in enumerate(values):
+                if out[f] is None:
+                    out[f] = self.groups[f].start + bisect.bisect_left(self._edge_lists[f],
+                                                                       float(np.float32(v)))
+        out.append(self._class_slot[pred])
+        out.append(self._leaf_list[leaf])
+        return out
+
+    def update(self, values, pred, leaf):
+        """Count one scored row; O(1)."""
+        idx = self.slots(values, pred, leaf)
+        with self._lock:
+            if self._live_rows >= self.block_size:
+                self._rotate()
+            live = self._live
+            for i in idx:
+                live[i] += 1
+            self._live_rows += 1
+
+    def _slot_matrix(self, X, pred, leaf):
+        X   = np.asarray(X, dtype=np.float64)
+        idx = np.empty((len(X), len(self.groups)), dtype=np.intp)
+        for f in range(len(FEATURE_NAMES)):
+            idx[:, f] = self.groups[f].start + self._bins(f, X[:, f])
+        idx[:, -2] = self.groups[-2].start + np.searchsorted(self.tree.classes, pred)
+        idx[:, -1] = self._leaf_slot[np.asarray(leaf, dtype=np.intp)]
+        return idx
+
+    def count(self, X, pred, leaf):
+        """Counts vector of many scored rows, outside the window."""
+        return np.bincount(self._slot_matrix(X, pred, leaf).ravel(), minlength=self.size)
+
+    def update_batch(self, X, pred, leaf):
+        """Count many scored rows at once; same result as update() per row."""
+        idx = self._slot_matrix(X, pred, leaf)
+        with self._lock:
+            done = 0
+            while done < len(idx):
+                if self._live_rows >= self.block_size:
+                    self._rotate()
+                take  = min(len(idx) - done, self.block_size - self._live_rows)
+                chunk = np.bincount(idx[done:done + take].ravel(), minlength=self.size)
+                self._live = (np.asarray(self._live, dtype=np.int64) + chunk).tolist()
+                self._live_rows += take
+                done            += take
+
+    def _rotate(self):
+        live = np.asarray(self._live, dtype=np.int64)
+        self.blocks[self.current]     = live
+        self.block_rows[self.current] = self._live_rows
+        self.retired      += live
+        self.retired_rows += self._live_rows
+        self.current    = (self.current + 1) % len(self.blocks)
+        self._live      = [0] * self.size
+        self._live_rows = 0
+        # The first time the window fills, freeze any reference groups still unknown.
+        if not self.ref_known.all() and self.block_rows.sum() >= self.window - self.block_size:
+            self._freeze(~self.ref_known, "first window")
+        metrics.count("drift_window_slides")
+
+    def _window(self):
+        """(counts, rows) of the live block plus the retired blocks still in the window."""
+        keep = np.arange(len(self.blocks)) != self.current
+        return (self.blocks[keep].sum(axis=0) + np.asarray(self._live, dtype=np.int64),
+                int(self.block_rows[keep].sum()) + self._live_rows)
+
+    @property
+    def rows(self):
+        return self.retired_rows + self._live_rows
+
+    def lifetime(self):
+        """Counts of every row seen, window or not."""
+        with self._lock:
+            return self.retired + np.asarray(self._live, dtype=np.int64)
+
+    # ── Reference ────────────────────────────────────────────────
+    def set_reference_from_tree(self):
+        """Leaf and class frequencies of the training set; features unknown."""
+        ref = np.zeros(self.size)
+        samples = self.tree.n_node_samples[self.leaves].astype(np.float64)
+        ref[self.groups[-1]] = samples
+        leaf_pred = np.argmax(self.tree.proba[self.leaves], axis=1)
+        ref[self.groups[-2]] = np.bincount(leaf_pred, weights=samples, minlength=len(self.tree.classes))
+        known = np.zeros(len(self.groups), dtype=bool)
+        known[-2:] = True
+        with self._lock:
+            self.reference, self.ref_known, self.ref_source = ref, known, "training leaves"
+
+    def set_reference(self, counts, source):
+        counts = np.asarray(counts, dtype=np.float64)
+        if counts.shape != (self.size,):
+            raise ValueError(f"reference has {counts.shape} slots, monitor has {self.size}")
+        with self._lock:
+            self.reference  = counts.copy()
+            self.ref_known  = np.ones(len(self.groups), dtype=bool)
+            self.ref_source = source
+
+    def _freeze(self, which, source):
+        window = self._window()[0]
+        for g in np.flatnonzero(which):
+            self.reference[self.groups[g]] = window[self.groups[g]]
+        self.ref_known |= which
+        self.ref_source = f"{self.ref_source} + {source}" if self.ref_source else source
+
+    def freeze_reference(self):
+        """Use the current window as the reference for every group."""
+        with self._lock:
+            self.ref_known[:] = False
+            self.ref_source   = None
+            self._freeze(np.ones(len(self.groups), dtype=bool),
+                         "window frozen " + datetime.now(timezone.utc).isoformat(timespec="seconds"))
+
+    def load_reference(self, path):
+        with np.load(path, allow_pickle=False) as z:
+            if str(z["fingerprint"]) != self.fingerprint:
+                raise ValueError(f"{path}: reference built for model {str(z['fingerprint'])[:12]}, "
+                                 f"monitor is for {self.fingerprint[:12]}")
+            self.set_reference(z["counts"], f"{os.path.basename(path)} ({int(z['rows']):,} rows)")
+
+    # ── Report ───────────────────────────────────────────────────
+    def bin_labels(self, f):
+        e = self.edges[f]
+        if not len(e):
+            return ["all"]
+        inner = ["(%g, %g]" % (a, b) for a, b in zip(e[:-1], e[1:])]
+        return [f"≤ {e[0]:g}"] + inner + [f"> {e[-1]:g}"]
+
+    def report(self):
+        """PSI / KS of the window against the reference, per group."""
+        with self._lock:
+            window, n = self._window()
+            ref     = self.reference.copy()
+            known   = self.ref_known.copy()
+            source  = self.ref_source
+        rows = []
+        names = FEATURE_LABELS + ["Predicted class", "Leaf"]
+        for g, sl in enumerate(self.groups):
+            row = {"group": names[g], "bins": sl.stop - sl.start, "psi": None,
+                   "ks": None, "ks_p": None, "status": "no reference"}
+            if known[g] and n >= MIN_ROWS:
+                row["psi"]    = psi(window[sl], ref[sl])
+                row["status"] = psi_status(row["psi"])
+                if g < len(FEATURE_NAMES):
+                    row["ks"], row["ks_p"] = ks(window[sl], ref[sl])
+            elif known[g]:
+                row["status"] = f"waiting for {MIN_ROWS} rows"
+            rows.append(row)
+        return {"fingerprint": self.fingerprint[:12], "rows": self.rows, "window_rows": n,
+                "window": self.window, "reference": source, "saved_at": self.saved_at,
+                "groups": rows,
+                "alerts": [r["group"] for r in rows if r["status"] in PSI_STATUS[1:]]}
+
+    def histograms(self, g):
+        """(labels, window counts, reference counts) for group index `g`."""
+        sl = self.groups[g]
+        with self._lock:
+            window = self._window()[0][sl]
+            ref    = self.reference[sl].copy()
+        if g < len(FEATURE_NAMES):
+            labels = self.bin_labels(g)
+        elif g == len(FEATURE_NAMES):
+            labels = [CLASS_NAMES[int(c)] for c in self.tree.classes]
+        else:
+            labels = [f"leaf {leaf}" for leaf in self.leaves]
+        return labels, window, ref
+
+    # ── Persistence ──────────────────────────────────────────────
+    def save(self, path):
+        with self._lock:
+            state = {"fingerprint": np.array(self.fingerprint), "window": self.window,
+                     "edges": np.concatenate(self.edges),
+                     "edge_counts": np.array([len(e) for e in self.edges]),
+                     "blocks": self.blocks.copy(), "block_rows": self.block_rows.copy(),
+                     "current": self.current, "retired": self.retired.copy(),
+                     "retired_rows": self.retired_rows,
+                     "live": np.asarray(self._live, dtype=np.int64), "live_rows": self._live_rows,
+                     "reference": self.reference.copy(),
+                     "ref_known": self.ref_known.copy(),
+                     "ref_source": np.array(self.ref_source or "")}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **state)
+        os.replace(tmp, path)
+        self.saved_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        return os.path.getsize(path)
+
+    def restore(self, path):
+        """Resume from a saved state; False if it is missing or for another layout."""
+        try:
+            z = np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            return False
+        with z:
+            same = (str(z["fingerprint"]) == self.fingerprint and int(z["window"]) == self.window
+                    and z["blocks"].shape == self.blocks.shape
+                    and np.array_equal(z["edges"], np.concatenate(self.edges)))
+            if not same:
+                return False
+            with self._lock:
+                self.blocks[:]     = z["blocks"]
+                self.block_rows[:] = z["block_rows"]
+                self.current       = int(z["current"])
+                self.retired[:]    = z["retired"]
+                self.retired_rows  = int(z["retired_rows"])
+                self._live         = z["live"].tolist()
+                self._live_rows    = int(z["live_rows"])
+                self.reference[:]  = z["reference"]
+                self.ref_known[:]  = z["ref_known"]
+                self.ref_source    = str(z["ref_source"]) or None
+        return True
+
+    def _autosave(self, path, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.save(path)
+            except OSError as e:              # never let the saver die
+                print(f"drift: could not save {path}: {e}", file=sys.stderr)
+
+    def start(self, path, interval=30.0):
+        """Resume from `path` and save to it every `interval` seconds."""
+        self.restore(path)
+        self.state_path = path
+        if interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._autosave, args=(path, interval),
+                                            name="drift-autosave", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.save(self.state_path)
+
+
+def open_monitor(tree, state_path=None, reference_path=None, window=10_000, interval=30.0):
+    """DriftMonitor for `tree`, resumed from and autosaved to `state_path`.
+
+    A reference built for another model is skipped with a warning; the
+    monitor then falls back to the training leaves + first window.
+    """
+    mon = DriftMonitor(tree, window)
+    if reference_path:
+        try:
+            mon.load_reference(reference_path)
+        except (OSError, ValueError) as e:
+            print(f"drift: reference not used: {e}", file=sys.stderr)
+    if state_path:
+        mon.start(state_path, interval)
+    return mon
+
+
+def build_reference(tree, X, path):
+    """Score the cohort `X` and save its counts as a reference for `tree`."""
+    res    = tree.score(X, return_path=False)
+    counts = DriftMonitor(tree).count(X, res.pred, res.leaf)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, fingerprint=np.array(tree.fingerprint()), counts=counts, rows=len(X))
+    os.replace(tmp, path)
+    return counts
+
+
+def main(argv=None):
+    import argparse
+    import json
+    import tempfile
+    import warnings
+    warnings.filterwarnings("ignore")
+    from model_artifact import load_tree
+    ap  = argparse.ArgumentParser(description="Input-drift monitoring.")
+    ap.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    sub = ap.add_subparsers(dest="cmd")
+    r   = sub.add_parser("reference", help="build a reference from a cohort CSV/Parquet")
+    r.add_argument("cohort")
+    r.add_argument("--out", default="drift_reference.npz")
+    p   = sub.add_parser("report", help="print the drift report of a saved state")
+    p.add_argument("--state", default="drift_state.npz")
+    args = ap.parse_args(argv)
+    tree = load_tree(args.model)
+
+    if args.cmd == "reference":
+        import pandas as pd
+        read = pd.read_parquet if args.cohort.lower().endswith(".parquet") else pd.read_csv
+        X    = read(args.cohort, columns=FEATURE_NAMES)[FEATURE_NAMES].to_numpy(dtype=np.float64)
+        build_reference(tree, X, args.out)
+        print(f"✅  wrote {args.out}  ({len(X):,} rows)")
+        return 0
+    if args.cmd == "report":
+        try:
+            with np.load(args.state, allow_pickle=False) as z:
+                mon = DriftMonitor(tree, int(z["window"]), len(z["blocks"]))
+        except FileNotFoundError:
+            print(f"❌  {args.state} not found")
+            return 1
+        if not mon.restore(args.state):
+            print(f"❌  {args.state}: built for another model")
+            return 1
+        print(json.dumps(mon.report(), indent=2))
+        return 0
+
+    # Self-check: reference cohort, then a stream where age and chol drift.
+    from model_registry import canary_batch
+    rng  = np.random.default_rng(0)
+    ref  = canary_batch(20_000, seed=1)
+    live = canary_batch(20_000, seed=2)
+    live[:, 0] = np.clip(live[:, 0] + 12, 29, 77)                    # older cohort
+    live[:, 4] = np.clip(live[:, 4] + rng.normal(60, 20, len(live)).round(), 126, 564)  # other lab
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        ref_path = os.path.join(tmp, "ref.npz")
+        build_reference(tree, ref, ref_path)
+
+        mon = DriftMonitor(tree, window=10_000)
+        mon.load_reference(ref_path)
+        res  = tree.score(live, return_path=False)
+        rows = live.tolist()
+        t0   = time.perf_counter()
+        for i, v in enumerate(rows):
+            mon.update(v, res.pred[i], res.leaf[i])
+        per_row = (time.perf_counter() - t0) / len(rows) * 1e6
+        batch = DriftMonitor(tree, window=10_000)
+        t0 = time.perf_counter()
+        batch.update_batch(live, res.pred, res.leaf)
+        per_row_batch = (time.perf_counter() - t0) / len(rows) * 1e9
+        same = (np.array_equal(mon._window()[0], batch._window()[0])
+                and np.array_equal(mon.lifetime(), batch.lifetime())
+                and np.array_equal(mon.lifetime(), mon.count(live, res.pred, res.leaf)))
+        ok  &= same
+        print(f"{'OK ' if same else 'MISMATCH'}  update() vs update_batch() over {len(rows):,} rows · "
+              f"{per_row:.1f} µs/row inline · {per_row_batch:.0f} ns/row batched · "
+              f"{mon.blocks.nbytes + mon.retired.nbytes:,} bytes of counters")
+
+        report = mon.report()
+        for g in report["groups"]:
+            ks_s = "" if g["ks"] is None else f"  KS {g['ks']:.3f} (p={g['ks_p']:.1e})"
+            print(f"  {g['group']:<20} {g['bins']:>3} bins  PSI {g['psi']:.3f}  {g['status']:<9}{ks_s}")
+        drifted = set(report["alerts"])
+        ok &= {"Age", "Cholesterol"} <= drifted
+        ok &= not drifted & {"Sex", "Resting BP", "Fasting Blood Sugar", "Thalassemia"}
+
+        state = os.path.join(tmp, "state.npz")
+        size  = mon.save(state)
+        back  = DriftMonitor(tree, window=10_000)
+        same  = back.restore(state) and back.report()["groups"] == report["groups"]
+        ok   &= bool(same)
+        print(f"{'OK ' if same else 'MISMATCH'}  state round trip ({size:,} bytes)")
+    print("✅  drift monitor OK" if ok else "❌  drift monitor failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Leaf hyper-rectangle index.
+
+Every leaf of the fitted tree is an axis-aligned box over the 13 features:
+a row lands in leaf i exactly when  lo[i] < x <= hi[i]  on every feature
+(x as float32, the dtype sklearn splits on).  With the boxes precomputed,
+"which leaf holds this patient", "which leaves are reachable if age is in
+[50, 60]" and "what region predicts disease" are array comparisons, not
+tree walks.
+
+    python leaf_index.py             # check locate() against tree.apply()
+"""
+import sys
+
+import numpy as np
+
+from core import CLASS_NAMES, FEATURE_LABELS, FEATURE_NAMES
+
+
+class LeafIndex:
+    def __init__(self, tree):
+        n_feat = len(FEATURE_NAMES)
+        leaves, lo, hi = [], [], []
+        stack = [(0, np.full(n_feat, -np.inf), np.full(n_feat, np.inf))]
+        while stack:
+            node, l, h = stack.pop()
+            if tree.is_leaf[node]:
+                leaves.append(node)
+                lo.append(l)
+                hi.append(h)
+                continue
+            f, thr = tree.feature[node], tree.threshold[node]
+            lh, rl = h.copy(), l.copy()
+            lh[f] = min(h[f], thr)
+            rl[f] = max(l[f], thr)
+            stack.append((tree.children_right[node], rl, h))
+            stack.append((tree.children_left[node], l, lh))
+        self.tree      = tree
+        self.leaves    = np.array(leaves, dtype=np.intp)
+        self.lo        = np.array(lo)
+        self.hi        = np.array(hi)
+        self.proba     = tree.proba[self.leaves]
+        self.n_samples = tree.n_node_samples[self.leaves]
+        self.pred      = tree.classes.take(np.argmax(self.proba, axis=1))
+        self._pos      = {int(leaf): i for i, leaf in enumerate(self.leaves)}
+
+    def __len__(self):
+        return len(self.leaves)
+
+    def position(self, leaf):
+        return self._pos[int(leaf)]
+
+    # ── Point lookup ─────────────────────────────────────────────
+    def locate(self, X, chunk=65_536):
+        """Leaf id per row via box containment, `chunk` rows at a time."""
+        X   = self.tree.validate(X)
+        out = np.empty(len(X), dtype=np.intp)
+        for s in range(0, len(X), chunk):
+            x  = X[s:s + chunk, None, :]
+            ok = ((x > self.lo) & (x <= self.hi)).all(axis=2)
+            out[s:s + chunk] = self.leaves[ok.argmax(axis=1)]
+        return out
+
+    # ── Range queries ────────────────────────────────────────────
+    def query(self, **ranges):
+        """Leaf ids whose box meets every inclusive range, e.g. age=(50, 60).
+
+        Either end of a range may be None for an open side.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        for name, (a, b) in ranges.items():
+            if name not in FEATURE_NAMES:
+                raise ValueError(f"unknown feature {name!r}; expected one of {FEATURE_NAMES}")
+            f = FEATURE_NAMES.index(name)
+            if a is not None:
+                keep &= np.float32(a) <= self.hi[:, f]
+            if b is not None:
+                keep &= np.float32(b) > self.lo[:, f]
+        return self.leaves[keep]
+
+    def region(self, cls=1):
+        """Leaf ids predicting class `cls`; their boxes tile that region."""
+        return self.leaves[self.pred == cls]
+
+    # ── Description ──────────────────────────────────────────────
+    def bounds(self, leaf):
+        """[(feature index, lo, hi)] for features the leaf actually constrains."""
+        i = self.position(leaf)
+        return [(f, self.lo[i, f], self.hi[i, f]) for f in range(len(FEATURE_NAMES))
+                if np.isfinite(self.lo[i, f]) or np.isfinite(self.hi[i, f])]
+
+    def describe(self, leaf):
+        """Readable constraints, e.g. ['55.50 < Age', 'Thalassemia ≤ 2.50']."""
+        out = []
+        for f, lo, hi in self.bounds(leaf):
+            label = FEATURE_LABELS[f]
+            if np.isfinite(lo) and np.isfinite(hi):
+                out.append(f"{lo:.2f} < {label} ≤ {hi:.2f}")
+            elif np.isfinite(lo):
+                out.append(f"{label} > {lo:.2f}")
+            else:
+                out.append(f"{label} ≤ {hi:.2f}")
+        return out
+
+    def summary(self, leaf):
+        i = self.position(leaf)
+        return {"leaf": int(leaf), "class": CLASS_NAMES[int(self.pred[i])],
+                "proba": self.proba[i].tolist(), "samples": int(self.n_samples[i]),
+                "region": self.describe(leaf)}
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    from core import MODEL_PATH
+    from model_artifact import load_tree
+    from tree_engine import check_grid
+    ap = argparse.ArgumentParser(description="Check the leaf index against tree traversal.")
+    ap.add_argument("--model", default=MODEL_PATH)
+    ap.add_argument("--rows", type=int, default=200_000)
+    args = ap.parse_args(argv)
+
+    tree  = load_tree(args.model)
+    index = LeafIndex(tree)
+    X     = check_grid(tree, args.rows)
+    bad   = int((index.locate(X) != tree.apply(X)[0]).sum())
+    print(f"{'OK ' if bad == 0 else 'MISMATCH'}  {len(X):,} rows · {len(index)} leaves · "
+          f"{bad} disagreements")
+    print(f"leaves reachable with 50 ≤ age ≤ 60: {index.query(age=(50, 60)).tolist()}")
+    print(f"leaves predicting {CLASS_NAMES[1]}:  {index.region(1).tolist()}")
+    return 0 if bad == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
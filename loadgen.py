@@ -0,0 +1,128 @@
+"""
+Local load generator for service.py.
+
+Opens C keep-alive connections per concurrency level, each firing POSTs
+with random sidebar-domain patients, and reports p50/p99 latency and
+requests/sec.  Without --port a service is spawned on a free local port,
+with the lookup table and response cache off so every request goes
+through the micro-batcher (--fast-path keeps them on).  Each level gets
+its own fresh patients.
+
+    python loadgen.py --concurrency 1,8,32,128 --requests 5000
+    python loadgen.py --port 8000 --endpoint /decision-path
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from core import FEATURE_DOMAINS, FEATURE_NAMES
+
+
+def random_patients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = {f: rng.choice(FEATURE_DOMAINS[f], n).tolist() for f in FEATURE_NAMES}
+    return [json.dumps({f: cols[f][i] for f in FEATURE_NAMES}).encode() for i in range(n)]
+
+
+async def _worker(host, port, endpoint, bodies, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            t0 = time.perf_counter()
+            writer.write(f"POST {endpoint} HTTP/1.1\r\nHost: {host}\r\n"
+                         f"Content-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            if b" 200 " not in status:
+                raise RuntimeError(f"{endpoint}: {status.decode().strip()}")
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, endpoint, concurrency, bodies):
+    per = max(1, len(bodies) // concurrency)
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker(host, port, endpoint, bodies[i * per:(i + 1) * per], latencies)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1e3
+    return {"concurrency": concurrency, "requests": len(lat),
+            "rps": len(lat) / elapsed,
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p99_ms": float(np.percentile(lat, 99))}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _spawn_service(port, extra):
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, os.path.join(here, "service.py"),
+                             "--port", str(port)] + extra, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise SystemExit("❌  service did not start")
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Load-test the prediction service.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, help="existing service; spawn one if omitted")
+    ap.add_argument("--endpoint", default="/predict")
+    ap.add_argument("--concurrency", default="1,8,32,128")
+    ap.add_argument("--requests", type=int, default=5000, help="per concurrency level")
+    ap.add_argument("--max-batch", type=int, default=64, help="for a spawned service")
+    ap.add_argument("--max-wait-us", type=int, default=500, help="for a spawned service")
+    ap.add_argument("--fast-path", action="store_true",
+                    help="spawned service keeps its lookup table and response cache")
+    args = ap.parse_args(argv)
+
+    proc, port = None, args.port
+    if port is None:
+        port = _free_port()
+        extra = [] if args.fast_path else ["--no-lookup-table", "--cache-size", "0"]
+        proc  = _spawn_service(port, ["--max-batch", str(args.max_batch),
+                                      "--max-wait-us", str(args.max_wait_us)] + extra)
+    try:
+        print(f"{'conc':>6} {'requests':>9} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for level, c in enumerate(int(c) for c in args.concurrency.split(",")):
+            # New patients per level: replaying one set would be served from the cache.
+            bodies = random_patients(args.requests, seed=level)
+            r = asyncio.run(run_level(args.host, port, args.endpoint, c, bodies))
+            print(f"{r['concurrency']:>6} {r['requests']:>9} {r['rps']:>10,.0f} "
+                  f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Dense lookup table over the tree's threshold bins.
+
+The thresholds on a feature cut its axis into bins.  Every value in a bin
+takes the same branches, so a patient is fully described by 13 bin numbers.
+The product of the bin counts is small (under 2,000 cells for the bundled
+model), so the leaf of every cell is precomputed.  A single-row prediction
+is then one flat index (Σ bin × stride) into that table: constant time,
+no tree walk.
+
+    python lookup_table.py build --out heart_disease_model.lut
+    python lookup_table.py check [--table heart_disease_model.lut]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from core import FEATURE_DOMAINS, FEATURE_NAMES
+
+MAX_CELLS = 1 << 22
+
+
+def _bin_representatives(thr):
+    """One float32 value inside each bin cut by the sorted thresholds `thr`.
+
+    Rows go left when float32(x) <= thr, so bin k is (thr[k-1], thr[k]].
+    """
+    if not len(thr):
+        return np.zeros(1, dtype=np.float32)
+    reps = []
+    for k in range(len(thr) + 1):
+        if k < len(thr):
+            v = np.float32(thr[k])
+            if v > thr[k]:
+                v = np.nextafter(v, np.float32(-np.inf))
+        else:
+            v = np.float32(thr[k - 1])
+            if v <= thr[k - 1]:
+                v = np.nextafter(v, np.float32(np.inf))
+        reps.append(v)
+    return np.array(reps, dtype=np.float32)
+
+
+def _node_paths(tree):
+    """(node_count, max_depth + 1) root-to-node paths padded with -1."""
+    paths = np.full((tree.node_count, tree.max_depth + 1), -1, dtype=np.int32)
+    paths[0, 0] = 0
+    stack = [(0, 0)]
+    while stack:
+        node, d = stack.pop()
+        if tree.is_leaf[node]:
+            continue
+        for child in (tree.children_left[node], tree.children_right[node]):
+            paths[child, :d + 1] = paths[node, :d + 1]
+            paths[child, d + 1]  = child
+            stack.append((child, d + 1))
+    return paths
+
+
+class LookupTable:
+    """Leaf id for every combination of per-feature threshold bins."""
+
+    def __init__(self, thresholds, cells, proba, classes, paths, fingerprint):
+        self.thresholds  = [np.asarray(t, dtype=np.float64) for t in thresholds]
+        self.bins        = np.array([len(t) + 1 for t in self.thresholds], dtype=np.int64)
+        self.strides     = np.ones(len(self.bins), dtype=np.int64)
+        self.strides[:-1] = np.cumprod(self.bins[::-1])[-2::-1]
+        self.cells       = np.asarray(cells).reshape(-1)
+        self.proba       = np.asarray(proba, dtype=np.float64)
+        self.classes     = np.asarray(classes)
+        self.paths       = np.asarray(paths)
+        self.fingerprint = str(fingerprint)
+        if self.cells.size != int(np.prod(self.bins)):
+            raise ValueError(f"table has {self.cells.size} cells, bins {self.bins.tolist()} "
+                             f"need {int(np.prod(self.bins))}")
+        self.pred = self.classes.take(np.argmax(self.proba, axis=1))
+
+        # Single-row fast path: every sidebar value maps straight to its
+        # bin offset; anything else goes through _offset().
+        self._offsets = []
+        for f, name in enumerate(FEATURE_NAMES):
+            dom  = FEATURE_DOMAINS[name].astype(np.float64)
+            bins = np.searchsorted(self.thresholds[f], dom.astype(np.float32))
+            self._offsets.append(dict(zip(dom.tolist(), (bins * self.strides[f]).tolist())))
+        self._answers = []
+        for leaf in self.cells.tolist():
+            proba = self.proba[leaf].copy()
+            proba.flags.writeable = False
+            self._answers.append((self.pred[leaf], proba, leaf))
+
+    @classmethod
+    def from_tree(cls, tree, max_cells=MAX_CELLS):
+        thresholds = [np.unique(tree.threshold[~tree.is_leaf & (tree.feature == f)])
+                      for f in range(len(FEATURE_NAMES))]
+        n_cells = int(np.prod([len(t) + 1 for t in thresholds]))
+        if n_cells > max_cells:
+            raise ValueError(f"lookup table would need {n_cells:,} cells "
+                             f"(limit {max_cells:,})")
+        reps  = [_bin_representatives(t) for t in thresholds]
+        mesh  = np.meshgrid(*reps, indexing="ij")
+        X     = np.column_stack([m.ravel() for m in mesh])
+        cells = tree.apply(X)[0].astype(np.int32)
+        return cls(thresholds, cells, tree.proba, tree.classes, _node_paths(tree),
+                   tree.fingerprint())
+
+    def __len__(self):
+        return self.cells.size
+
+    # ── Lookup ───────────────────────────────────────────────────
+    def _offset(self, f, x):
+        x = np.float32(x)
+        if not np.isfinite(x):
+            raise ValueError("feature values must be finite")
+        return int(np.searchsorted(self.thresholds[f], x)) * int(self.strides[f])
+
+    def index(self, values):
+        """Flat cell index for one patient's 13 values."""
+        if len(values) != len(FEATURE_NAMES):
+            raise ValueError(f"expected {len(FEATURE_NAMES)} values {FEATURE_NAMES}, "
+                             f"got {len(values)}")
+        idx = 0
+        for f, x in enumerate(values):
+            off = self._offsets[f].get(x)
+            idx += self._offset(f, x) if off is None else off
+        return idx
+
+    def predict_one(self, values):
+        """(class, proba, leaf) for one patient; proba is read-only."""
+        return self._answers[self.index(values)]
+
+    def score_one(self, values):
+        """(x, pred, proba, leaf, nodes), the same tuple as MicroBatcher."""
+        pred, proba, leaf = self._answers[self.index(values)]
+        return (np.array([values], dtype=np.float64), pred, proba, leaf,
+                self.paths[leaf])
+
+    def lookup(self, X):
+        """Vectorized (pred, proba, leaf) for an (n, 13) array."""
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(FEATURE_NAMES))
+        if not np.isfinite(X).all():
+            raise ValueError("input contains NaN or infinity")
+        idx = np.zeros(len(X), dtype=np.int64)
+        for f, thr in enumerate(self.thresholds):
+            if len(thr):
+                idx += np.searchsorted(thr, X[:, f]) * self.strides[f]
+        leaf = self.cells[idx]
+        return self.pred[leaf], self.proba[leaf], leaf
+
+    # ── Persistence ──────────────────────────────────────────────
+    def save(self, path):
+        """Write the table to `path` (NumPy .npz, no pickled objects)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, thresholds=np.concatenate(self.thresholds), bins=self.bins,
+                     cells=self.cells, proba=self.proba, classes=self.classes,
+                     paths=self.paths, fingerprint=np.array(self.fingerprint))
+        os.replace(tmp, path)
+        return os.path.getsize(path)
+
+
+def load_table(path, tree=None):
+    """LookupTable from `path`; with `tree`, refuse a table built for another model."""
+    with np.load(path, allow_pickle=False) as z:
+        edges = np.cumsum(z["bins"] - 1)[:-1]
+        table = LookupTable(np.split(z["thresholds"], edges), z["cells"], z["proba"],
+                            z["classes"], z["paths"], z["fingerprint"])
+    if tree is not None and table.fingerprint != tree.fingerprint():
+        raise ValueError(f"{path}: built for model {table.fingerprint[:12]}, "
+                         f"loaded model is {tree.fingerprint()[:12]}")
+    return table
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    from core import MODEL_PATH
+    from model_artifact import load_tree
+    from tree_engine import check_grid, exhaustive_grid
+    ap  = argparse.ArgumentParser(description="Build or check the bin lookup table.")
+    ap.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b   = sub.add_parser("build", help="precompile the table for --model")
+    b.add_argument("--out", default="heart_disease_model.lut")
+    c   = sub.add_parser("check", help="compare with tree traversal and time lookups")
+    c.add_argument("--table", help="saved table (default: build in memory)")
+    args = ap.parse_args(argv)
+
+    tree  = load_tree(args.model)
+    t0    = time.perf_counter()
+    table = load_table(args.table, tree) if args.cmd == "check" and args.table \
+        else LookupTable.from_tree(tree)
+    build_ms = (time.perf_counter() - t0) * 1e3
+
+    if args.cmd == "build":
+        size = table.save(args.out)
+        print(f"✅  wrote {args.out}  ({size:,} bytes, {len(table):,} cells, "
+              f"bins {table.bins.tolist()}, {build_ms:.1f} ms)")
+        return 0
+
+    X   = exhaustive_grid(tree)
+    res = tree.score(X, return_path=False)
+    pred, proba, leaf = table.lookup(X)
+    bad = int(((pred != res.pred) | (leaf != res.leaf)
+               | (proba != res.proba).any(axis=1)).sum())
+    rows = check_grid(tree, 20_000).tolist()
+    bad += sum(table.predict_one(r)[2] != l for r, l in zip(rows, tree.apply(rows)[0]))
+
+    def per_call(fn):
+        t0 = time.perf_counter()
+        for r in rows:
+            fn(r)
+        return (time.perf_counter() - t0) / len(rows) * 1e6
+
+    print(f"{'OK ' if bad == 0 else 'MISMATCH'}  {len(X):,} grid rows + {len(rows):,} "
+          f"single rows · {len(table):,} cells · {bad} disagreements")
+    print(f"single row: table {per_call(table.predict_one):.2f} µs · "
+          f"tree.score {per_call(lambda r: tree.score([r], return_path=False)):.2f} µs")
+    return 0 if bad == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+In-process timing and counters for the hot paths.
+
+Histograms keep a rolling window of recent samples for p50/p95/p99 plus
+running count and sum; counters only ever go up.  Everything lives in one
+process-wide registry, shared by every Streamlit session or by the HTTP
+service, and exports as Prometheus text: the service answers GET /metrics,
+and the app starts a scrape endpoint when HEART_METRICS_PORT is set.
+
+Set HEART_METRICS=0 to disable collection.  `timer()` then hands back a
+shared no-op context manager, and `timed()` leaves functions undecorated,
+so the cost of a disabled timer is one function call.
+
+    python metrics.py                # overhead per timer, sample export
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+ENABLED   = os.environ.get("HEART_METRICS", "1") != "0"
+PREFIX    = "heart_"
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW    = 1024
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NULL = nullcontext()
+
+
+class Histogram:
+    """Rolling window of the last `window` observations, in seconds."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count   = 0
+        self.sum     = 0.0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.sum   += seconds
+
+    def quantiles(self, qs=QUANTILES):
+        if not self.samples:
+            return [float("nan")] * len(qs)
+        s = sorted(self.samples)
+        return [s[min(len(s) - 1, int(q * len(s)))] for q in qs]
+
+
+class _Timer:
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class Registry:
+    def __init__(self, window=WINDOW):
+        self.window     = window
+        self.histograms = {}
+        self.counters   = {}
+        self._lock      = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def histogram(self, name, **labels):
+        key  = self._key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(key, Histogram(self.window))
+        return hist
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def timer(self, name, **labels):
+        return _Timer(self.histogram(name, **labels))
+
+    def count(self, name, n=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    # ── Export ───────────────────────────────────────────────────
+    def snapshot(self):
+        """One dict per histogram and counter, sorted by name."""
+        rows = []
+        for (name, labels), h in sorted(self.histograms.items()):
+            p50, p95, p99 = h.quantiles()
+            rows.append({"metric": name, "labels": dict(labels), "count": h.count,
+                         "mean_ms": h.sum / h.count * 1e3 if h.count else 0.0,
+                         "p50_ms": p50 * 1e3, "p95_ms": p95 * 1e3, "p99_ms": p99 * 1e3})
+        for (name, labels), v in sorted(self.counters.items()):
+            rows.append({"metric": name, "labels": dict(labels), "count": v})
+        return rows
+
+    def prometheus_text(self):
+        """Prometheus text exposition (format 0.0.4): summaries and counters."""
+        def fmt(labels, **extra):
+            items = list(labels) + list(extra.items())
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+        out, seen = [], set()
+        for (name, labels), h in sorted(self.histograms.items()):
+            metric = f"{PREFIX}{name}_seconds"
+            if metric not in seen:
+                seen.add(metric)
+                out.append(f"# TYPE {metric} summary")
+            for q, v in zip(QUANTILES, h.quantiles()):
+                out.append(f"{metric}{fmt(labels, quantile=q)} {_number(v)}")
+            out.append(f"{metric}_sum{fmt(labels)} {_number(h.sum)}")
+            out.append(f"{metric}_count{fmt(labels)} {h.count}")
+        for (name, labels), v in sorted(self.counters.items()):
+            metric = f"{PREFIX}{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                out.append(f"# TYPE {metric} counter")
+            out.append(f"{metric}{fmt(labels)} {v}")
+        return "\n".join(out) + "\n"
+
+
+def _number(v):
+    return "NaN" if v != v else repr(float(v))
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+# ─────────────────────────────────────────────────────────────────
+# MODULE-LEVEL API
+# ─────────────────────────────────────────────────────────────────
+def timer(name, **labels):
+    """Context manager timing its block into histogram `name`."""
+    return REGISTRY.timer(name, **labels) if ENABLED else _NULL
+
+
+def observe(name, seconds, **labels):
+    if ENABLED:
+        REGISTRY.observe(name, seconds, **labels)
+
+
+def count(name, n=1, **labels):
+    if ENABLED:
+        REGISTRY.count(name, n, **labels)
+
+
+def timed(name, **labels):
+    """Decorator form of timer(); a no-op when metrics are disabled."""
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        hist = REGISTRY.histogram(name, **labels)
+
+        def timed_fn(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - t0)
+        timed_fn.__name__     = fn.__name__
+        timed_fn.__qualname__ = fn.__qualname__
+        timed_fn.__doc__      = fn.__doc__
+        timed_fn.__wrapped__  = fn
+        return timed_fn
+    return wrap
+
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+
+def prometheus_text():
+    return REGISTRY.prometheus_text()
+
+
+def reset():
+    REGISTRY.reset()
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve GET /metrics from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Measure timer overhead and show an export.")
+    ap.add_argument("--calls", type=int, default=200_000)
+    args = ap.parse_args(argv)
+
+    def per_call(cm_factory):
+        t0 = time.perf_counter()
+        for _ in range(args.calls):
+            with cm_factory():
+                pass
+        return (time.perf_counter() - t0) / args.calls * 1e9
+
+    global ENABLED
+    base     = per_call(lambda: _NULL)
+    enabled  = per_call(lambda: REGISTRY.timer("overhead_check"))
+    ENABLED, saved = False, ENABLED
+    disabled = per_call(lambda: timer("overhead_check"))
+    ENABLED  = saved
+    print(f"empty with-block {base:.0f} ns · disabled timer {disabled:.0f} ns · "
+          f"enabled timer {enabled:.0f} ns per call")
+    REGISTRY.count("overhead_checks", args.calls)
+    print()
+    print(prometheus_text(), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Compact, non-pickle model artifact (.hdt) with memory-mapped loading.
+
+Layout (little-endian):
+
+    8 bytes   magic  b"HDTREE\\0\\0"
+    4 bytes   format version (uint32)
+    4 bytes   header length in bytes (uint32)
+    header    UTF-8 JSON: metadata, array table, SHA-256 of the data section
+    padding   to a 64-byte boundary
+    data      node arrays, each starting on a 64-byte boundary
+
+The loader maps the file with np.memmap and builds the CompiledTree from
+views into it, so N worker processes share one page-cache copy and no
+sklearn import is needed.
+
+    python model_artifact.py export heart_disease_model.pkl heart_disease_model.hdt
+    python model_artifact.py info heart_disease_model.hdt
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from core import load_model
+from tree_engine import CompiledTree, compile_model
+
+MAGIC          = b"HDTREE\0\0"
+FORMAT_VERSION = 1
+ALIGN          = 64
+PREAMBLE       = struct.Struct("<8sII")
+
+ARRAY_DTYPES = {
+    "feature":        "<i8",
+    "threshold":      "<f8",
+    "children_left":  "<i8",
+    "children_right": "<i8",
+    "proba":          "<f8",
+    "n_node_samples": "<i8",
+    "classes":        "<i8",
+}
+
+
+def _pad(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def is_artifact(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# ─────────────────────────────────────────────────────────────────
+# EXPORT
+# ─────────────────────────────────────────────────────────────────
+def export_artifact(tree, path):
+    """Write `tree` (a CompiledTree) to `path` atomically."""
+    if not np.issubdtype(tree.classes.dtype, np.integer):
+        raise ValueError(f"only integer class labels are supported, got {tree.classes.dtype}")
+    arrays, table, offset = {}, [], 0
+    for name, dtype in ARRAY_DTYPES.items():
+        arr = np.ascontiguousarray(getattr(tree, name), dtype=dtype)
+        offset = _pad(offset)
+        table.append({"name": name, "dtype": dtype, "shape": list(arr.shape),
+                      "offset": offset})
+        arrays[name] = arr
+        offset += arr.nbytes
+    data = bytearray(_pad(offset))
+    for entry in table:
+        raw = arrays[entry["name"]].tobytes()
+        data[entry["offset"]:entry["offset"] + len(raw)] = raw
+
+    header = json.dumps({"meta": tree.meta, "node_count": tree.node_count,
+                         "arrays": table, "data_bytes": len(data),
+                         "sha256": hashlib.sha256(data).hexdigest()}).encode()
+    head = PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)) + header
+    head += b"\0" * (_pad(len(head)) - len(head))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(head)
+        f.write(data)
+    os.replace(tmp, path)
+    return len(head) + len(data)
+
+
+# ─────────────────────────────────────────────────────────────────
+# LOAD
+# ─────────────────────────────────────────────────────────────────
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, header_len = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a model artifact (bad magic)")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}: artifact format v{version}, "
+                             f"this build reads v{FORMAT_VERSION}")
+        header = json.loads(f.read(header_len))
+    header["data_offset"] = _pad(PREAMBLE.size + header_len)
+    return header
+
+
+def load_artifact(path, verify=True):
+    """CompiledTree backed by read-only memory-mapped views of `path`."""
+    header = read_header(path)
+    mm = np.memmap(path, dtype=np.uint8, mode="r", offset=header["data_offset"],
+                   shape=(header["data_bytes"],))
+    if verify and hashlib.sha256(mm).hexdigest() != header["sha256"]:
+        raise ValueError(f"{path}: checksum mismatch, artifact is corrupt")
+    views = {}
+    for entry in header["arrays"]:
+        views[entry["name"]] = np.ndarray(tuple(entry["shape"]), entry["dtype"],
+                                          buffer=mm, offset=entry["offset"])
+    return CompiledTree(meta=header["meta"], **views)
+
+
+def load_any(path):
+    """(sklearn model or None, CompiledTree) from a .pkl or an .hdt artifact."""
+    if is_artifact(path):
+        return None, load_artifact(path)
+    model = load_model(path)
+    return model, compile_model(model)
+
+
+def load_tree(path):
+    return load_any(path)[1]
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    ap  = argparse.ArgumentParser(description="Export or inspect .hdt model artifacts.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex  = sub.add_parser("export", help="convert a pickled model to .hdt")
+    ex.add_argument("pickle")
+    ex.add_argument("output")
+    info = sub.add_parser("info", help="print an artifact's header")
+    info.add_argument("artifact")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "export":
+        model = load_model(args.pickle)
+        tree  = compile_model(model)
+        size  = export_artifact(tree, args.output)
+        check = load_artifact(args.output)
+        X = np.array([[54, 1, 0, 130, 240, 0, 0, 150, 0, 1.0, 0, 0, 1]])
+        assert (check.predict_proba(X) == tree.predict_proba(X)).all()
+        print(f"✅  wrote {args.output}  ({size:,} bytes, {tree.node_count} nodes, "
+              f"sha256 {read_header(args.output)['sha256'][:12]}…)")
+    else:
+        header = read_header(args.artifact)
+        load_artifact(args.artifact)
+        print(json.dumps({k: v for k, v in header.items() if k != "arrays"}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Hot-reloading model registry.
+
+A background thread watches the model file (mtime/size, then a SHA-256 of
+its bytes).  A changed file is loaded off the request path, compiled,
+given a lookup table and checked on a canary batch; only then is it
+published by swapping a single reference.  Callers take `current()` once
+per request or rerun and keep that ModelVersion until they are done, so
+requests already running finish on the version they started with.
+
+Every ModelVersion is tagged with its tree fingerprint (`version`), which
+is also what prediction entries carry.
+
+    python model_registry.py                 # swap / reject demo on a temp copy
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import metrics
+from core import CLASS_NAMES, FEATURE_DOMAINS, FEATURE_NAMES, MODEL_PATH, model_stamp
+
+CANARY_ROWS = 4096
+
+
+class ModelVersion:
+    """One loaded model: sklearn model (or None), CompiledTree and lookup table."""
+
+    def __init__(self, model, tree, table, path, sha256, generation, canary):
+        self.model      = model
+        self.tree       = tree
+        self.table      = table
+        self.path       = path
+        self.sha256     = sha256
+        self.generation = generation
+        self.canary     = canary
+        self.version    = tree.fingerprint()[:12]
+        self.loaded_at  = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def info(self):
+        return {"version": self.version, "generation": self.generation,
+                "sha256": self.sha256[:12], "loaded_at": self.loaded_at,
+                "canary": self.canary}
+
+
+def canary_batch(n=CANARY_ROWS, seed=0):
+    """Fixed synthetic patients drawn from the sidebar domains."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.choice(FEATURE_DOMAINS[f], n).astype(np.float64)
+                            for f in FEATURE_NAMES])
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def validate(model, tree, table, X, previous=None):
+    """Raise ValueError unless the candidate is safe to serve; returns canary stats."""
+    names = tree.meta.get("feature_names", FEATURE_NAMES)
+    if list(names) != FEATURE_NAMES:
+        raise ValueError(f"model expects features {names}, app sends {FEATURE_NAMES}")
+    if len(tree.classes) != len(CLASS_NAMES) or list(tree.classes) != list(range(len(CLASS_NAMES))):
+        raise ValueError(f"model classes {tree.classes.tolist()}, expected 0..{len(CLASS_NAMES) - 1}")
+    if not np.isfinite(tree.proba).all() or not np.allclose(tree.proba.sum(axis=1), 1.0):
+        raise ValueError("leaf probabilities are not finite rows summing to 1")
+
+    res = tree.score(X, return_path=False)
+    if model is not None:
+        from tree_engine import verify
+        try:
+            verify(model, tree, X)
+        except AssertionError as e:
+            raise ValueError(f"compiled tree disagrees with the model on the canary: {e}") from None
+    if table is not None:
+        pred, _, leaf = table.lookup(X)
+        if (leaf != res.leaf).any() or (pred != res.pred).any():
+            raise ValueError("lookup table disagrees with the tree on the canary")
+
+    stats = {"rows": len(X), "disease_rate": float((res.pred == 1).mean()),
+             "mean_disease_p": float(res.proba[:, 1].mean())}
+    if previous is not None:
+        stats["agreement_with_previous"] = float(
+            (previous.tree.predict(X) == res.pred).mean())
+    return stats
+
+
+class ModelRegistry:
+    def __init__(self, path=MODEL_PATH, poll_interval=2.0, build_table=True):
+        self.path          = path
+        self.poll_interval = poll_interval
+        self.build_table   = build_table
+        self.canary        = canary_batch()
+        self.checks        = 0
+        self.swaps         = 0
+        self.rejections    = 0
+        self.last_error    = None
+        self.history       = []
+        self._stamp        = None
+        self._rejected     = None
+        self._current      = None
+        self._lock         = threading.Lock()
+        self._stop         = threading.Event()
+        self._thread       = None
+        # The first version loads synchronously: there is nothing to serve yet.
+        if not self.check():
+            raise ValueError(f"{path}: {self.last_error}")
+
+    def current(self):
+        """The published ModelVersion; hold on to it for the whole request."""
+        return self._current
+
+    # ── Loading ──────────────────────────────────────────────────
+    def _load(self, sha256):
+        from lookup_table import LookupTable
+        from model_artifact import load_any
+        model, tree = load_any(self.path)
+        table = None
+        if self.build_table:
+            try:
+                table = LookupTable.from_tree(tree)
+            except ValueError:
+                pass
+        previous = self._current
+        canary   = validate(model, tree, table, self.canary, previous)
+        generation = previous.generation + 1 if previous is not None else 1
+        return ModelVersion(model, tree, table, self.path, sha256, generation, canary)
+
+    def check(self):
+        """Load, validate and publish the file if it changed; True if swapped.
+
+        Raises FileNotFoundError only while there is no version to fall back on.
+        """
+        with self._lock:
+            self.checks += 1
+            try:
+                stamp = model_stamp(self.path)
+            except FileNotFoundError:
+                if self._current is None:
+                    raise
+                self.last_error = f"{self.path} is missing; still serving {self._current.version}"
+                return False
+            if stamp == self._stamp:
+                return False
+            sha256 = file_sha256(self.path)
+            if self._current is not None and sha256 == self._current.sha256:
+                self._stamp = stamp             # touched, not changed
+                return False
+            if sha256 == self._rejected:
+                self._stamp = stamp
+                return False
+            try:
+                with metrics.timer("model_load"):
+                    candidate = self._load(sha256)
+                if model_stamp(self.path) != stamp:
+                    return False                # replaced mid-load; next poll retries
+            except Exception as e:
+                self.rejections += 1
+                self._rejected   = sha256
+                self._stamp      = stamp
+                self.last_error  = f"rejected {sha256[:12]}: {type(e).__name__}: {e}"
+                metrics.count("model_rejections")
+                return False
+
+            self._stamp     = stamp
+            self._current   = candidate        # the atomic swap
+            self.last_error = None
+            if candidate.generation > 1:
+                self.swaps += 1
+                metrics.count("model_swaps")
+            self.history.append(candidate.info())
+            return True
+
+    # ── Watcher ──────────────────────────────────────────────────
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:           # never let the watcher die
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def start(self):
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-registry",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        cur = self._current
+        return {"path": self.path, "version": cur.version, "generation": cur.generation,
+                "loaded_at": cur.loaded_at, "checks": self.checks, "swaps": self.swaps,
+                "rejections": self.rejections, "last_error": self.last_error,
+                "watching": self._thread is not None, "history": list(self.history)}
+
+
+def main(argv=None):
+    import argparse
+    import json
+    import pickle
+    import shutil
+    import tempfile
+    import warnings
+    warnings.filterwarnings("ignore")
+    from core import load_model
+    ap = argparse.ArgumentParser(description="Demonstrate hot reload on a temp copy of the model.")
+    ap.add_argument("--model", default=MODEL_PATH, help="sklearn pickle")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        shutil.copy(args.model, path)
+        reg  = ModelRegistry(path, poll_interval=0.05).start()
+        held = reg.current()
+        print(f"loaded    {held.version}  canary {held.canary}")
+
+        # Retrained model: same structure, one leaf's probabilities flipped.
+        model = load_model(args.model)
+        leaf  = int(np.flatnonzero(model.tree_.children_left == -1)[0])
+        model.tree_.value[leaf] = model.tree_.value[leaf][:, ::-1]
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(model, f)
+        os.replace(path + ".tmp", path)
+        deadline = time.time() + 10
+        while reg.current() is held and time.time() < deadline:
+            time.sleep(0.05)
+        new = reg.current()
+        print(f"swapped   {held.version} → {new.version}  canary {new.canary}")
+        rows = reg.canary[held.tree.apply(reg.canary)[0] == leaf][:1]
+        if len(rows):
+            print(f"in-flight request on {held.version} still predicts "
+                  f"{held.tree.predict(rows)[0]}; {new.version} predicts {new.tree.predict(rows)[0]}")
+
+        # Corrupt file: rejected, previous version keeps serving.
+        with open(path + ".tmp", "wb") as f:
+            f.write(b"not a model")
+        os.replace(path + ".tmp", path)
+        deadline = time.time() + 10
+        while reg.rejections == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        reg.stop()
+        stats = reg.stats()
+        print(f"rejected  corrupt file · still serving {stats['version']} · {stats['last_error']}")
+        print(json.dumps({k: stats[k] for k in ("checks", "swaps", "rejections")}))
+        ok = stats["swaps"] == 1 and stats["rejections"] == 1 and stats["version"] == new.version
+    print("✅  hot reload OK" if ok else "❌  hot reload failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
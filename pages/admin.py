@@ -0,0 +1,127 @@
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+import streamlit as st
+import core
+from audit_log import compact
+from resources import (load_audit_log, load_drift_monitor, load_model_registry, load_prediction_cache,
+                       load_render_cache)
+
+st.set_page_config(page_title="Admin · Heart Disease Predictor", page_icon="🛠️", layout="wide")
+
+st.markdown("## 🛠️ Admin")
+
+try:
+    registry = load_model_registry()
+except FileNotFoundError:
+    st.error(f"❌  `{os.path.basename(core.MODEL_PATH)}` not found.")
+    st.stop()
+except ValueError as e:
+    st.error(f"❌  Model rejected: {e}")
+    st.stop()
+
+active      = registry.current()
+model, tree = active.model, active.tree
+st.markdown(f"**Model** `{core.MODEL_PATH}` · fingerprint `{tree.fingerprint()[:12]}`")
+
+# ── Model registry ────────────────────────────────────────────────
+st.markdown("### Model registry")
+reg = registry.stats()
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Version",    reg["version"])
+c2.metric("Generation", reg["generation"])
+c3.metric("Swaps",      reg["swaps"])
+c4.metric("Rejections", reg["rejections"])
+if reg["last_error"]:
+    st.warning(reg["last_error"])
+st.caption(f"Watching: {'yes' if reg['watching'] else 'no'} · checks: {reg['checks']:,} · "
+           f"loaded {reg['loaded_at']}")
+st.dataframe([{**{k: v for k, v in h.items() if k != "canary"}, **h["canary"]}
+              for h in reversed(reg["history"])], use_container_width=True)
+if st.button("Check for a new model now"):
+    registry.check()
+    st.rerun()
+
+# ── Prediction cache ──────────────────────────────────────────────
+st.markdown("### Prediction cache")
+prediction_cache = load_prediction_cache()
+stats = prediction_cache.stats()
+c1, c2, c3, c4, c5 = st.columns(5)
+c1.metric("Entries",   f"{stats['items']:,} / {stats['max_items']:,}")
+c2.metric("Hit rate",  f"{stats['hit_rate']*100:.1f}%")
+c3.metric("Hits / misses", f"{stats['hits']:,} / {stats['misses']:,}")
+c4.metric("Evictions", f"{stats['evictions']:,}")
+c5.metric("Invalidations", f"{stats['invalidations']:,}")
+if st.button("Clear prediction cache"):
+    prediction_cache.clear()
+    st.rerun()
+
+# ── Render cache ──────────────────────────────────────────────────
+st.markdown("### Tree render cache")
+st.json(load_render_cache(tree.fingerprint(), model).stats())
+
+# ── Input drift ───────────────────────────────────────────────────
+st.markdown("### Input drift")
+drift  = load_drift_monitor(tree.fingerprint(), tree)
+report = drift.report()
+c1, c2, c3 = st.columns(3)
+c1.metric("Patients seen", f"{report['rows']:,}")
+c2.metric("In window",     f"{report['window_rows']:,} / {report['window']:,}")
+c3.metric("Alerts",        len(report["alerts"]))
+st.caption(f"Reference: {report['reference'] or 'none'} · last saved: {report['saved_at'] or 'never'}")
+st.dataframe([{"Group": g["group"], "Bins": g["bins"],
+               "PSI": None if g["psi"] is None else round(g["psi"], 4),
+               "KS": None if g["ks"] is None else round(g["ks"], 4),
+               "KS p": g["ks_p"], "Status": g["status"]} for g in report["groups"]],
+             use_container_width=True, hide_index=True)
+group = st.selectbox("Histogram", range(len(report["groups"])),
+                     format_func=lambda g: report["groups"][g]["group"])
+labels, window, ref = drift.histograms(group)
+fig, ax = plt.subplots(figsize=(10, 3.2))
+fig.patch.set_facecolor('#111827')
+ax.set_facecolor('#111827')
+x = np.arange(len(labels))
+ax.bar(x - 0.2, ref / max(ref.sum(), 1) * 100, width=0.4, color='#2c4a6e', label='Reference')
+ax.bar(x + 0.2, window / max(window.sum(), 1) * 100, width=0.4, color='#f39c12', label='Window')
+ax.set_xticks(x, labels, rotation=30, ha='right')
+ax.set_ylabel('% of rows', color='#8ab4d4', fontsize=9)
+ax.tick_params(colors='#8ab4d4', labelsize=8)
+for spine in ax.spines.values():
+    spine.set_edgecolor('#1e2d4a')
+ax.legend(facecolor='#111827', edgecolor='#1e2d4a', labelcolor='#8ab4d4', fontsize=8)
+plt.tight_layout()
+st.pyplot(fig)
+plt.close()
+c1, c2 = st.columns(2)
+if c1.button("Use current window as reference"):
+    drift.freeze_reference()
+    st.rerun()
+if c2.button("Save drift state now", disabled=drift.state_path is None):
+    drift.save(drift.state_path)
+    st.rerun()
+
+# ── Audit log ─────────────────────────────────────────────────────
+st.markdown("### Audit log")
+audit = load_audit_log()
+if audit is None:
+    st.caption("Disabled (HEART_AUDIT_DB is empty).")
+else:
+    stats = audit.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Written", f"{stats['written']:,}")
+    c2.metric("Queued",  f"{stats['queued']:,}")
+    c3.metric("Dropped", f"{stats['dropped']:,}")
+    c4.metric("On disk", f"{stats['bytes'] / 2**20:.1f} MiB")
+    st.caption(f"{stats['path']} · retention: "
+               f"{stats['retention_days'] or 'keep everything'} days · "
+               f"last batch {stats['last_flush_ms']:.1f} ms")
+    c1, c2, c3 = st.columns([2, 2, 1])
+    session = c1.text_input("Session id") or None
+    patient = c2.text_input("Patient id") or None
+    limit   = c3.number_input("Rows", 10, 10_000, 100, step=10)
+    audit.flush(1.0)
+    st.dataframe(audit.query(session=session, patient=patient, limit=limit),
+                 use_container_width=True, hide_index=True)
+    if st.button("Compact (apply retention, VACUUM)"):
+        deleted, size = compact(audit.path, audit.retention_days)
+        st.success(f"Deleted {deleted:,} rows · {size / 2**20:.1f} MiB")
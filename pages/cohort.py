@@ -0,0 +1,131 @@
+import hashlib
+import os
+import time
+import pandas as pd
+import matplotlib.pyplot as plt
+import streamlit as st
+import core
+from core import FEATURE_NAMES
+from columnar import feature_matrix, table_from_bytes
+from contributions import aggregate, contributions
+from resources import load_model_registry, load_risk_rules, risk_rules_stamp
+
+st.set_page_config(page_title="Cohort · Heart Disease Predictor", page_icon="👥", layout="wide")
+
+st.markdown("## 👥 Cohort Dashboard")
+st.markdown("""
+<p style='color:#8ab4d4; font-size:0.9rem;'>
+Upload a cohort with the 13 feature columns. Every patient's disease probability is split
+into a baseline plus one contribution per feature along their decision path, and the
+contributions are aggregated by feature, risk band and leaf.
+</p>
+""", unsafe_allow_html=True)
+
+try:
+    tree = load_model_registry().current().tree
+except FileNotFoundError:
+    st.error(f"❌  `{os.path.basename(core.MODEL_PATH)}` not found.")
+    st.stop()
+except ValueError as e:
+    st.error(f"❌  Model rejected: {e}")
+    st.stop()
+
+
+# Everything below is keyed on (upload digest, model, rules): a widget
+# interaction reruns the page but neither rescores nor rebuilds the CSV.
+@st.cache_resource(max_entries=1)
+def score_cohort(digest, model_key, rules_key, _data, _name, _tree, _rules):
+    # Read through pyarrow straight into the feature matrix, no DataFrame in between.
+    X, _   = feature_matrix(table_from_bytes(_data, _name))
+    t0     = time.perf_counter()
+    result = contributions(_tree, X)
+    result["flags"] = _rules.masks(X)
+    result["bits"]  = _rules.bitsets(X)
+    result["seconds"] = time.perf_counter() - t0
+    return result
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cohort_summary(digest, model_key, rules_key, _result, _rules):
+    by_feature, by_band, by_leaf = aggregate(_result)
+    flags = _result["flags"]
+    by_flag = pd.DataFrame({"Patients":        flags.sum(axis=0),
+                            "Share %":         (flags.mean(axis=0) * 100).round(1),
+                            "Mean disease p %": [(_result["disease_p"][m].mean() * 100).round(1)
+                                                 if m.any() else None for m in flags.T]},
+                           index=pd.Index(_rules.names, name="Flag"))
+    return {"rows": len(_result["leaf"]), "mean_p": float(_result["disease_p"].mean()),
+            "bias": _result["bias"], "by_feature": by_feature, "by_band": by_band,
+            "by_leaf": by_leaf, "by_flag": by_flag}
+
+
+@st.cache_data(max_entries=1, show_spinner="Building CSV…")
+def cohort_csv(digest, model_key, rules_key, _result):
+    per_patient = pd.DataFrame(_result["contrib"], columns=FEATURE_NAMES)
+    per_patient.insert(0, "flags", _result["bits"])
+    per_patient.insert(0, "leaf", _result["leaf"])
+    per_patient.insert(0, "disease_p", _result["disease_p"])
+    return per_patient.to_csv(index=False).encode()
+
+
+uploaded = st.file_uploader("Cohort file", type=["csv", "parquet", "feather", "arrow"])
+if uploaded is None:
+    st.stop()
+
+data   = uploaded.getvalue()
+key    = (hashlib.blake2b(data, digest_size=16).hexdigest(), tree.fingerprint(),
+          risk_rules_stamp())
+rules  = load_risk_rules(key[2])
+try:
+    with st.spinner("Scoring cohort…"):
+        result = score_cohort(*key, data, uploaded.name, tree, rules)
+except (ImportError, ValueError) as e:
+    st.error(f"❌  {e}")
+    st.stop()
+summary = cohort_summary(*key, result, rules)
+by_feature, by_band, by_leaf = summary["by_feature"], summary["by_band"], summary["by_leaf"]
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Patients", f"{summary['rows']:,}")
+c2.metric("Mean disease probability", f"{summary['mean_p']*100:.1f}%")
+c3.metric("Baseline (root)", f"{summary['bias']*100:.1f}%")
+c4.metric("Computed in", f"{result['seconds']:.2f}s")
+
+# ── By feature ────────────────────────────────────────────────────
+st.markdown("### Contribution by Feature")
+fig, ax = plt.subplots(figsize=(10, 5.5))
+fig.patch.set_facecolor('#111827')
+ax.set_facecolor('#111827')
+ordered = by_feature.sort_values("Mean |contribution|")
+colors  = ['#e74c3c' if v > 0 else '#2ecc71' for v in ordered["Mean contribution"]]
+ax.barh(ordered.index, ordered["Mean |contribution|"] * 100, color='#2c4a6e',
+        edgecolor='none', height=0.65, label='Mean |contribution|')
+ax.barh(ordered.index, ordered["Mean contribution"] * 100, color=colors,
+        edgecolor='none', height=0.3, label='Mean contribution')
+ax.axvline(0, color='#8ab4d4', linewidth=0.8)
+ax.set_xlabel('Disease probability points', color='#8ab4d4', fontsize=10)
+ax.tick_params(colors='#8ab4d4', labelsize=9)
+for spine in ax.spines.values():
+    spine.set_edgecolor('#1e2d4a')
+ax.grid(axis='x', color='#1e2d4a', alpha=0.6)
+ax.legend(facecolor='#111827', edgecolor='#1e2d4a', labelcolor='#8ab4d4', fontsize=9)
+plt.tight_layout()
+st.pyplot(fig)
+plt.close()
+st.dataframe((by_feature * [100, 100, 1]).round(2), use_container_width=True)
+
+# ── By risk band / leaf ───────────────────────────────────────────
+st.markdown("### Mean Contribution by Risk Band (probability points)")
+st.dataframe((by_band * ([1] + [100] * (by_band.shape[1] - 1))).round(2),
+             use_container_width=True)
+
+st.markdown("### Mean Contribution by Leaf (probability points)")
+st.dataframe((by_leaf * ([1, 100] + [100] * (by_leaf.shape[1] - 2))).round(2),
+             use_container_width=True)
+
+# ── Risk flags ────────────────────────────────────────────────────
+st.markdown("### Risk Flags")
+st.dataframe(summary["by_flag"], use_container_width=True)
+
+st.download_button("⬇  Per-patient contributions (CSV)", cohort_csv(*key, result),
+                   file_name="contributions.csv", mime="text/csv")
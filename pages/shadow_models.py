@@ -0,0 +1,113 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.colors import ListedColormap
+import streamlit as st
+import core
+from core import CLASS_NAMES, FEATURE_LABELS
+from leaf_index import LeafIndex
+from resources import (load_leaf_index, load_model_registry, load_shadow_models,
+                       load_shadow_overhead)
+from shadow import ModelStack, disagreement_regions, slice_grid
+
+st.set_page_config(page_title="Shadow · Heart Disease Predictor", page_icon="🔀", layout="wide")
+
+st.markdown("## 🔀 Shadow Models")
+st.markdown("""
+<p style='color:#8ab4d4; font-size:0.9rem;'>
+Candidate models listed in <code>HEART_SHADOW_MODELS</code> compared with the production tree.
+Every pair of leaves whose regions overlap is a box on which both trees are constant; the
+boxes where they predict different classes are listed below, with the share of all sidebar
+inputs they cover.
+</p>
+""", unsafe_allow_html=True)
+
+try:
+    primary = load_model_registry().current().tree
+    shadows = load_shadow_models()
+except FileNotFoundError as e:
+    st.error(f"❌  `{os.path.basename(e.filename or core.MODEL_PATH)}` not found.")
+    st.stop()
+except ValueError as e:
+    st.error(f"❌  Model rejected: {e}")
+    st.stop()
+
+if not shadows:
+    st.info("No shadow models configured.  Set `HEART_SHADOW_MODELS` to one or more `.pkl` / "
+            "`.hdt` paths (separated by `" + os.pathsep + "`) and restart the app.")
+    st.stop()
+
+name      = st.selectbox("Candidate model", list(shadows))
+candidate = shadows[name]
+regions   = disagreement_regions(load_leaf_index(primary.fingerprint(), primary),
+                                 LeafIndex(candidate))
+cost      = load_shadow_overhead((primary.fingerprint(), tuple(t.fingerprint() for t in shadows.values())),
+                                 primary, shadows)[name]
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Disagree on", f"{sum(r['share'] for r in regions)*100:.2f}% of inputs")
+c2.metric("Disagreement regions", f"{len(regions)}")
+c3.metric("Added latency / request", f"{cost['single_us']:.1f} µs")
+c4.metric("Added cost / batched row", f"{cost['batch_ns_per_row']:.0f} ns")
+st.caption(f"Production `{primary.fingerprint()[:12]}` · candidate `{candidate.fingerprint()[:12]}`")
+
+if not regions:
+    st.success("The two trees predict the same class for every sidebar input.")
+    st.stop()
+
+# ── Regions ───────────────────────────────────────────────────────
+st.markdown("### Where the trees disagree")
+st.dataframe(pd.DataFrame([{"Share %":          round(r["share"] * 100, 3),
+                            "Production":       f"leaf {r['leaf_a']} · {r['class_a']} ({r['p_a']:.2f})",
+                            "Candidate":        f"leaf {r['leaf_b']} · {r['class_b']} ({r['p_b']:.2f})",
+                            "Region":           " · ".join(r["region"])} for r in regions]),
+             use_container_width=True, hide_index=True)
+
+# ── Side by side ──────────────────────────────────────────────────
+st.markdown("### Side by side")
+pick = st.selectbox("Region", range(len(regions)),
+                    format_func=lambda i: f"#{i + 1} · {regions[i]['share']*100:.2f}% · "
+                                          f"{regions[i]['class_a']} → {regions[i]['class_b']}")
+region   = regions[pick]
+defaults = (region["features"] + [f for f in range(len(FEATURE_LABELS))
+                                  if f not in region["features"]])[:2]
+c1, c2 = st.columns(2)
+fx = c1.selectbox("X axis", range(len(FEATURE_LABELS)), index=defaults[0],
+                  format_func=FEATURE_LABELS.__getitem__)
+fy = c2.selectbox("Y axis", range(len(FEATURE_LABELS)), index=defaults[1],
+                  format_func=FEATURE_LABELS.__getitem__)
+if fx == fy:
+    st.warning("Pick two different features.")
+    st.stop()
+
+point = region["point"]
+st.caption("Other features fixed at a patient inside the region: "
+           + " · ".join(f"{FEATURE_LABELS[f]} {point[f]:g}" for f in range(len(FEATURE_LABELS))
+                        if f not in (fx, fy)))
+xs, ys, X = slice_grid(point, fx, fy)
+pred, proba, _ = ModelStack([primary, candidate]).score(X)
+shape = (len(ys), len(xs))
+
+fig, axes = plt.subplots(1, 3, figsize=(15, 4.6), sharey=True)
+fig.patch.set_facecolor('#111827')
+panels = [(proba[0, :, 1], f"Production · P({CLASS_NAMES[1]})", 'RdYlGn_r', (0, 1)),
+          (proba[1, :, 1], f"{name} · P({CLASS_NAMES[1]})", 'RdYlGn_r', (0, 1)),
+          ((pred[0] != pred[1]).astype(float), "Predicted class differs",
+           ListedColormap(['#1e2d4a', '#f39c12']), (0, 1))]
+for ax, (z, title, cmap, (vmin, vmax)) in zip(axes, panels):
+    ax.set_facecolor('#111827')
+    mesh = ax.pcolormesh(xs, ys, z.reshape(shape), cmap=cmap, vmin=vmin, vmax=vmax,
+                         shading='nearest')
+    ax.plot(point[fx], point[fy], marker='o', color='white', markersize=6)
+    ax.set_title(title, color='#e0e6f0', fontsize=10)
+    ax.set_xlabel(FEATURE_LABELS[fx], color='#8ab4d4', fontsize=9)
+    ax.tick_params(colors='#8ab4d4', labelsize=8)
+    for spine in ax.spines.values():
+        spine.set_edgecolor('#1e2d4a')
+axes[0].set_ylabel(FEATURE_LABELS[fy], color='#8ab4d4', fontsize=9)
+plt.tight_layout()
+st.pyplot(fig)
+plt.close()
+st.caption(f"Within this slice the trees disagree on {(pred[0] != pred[1]).mean()*100:.1f}% "
+           f"of the {len(X):,} grid points.  ● marks the fixed patient.")
@@ -0,0 +1,236 @@
+"""
+Multi-core sharded scoring with a process pool.
+
+The input is cut into row-aligned shards (byte ranges for CSV, row groups
+for Parquet).  The compiled tree arrays are placed once in a shared-memory
+block; workers map them read-only instead of unpickling the model.  Each
+worker scores its shard into a part file and the parent appends the parts
+in shard order, so the output is identical to batch_score.py's.
+
+    python parallel_score.py cohort.csv scored.csv --workers 8
+    python parallel_score.py cohort.csv scored.csv --bench 1,2,4,8
+"""
+import io
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from batch_score import OUTPUT_COLUMNS, is_parquet, score_frame
+from core import FEATURE_NAMES, MODEL_PATH
+from model_artifact import load_tree
+from tree_engine import CompiledTree
+
+TREE_FIELDS = ["feature", "threshold", "children_left", "children_right",
+               "proba", "n_node_samples", "classes"]
+
+
+# ─────────────────────────────────────────────────────────────────
+# SHARED MODEL
+# ─────────────────────────────────────────────────────────────────
+def share_tree(tree):
+    """Copy the tree arrays into one SharedMemory block.
+
+    Returns the block and a picklable layout of (field, dtype, shape, offset).
+    """
+    arrays = {f: np.ascontiguousarray(getattr(tree, f)) for f in TREE_FIELDS}
+    layout, size = [], 0
+    for name, arr in arrays.items():
+        size = (size + 63) // 64 * 64
+        layout.append((name, arr.dtype.str, arr.shape, size))
+        size += arr.nbytes
+    shm = SharedMemory(create=True, size=max(size, 1))
+    for name, dtype, shape, offset in layout:
+        np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)[...] = arrays[name]
+    return shm, layout
+
+
+def attach_tree(shm_name, layout):
+    shm = SharedMemory(name=shm_name)
+    views = {}
+    for name, dtype, shape, offset in layout:
+        arr = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        arr.flags.writeable = False
+        views[name] = arr
+    return shm, CompiledTree(**views)
+
+
+_worker = {}
+
+
+def _init_worker(shm_name, layout):
+    import warnings
+    warnings.filterwarnings("ignore")
+    _worker["shm"], _worker["tree"] = attach_tree(shm_name, layout)
+
+
+# ─────────────────────────────────────────────────────────────────
+# SHARDING
+# ─────────────────────────────────────────────────────────────────
+def csv_shards(path, shard_rows, block_size=1 << 24):
+    """Byte ranges covering `shard_rows` data lines each, with start rows.
+
+    One sequential scan for newlines; the lines themselves are parsed in
+    the workers.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()
+        bounds  = [f.tell()]
+        pending = shard_rows            # newlines still needed to close a shard
+        total   = 0
+        pos     = f.tell()
+        last    = b"\n"
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            nl = np.flatnonzero(np.frombuffer(block, np.uint8) == 10)
+            cuts = nl[pending - 1::shard_rows]
+            bounds.extend((pos + cuts + 1).tolist())
+            if len(cuts):
+                pending = shard_rows - (len(nl) - 1 - (pending - 1) - (len(cuts) - 1) * shard_rows)
+            else:
+                pending -= len(nl)
+            total += len(nl)
+            pos   += len(block)
+            last   = block[-1:]
+    if last != b"\n":
+        total += 1
+    if bounds[-1] != size:
+        bounds.append(size)
+    shards = []
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        start_row = i * shard_rows
+        shards.append({"start": start, "end": end, "start_row": start_row,
+                       "rows": min(shard_rows, total - start_row)})
+    return shards
+
+
+def parquet_shards(path):
+    import pyarrow.parquet as pq
+    meta, start_row, shards = pq.ParquetFile(path).metadata, 0, []
+    for rg in range(meta.num_row_groups):
+        n = meta.row_group(rg).num_rows
+        shards.append({"row_group": rg, "start_row": start_row, "rows": n})
+        start_row += n
+    return shards
+
+
+def read_shard(path, shard, columns, header):
+    if "row_group" in shard:
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).read_row_group(shard["row_group"],
+                                                   columns=columns).to_pandas()
+    with open(path, "rb") as f:
+        f.seek(shard["start"])
+        buf = f.read(shard["end"] - shard["start"])
+    return pd.read_csv(io.BytesIO(buf), header=None, names=header,
+                       usecols=columns, skip_blank_lines=False)
+
+
+def _score_shard(task):
+    t0 = time.perf_counter()
+    df = read_shard(task["path"], task["shard"], task["columns"], task["header"])
+    if len(df) != task["shard"]["rows"]:
+        raise ValueError(f"shard at row {task['shard']['start_row']}: expected "
+                         f"{task['shard']['rows']} rows, parsed {len(df)}")
+    out = score_frame(_worker["tree"], df, task["shard"]["start_row"], task["id_col"])
+    out.to_csv(task["part"], header=False, index=False)
+    return task["part"], len(df), time.perf_counter() - t0
+
+
+# ─────────────────────────────────────────────────────────────────
+# RUN
+# ─────────────────────────────────────────────────────────────────
+def run(input_path, out_path, tree, workers=None, shard_rows=250_000,
+        id_col=None, log=sys.stderr):
+    workers = workers or os.cpu_count()
+    columns = FEATURE_NAMES + ([id_col] if id_col else [])
+    if is_parquet(input_path):
+        header, shards = None, parquet_shards(input_path)
+    else:
+        header = list(pd.read_csv(input_path, nrows=0).columns)
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"{input_path}: missing columns {missing}")
+        shards = csv_shards(input_path, shard_rows)
+
+    parts_dir = out_path + ".parts"
+    os.makedirs(parts_dir, exist_ok=True)
+    tasks = [{"path": input_path, "shard": s, "columns": columns, "header": header,
+              "id_col": id_col, "part": os.path.join(parts_dir, f"part-{i:06d}.csv")}
+             for i, s in enumerate(shards)]
+
+    t0 = time.perf_counter()
+    shm, layout = share_tree(tree)
+    rows = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(shm.name, layout)) as pool, \
+             open(out_path, "wb") as out:
+            out.write((",".join(([id_col] if id_col else []) + OUTPUT_COLUMNS) + "\n").encode())
+            # map() yields in submission order, so parts land in shard order
+            # while later shards are still being scored.
+            for part, n, _ in pool.map(_score_shard, tasks):
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                os.remove(part)
+                rows += n
+    finally:
+        shm.close()
+        shm.unlink()
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - t0
+    rate    = rows / elapsed if elapsed > 0 else float("inf")
+    print(f"✅  scored {rows:,} rows in {elapsed:.2f}s with {workers} workers "
+          f"({rate:,.0f} rows/sec)  →  {out_path}", file=log)
+    return rows, elapsed
+
+
+def bench(input_path, out_path, tree, worker_counts, shard_rows, id_col=None):
+    results = []
+    for w in worker_counts:
+        rows, elapsed = run(input_path, out_path, tree, w, shard_rows, id_col,
+                            log=io.StringIO())
+        results.append((w, rows / elapsed))
+    base = results[0][1]
+    print(f"{'workers':>8} {'rows/sec':>14} {'speedup':>8}")
+    for w, rate in results:
+        print(f"{w:>8} {rate:>14,.0f} {rate / base:>7.2f}x")
+    print(f"(cpu_count = {os.cpu_count()})")
+    return results
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    ap = argparse.ArgumentParser(description="Score a cohort file across a process pool.")
+    ap.add_argument("input", help="CSV or Parquet file with the 13 feature columns")
+    ap.add_argument("output", help="CSV file to write scores to")
+    ap.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--shard-rows", type=int, default=250_000,
+                    help="CSV rows per shard (Parquet shards by row group)")
+    ap.add_argument("--id-col", help="column to carry through to the output")
+    ap.add_argument("--bench", help="comma-separated worker counts, e.g. 1,2,4,8")
+    args = ap.parse_args(argv)
+
+    tree = load_tree(args.model)
+    if args.bench:
+        bench(args.input, args.output, tree,
+              [int(w) for w in args.bench.split(",")], args.shard_rows, args.id_col)
+    else:
+        run(args.input, args.output, tree, args.workers, args.shard_rows, args.id_col)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
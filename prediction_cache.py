@@ -0,0 +1,117 @@
+"""
+Bounded LRU cache of prediction results keyed on the patient vector.
+
+Sidebar inputs are discrete, so identical patients recur across sessions
+and API calls.  Keys are the 13 values canonicalised to float32, which are
+exactly the values the tree splits on, so 1, 1.0 and True share an entry.
+Each entry holds pred, proba, leaf, the full get_decision_path steps and
+the model version that produced them.
+The cache remembers the fingerprint of the tree that filled it and clears
+itself as soon as it sees a different one.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+from core import FEATURE_NAMES, get_decision_path
+
+
+def canonical_key(values):
+    key = np.asarray(values, dtype=np.float32).ravel()
+    if key.shape != (len(FEATURE_NAMES),):
+        raise ValueError(f"expected {len(FEATURE_NAMES)} values {FEATURE_NAMES}, "
+                         f"got {key.size}")
+    return tuple(key.tolist())
+
+
+def make_entry(tree, x, pred, proba, leaf, nodes):
+    """Cache entry for row 0 of `x` from an existing scoring pass.
+
+    `model` tags the entry with the version (tree fingerprint) that scored it.
+    """
+    proba = np.array(proba, dtype=np.float64)
+    proba.flags.writeable = False
+    return {"pred": pred, "proba": proba, "leaf": int(leaf),
+            "path": get_decision_path(tree, x, nodes), "model": tree.fingerprint()[:12]}
+
+
+class PredictionCache:
+    def __init__(self, max_items=4096):
+        self.max_items     = max_items
+        self.fingerprint   = None
+        self.hits          = 0
+        self.misses        = 0
+        self.evictions     = 0
+        self.invalidations = 0
+        self._items        = OrderedDict()
+        self._lock         = threading.Lock()
+
+    def _check_model(self, fingerprint):
+        # Caller holds the lock.
+        if fingerprint != self.fingerprint:
+            if self.fingerprint is not None:
+                self.invalidations += 1
+            self._items.clear()
+            self.fingerprint = fingerprint
+
+    def get(self, tree, values):
+        key = canonical_key(values)
+        with self._lock:
+            self._check_model(tree.fingerprint())
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, tree, values, entry):
+        if self.max_items <= 0:
+            return
+        key = canonical_key(values)
+        with self._lock:
+            self._check_model(tree.fingerprint())
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, tree, values, table=None):
+        """Cached entry for `values`, scoring and storing it on a miss.
+
+        With a lookup_table.LookupTable for this tree, a miss is one table
+        index instead of a traversal.
+        """
+        source = "cache"
+        with metrics.timer("predict_lookup"):
+            entry = self.get(tree, values)
+            if entry is None:
+                if table is not None:
+                    source = "table"
+                    entry  = make_entry(tree, *table.score_one(values))
+                else:
+                    source = "tree"
+                    x      = np.array([values], dtype=np.float64)
+                    res    = tree.score(x)
+                    entry  = make_entry(tree, x, res.pred[0], res.proba[0], res.leaf[0],
+                                        res.path[0])
+                self.put(tree, values, entry)
+        metrics.count("predictions", source=source)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"items": len(self._items), "max_items": self.max_items,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions, "invalidations": self.invalidations,
+                    "model": (self.fingerprint or "")[:12]}
@@ -0,0 +1,141 @@
+"""
+Render cache for the Tree Visualization tab.
+
+The plot_tree figure depends only on the model and the display depth, so
+rendered PNG/SVG bytes are cached under (model fingerprint, depth, format)
+in an in-process LRU, with an optional on-disk tier that survives restarts
+(set HEART_RENDER_CACHE_DIR).  prewarm() renders every depth in a
+background thread at startup.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from core import CLASS_NAMES, FEATURE_LABELS
+from metrics import timed
+
+TREE_DEPTHS = [3, 4, 5, None]
+
+
+@timed("tree_render")
+def render_tree(model, depth, fmt="png"):
+    """plot_tree figure as image bytes, styled like the app's dark theme.
+
+    Uses the object-oriented Figure API (no pyplot state), so it is safe to
+    call from the pre-warm thread.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from sklearn.tree import plot_tree
+
+    fig = Figure(figsize=(22, 10))
+    FigureCanvasAgg(fig)
+    ax  = fig.subplots()
+    fig.patch.set_facecolor('#0a0e1a')
+    ax.set_facecolor('#0a0e1a')
+    plot_tree(
+        model,
+        feature_names = FEATURE_LABELS,
+        class_names   = CLASS_NAMES,
+        filled        = True,
+        rounded       = True,
+        fontsize      = 8,
+        max_depth     = depth,
+        ax            = ax
+    )
+    ax.set_title(
+        f"Heart Disease Decision Tree  (depth shown: {depth or 'full'})",
+        color='#c8d8f0', fontsize=13,
+        fontfamily='serif', pad=12
+    )
+    fig.tight_layout()
+    buf = io.BytesIO()
+    # Same savefig options st.pyplot uses, so the image looks unchanged.
+    fig.savefig(buf, format=fmt, bbox_inches="tight", dpi=200,
+                facecolor=fig.get_facecolor())
+    return buf.getvalue()
+
+
+class RenderCache:
+    """Bounded LRU of rendered bytes with an optional directory tier."""
+
+    def __init__(self, max_items=16, disk_dir=None):
+        self.max_items = max_items
+        self.disk_dir  = disk_dir
+        self.hits      = 0
+        self.disk_hits = 0
+        self.misses    = 0
+        self._items    = OrderedDict()
+        self._lock     = threading.Lock()
+        # matplotlib is not re-entrant; one render at a time also stops the
+        # pre-warm thread and a rerun from drawing the same figure twice.
+        self._render_lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        fingerprint, depth, fmt = key
+        return os.path.join(self.disk_dir,
+                            f"tree-{fingerprint[:16]}-d{depth or 'full'}.{fmt}")
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            self.disk_hits += 1
+            self._store(key, data)
+            return data
+        return None
+
+    def _store(self, key, data):
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get(self, key, render):
+        """Bytes for `key`, calling `render()` only on a miss in every tier."""
+        data = self._lookup(key)
+        if data is not None:
+            return data
+        with self._render_lock:
+            data = self._lookup(key)
+            if data is not None:
+                return data
+            self.misses += 1
+            data = render()
+            self._store(key, data)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp  = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return data
+
+    def tree_image(self, model, fingerprint, depth, fmt="png"):
+        return self.get((fingerprint, depth, fmt),
+                        lambda: render_tree(model, depth, fmt))
+
+    def prewarm(self, model, fingerprint, depths=TREE_DEPTHS, fmt="png"):
+        """Render `depths` in a daemon thread; returns the thread."""
+        def _warm():
+            for depth in depths:
+                self.tree_image(model, fingerprint, depth, fmt)
+        t = threading.Thread(target=_warm, name="tree-prewarm", daemon=True)
+        t.start()
+        return t
+
+    def stats(self):
+        return {"items": len(self._items), "hits": self.hits,
+                "disk_hits": self.disk_hits, "misses": self.misses}
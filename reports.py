@@ -0,0 +1,483 @@
+"""
+Printable patient reports for whole clinic lists.
+
+Each report is one self-contained file per patient: the verdict, the risk
+flags, the clinical values, the decision-path steps and a probability chart.
+HTML reports inline their CSS and the chart as a data URI; PDF reports are
+one A4 page drawn with matplotlib.
+
+Rendering runs in a process pool.  The tree is shared with the workers the
+same way parallel_score.py does it, and each worker builds its chart or
+page figure once and only updates bar widths and text between patients,
+instead of creating a new matplotlib figure per report.
+
+    python reports.py cohort.csv reports/ --workers 4
+    python reports.py cohort.parquet reports/ --format pdf --id-col patient_id
+    python reports.py cohort.csv reports/ --limit 2000 --bench 1,2,4
+"""
+import base64
+import html
+import io
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+
+import numpy as np
+
+from core import (CLASS_NAMES, FEATURE_LABELS, FEATURE_NAMES, MODEL_PATH,
+                  get_decision_path, risk_color, risk_label)
+from risk_rules import default_rules
+
+# Codes → the names the sidebar shows.
+VALUE_NAMES = {
+    'sex':     {0: "Female", 1: "Male"},
+    'cp':      {0: "Typical Angina", 1: "Atypical Angina", 2: "Non-Anginal Pain",
+                3: "Asymptomatic"},
+    'fbs':     {0: "No", 1: "Yes"},
+    'restecg': {0: "Normal", 1: "ST-T Abnormality", 2: "Left Ventricular Hypertrophy"},
+    'exang':   {0: "No", 1: "Yes"},
+    'slope':   {0: "Downsloping", 1: "Flat", 2: "Upsloping"},
+    'thal':    {1: "Normal", 2: "Fixed Defect", 3: "Reversible Defect"},
+}
+UNITS = {'age': "years", 'trestbps': "mmHg", 'chol': "mg/dl", 'thalach': "bpm"}
+
+BAR_COLORS = ['#2ecc71', '#e74c3c']
+FORMATS    = {"html": ".html", "pdf": ".pdf"}
+
+
+# ─────────────────────────────────────────────────────────────────
+# REPORT CONTENT
+# ─────────────────────────────────────────────────────────────────
+def clinical_values(values):
+    """(label, display text) for the 13 features."""
+    rows = []
+    for name, label, v in zip(FEATURE_NAMES, FEATURE_LABELS, values):
+        text = VALUE_NAMES[name].get(int(v), f"{v:g}") if name in VALUE_NAMES else f"{v:g}"
+        if name in UNITS:
+            text = f"{text} {UNITS[name]}"
+        rows.append((label, text))
+    return rows
+
+
+def path_lines(path):
+    """One line of text per decision-path step."""
+    lines = []
+    for i, step in enumerate(path):
+        if step.get("leaf"):
+            lines.append(f"Final leaf (node {step['node']}) → {step['class']} · "
+                         f"confidence {step['confidence']:.1f}% · {step['samples']} samples")
+        else:
+            op = "≤" if step["side"] == "left" else ">"
+            lines.append(f"Step {i + 1}: {step['feature']} = {step['value']:g} "
+                         f"{op} {step['threshold']:.2f}")
+    return lines
+
+
+def report_data(values, pred, proba, path, patient_id="", model_version="", rules=None):
+    """Everything a report shows, from one prediction (as the app has it)."""
+    rules = rules or default_rules()
+    proba = [float(p) for p in proba]
+    return {
+        "patient_id":    str(patient_id),
+        "model_version": model_version,
+        "generated":     datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC"),
+        "pred":          int(pred),
+        "verdict":       "Heart Disease" if pred == 1 else "No Heart Disease",
+        "proba":         proba,
+        "disease_p":     proba[1],
+        "risk_label":    risk_label(proba[1]),
+        "risk_color":    risk_color(proba[1]),
+        "flags":         rules.flags(values),
+        "values":        clinical_values(values),
+        "path":          path_lines(path),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────
+# FIGURE TEMPLATES
+# ─────────────────────────────────────────────────────────────────
+def _bars(ax):
+    """Empty probability bars on `ax`; filled in by _set_bars."""
+    bars  = ax.barh(CLASS_NAMES, [0, 0], color=BAR_COLORS, height=0.5, edgecolor='none')
+    texts = [ax.text(0, bar.get_y() + bar.get_height() / 2, "", va='center',
+                     fontsize=10, fontweight='bold', fontfamily='monospace')
+             for bar in bars]
+    ax.set_xlim(0, 115)
+    ax.set_xlabel('Probability (%)', fontsize=8)
+    ax.tick_params(labelsize=8)
+    for side in ('top', 'right'):
+        ax.spines[side].set_visible(False)
+    ax.grid(axis='x', alpha=0.3)
+    return bars, texts
+
+
+def _set_bars(bars, texts, proba):
+    for bar, text, p in zip(bars, texts, proba):
+        bar.set_width(p * 100)
+        text.set_x(p * 100 + 1)
+        text.set_text(f"{p * 100:.1f}%")
+
+
+class ProbabilityChart:
+    """One bar-chart figure reused for every patient.
+
+    Axes, ticks and labels are drawn once and kept as a background; each
+    render restores it and draws only the bars and their labels, then
+    encodes the canvas buffer.
+    """
+
+    def __init__(self, dpi=110):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        self.fig    = Figure(figsize=(5, 1.6), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax     = self.fig.subplots()
+        self.bars, self.texts = _bars(self.ax)
+        self.fig.tight_layout()
+        for artist in (*self.bars, *self.texts):
+            artist.set_animated(True)
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._lock = threading.Lock()      # Streamlit sessions share one chart
+
+    def render(self, proba):
+        """PNG bytes for `proba`."""
+        from PIL import Image
+        with self._lock:
+            _set_bars(self.bars, self.texts, proba)
+            self.canvas.restore_region(self._background)
+            for artist in (*self.bars, *self.texts):
+                self.ax.draw_artist(artist)
+            image = Image.fromarray(np.asarray(self.canvas.buffer_rgba())[..., :3])
+        buf = io.BytesIO()
+        image.save(buf, format="png")
+        return buf.getvalue()
+
+
+class PdfPage:
+    """One A4 page figure reused for every patient's PDF report.
+
+    Text slots are laid out once for the most flags and path steps a
+    report can have; unused slots are blanked.
+    """
+
+    def __init__(self, max_steps, max_flags):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = self.fig = Figure(figsize=(8.27, 11.69))
+        FigureCanvasAgg(fig)
+        text = lambda x, y, **kw: fig.text(x, y, "", **kw)
+
+        fig.text(0.07, 0.95, "Heart Disease Prediction · Patient Report", fontsize=16,
+                 fontweight='bold')
+        self.meta    = text(0.07, 0.925, fontsize=8, color='#555', fontfamily='monospace')
+        self.verdict = text(0.07, 0.88, fontsize=20, fontweight='bold')
+        self.prob    = text(0.07, 0.855, fontsize=10, fontfamily='monospace')
+
+        fig.text(0.07, 0.81, "Clinical values", fontsize=11, fontweight='bold')
+        self.values = [(text(0.07, 0.785 - 0.021 * i, fontsize=9, color='#555'),
+                        text(0.45, 0.785 - 0.021 * i, fontsize=9, ha='right'))
+                       for i in range(len(FEATURE_NAMES))]
+
+        fig.text(0.55, 0.81, "Risk flags", fontsize=11, fontweight='bold')
+        self.flags = [text(0.55, 0.785 - 0.021 * i, fontsize=9)
+                      for i in range(max(max_flags, 1))]
+
+        fig.text(0.07, 0.51, "Probability breakdown", fontsize=11, fontweight='bold')
+        ax = fig.add_axes([0.25, 0.39, 0.65, 0.1])
+        self.bars, self.texts = _bars(ax)
+
+        fig.text(0.07, 0.33, "How this prediction was made", fontsize=11, fontweight='bold')
+        self.steps = [text(0.07, 0.305 - 0.021 * i, fontsize=9, fontfamily='monospace')
+                      for i in range(max_steps)]
+        fig.text(0.07, 0.04, "For educational & research use only · not for clinical diagnosis",
+                 fontsize=7, color='#888')
+
+    def render(self, data):
+        """PDF bytes for one report_data() dict."""
+        self.meta.set_text(f"Patient {data['patient_id']} · model {data['model_version']}"
+                           f" · {data['generated']}")
+        colour = BAR_COLORS[data["pred"]]
+        self.verdict.set_text(data["verdict"])
+        self.verdict.set_color(colour)
+        self.prob.set_text(f"Disease probability {data['disease_p'] * 100:.1f}% · "
+                           f"{data['risk_label']}")
+        self.prob.set_color(data["risk_color"])
+        for (lbl, val), (label, text) in zip(self.values, data["values"]):
+            lbl.set_text(label)
+            val.set_text(text)
+        if data["flags"]:
+            flags = [(f"⚠ {label}", colour) for label, colour in data["flags"]]
+        else:
+            flags = [("No major risk flags detected", BAR_COLORS[0])]
+        for i, slot in enumerate(self.flags):
+            label, colour = flags[i] if i < len(flags) else ("", "black")
+            slot.set_text(label)
+            slot.set_color(colour)
+        for i, slot in enumerate(self.steps):
+            slot.set_text(data["path"][i] if i < len(data["path"]) else "")
+        _set_bars(self.bars, self.texts, data["proba"])
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format="pdf")
+        return buf.getvalue()
+
+
+# ─────────────────────────────────────────────────────────────────
+# HTML
+# ─────────────────────────────────────────────────────────────────
+HTML_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Heart report {pid}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; color: #1a1a1a; max-width: 46rem;
+        margin: 2rem auto; padding: 0 1rem; }}
+h1 {{ font-size: 1.3rem; margin: 0; }}
+h2 {{ font-size: 1rem; margin: 1.4rem 0 0.4rem; border-bottom: 1px solid #ddd; }}
+.meta {{ font: 0.75rem monospace; color: #666; }}
+.verdict {{ border: 2px solid {colour}; color: {colour}; border-radius: 8px;
+            padding: 0.8rem; text-align: center; font-size: 1.5rem; margin-top: 1rem; }}
+.verdict div {{ font: 0.8rem monospace; color: {risk_colour}; margin-top: 0.3rem; }}
+.cols {{ display: flex; gap: 2rem; }} .cols > div {{ flex: 1; }}
+table {{ border-collapse: collapse; width: 100%; font-size: 0.85rem; }}
+td {{ padding: 0.25rem 0.4rem; border-bottom: 1px solid #eee; }}
+td:first-child {{ color: #666; }} td:last-child {{ text-align: right; }}
+.flag {{ border-left: 3px solid; padding: 0.2rem 0.6rem; margin: 0.25rem 0;
+         font-size: 0.85rem; }}
+ol {{ font: 0.8rem monospace; padding-left: 1.2rem; }}
+footer {{ font-size: 0.7rem; color: #999; margin-top: 2rem; }}
+@media print {{ body {{ margin: 0; }} }}
+</style></head><body>
+<h1>Heart Disease Prediction · Patient Report</h1>
+<div class="meta">Patient {pid} · model {model} · {generated}</div>
+<div class="verdict">{verdict}<div>Disease probability {disease_p:.1f}% · {risk}</div></div>
+<div class="cols">
+<div><h2>Clinical values</h2><table>{values}</table></div>
+<div><h2>Risk flags</h2>{flags}</div>
+</div>
+<h2>Probability breakdown</h2>
+<img src="data:image/png;base64,{chart}" alt="probability chart" style="max-width:100%">
+<h2>How this prediction was made</h2>
+<ol>{steps}</ol>
+<footer>For educational &amp; research use only · not for clinical diagnosis</footer>
+</body></html>
+"""
+
+
+def render_html(data, chart_png):
+    """Self-contained HTML report for one report_data() dict."""
+    esc = html.escape
+    flags = "".join(f'<div class="flag" style="border-color:{c}; color:{c};">⚠ {esc(f)}</div>'
+                    for f, c in data["flags"]) \
+        or '<div class="flag" style="border-color:#2ecc71;">No major risk flags detected</div>'
+    return HTML_PAGE.format(
+        pid=esc(data["patient_id"]), model=esc(data["model_version"]),
+        generated=data["generated"], verdict=esc(data["verdict"]),
+        colour=BAR_COLORS[data["pred"]], risk_colour=data["risk_color"],
+        disease_p=data["disease_p"] * 100, risk=data["risk_label"],
+        values="".join(f"<tr><td>{esc(l)}</td><td>{esc(v)}</td></tr>"
+                       for l, v in data["values"]),
+        flags=flags,
+        chart=base64.b64encode(chart_png).decode(),
+        steps="".join(f"<li>{esc(s)}</li>" for s in data["path"]),
+    ).encode()
+
+
+class ReportRenderer:
+    """Report bytes per patient, reusing one figure for the process."""
+
+    def __init__(self, fmt, max_steps):
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {sorted(FORMATS)}, got {fmt!r}")
+        self.fmt    = fmt
+        self.suffix = FORMATS[fmt]
+        self.figure = (PdfPage(max_steps, len(default_rules())) if fmt == "pdf"
+                       else ProbabilityChart())
+
+    def render(self, data):
+        if self.fmt == "pdf":
+            return self.figure.render(data)
+        return render_html(data, self.figure.render(data["proba"]))
+
+
+_chart      = None
+_chart_lock = threading.Lock()
+
+
+def patient_report(values, pred, proba, path, model_version="", rules=None):
+    """HTML report for one patient, for in-process callers such as the app."""
+    global _chart
+    with _chart_lock:
+        if _chart is None:
+            _chart = ProbabilityChart()
+    data = report_data(values, pred, proba, path, model_version=model_version, rules=rules)
+    return render_html(data, _chart.render(data["proba"]))
+
+
+# ─────────────────────────────────────────────────────────────────
+# PROCESS POOL
+# ─────────────────────────────────────────────────────────────────
+_worker = {}
+
+
+def safe_name(patient_id):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(patient_id)).strip("._") or "patient"
+
+
+def unique_names(ids, taken):
+    """File stems for `ids`; ids that sanitise alike get -2, -3, ... suffixes.
+
+    `taken` is the set of stems used so far in the run and is updated.
+    """
+    names = []
+    for pid in ids:
+        base = name = safe_name(pid)
+        k = 1
+        while name in taken:
+            k += 1
+            name = f"{base}-{k}"
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+def _init_worker(shm_name, layout, fmt):
+    import warnings
+    warnings.filterwarnings("ignore")
+    from parallel_score import attach_tree
+    _worker["shm"], tree = attach_tree(shm_name, layout)
+    _worker["tree"]     = tree
+    _worker["version"]  = tree.fingerprint()[:12]
+    _worker["renderer"] = ReportRenderer(fmt, tree.max_depth + 1)
+
+
+def _render_chunk(task):
+    t0       = time.perf_counter()
+    tree     = _worker["tree"]
+    renderer = _worker["renderer"]
+    X        = task["X"]
+    res      = tree.score(X)
+    for i, (pid, name) in enumerate(zip(task["ids"], task["names"])):
+        path = get_decision_path(tree, X[i:i + 1], nodes=res.path[i])
+        data = report_data(X[i], res.pred[i], res.proba[i], path, pid, _worker["version"])
+        with open(os.path.join(task["out_dir"], name + renderer.suffix), "wb") as f:
+            f.write(renderer.render(data))
+    return len(X), time.perf_counter() - t0
+
+
+def iter_tasks(input_path, out_dir, chunk_rows, id_col=None, limit=None):
+    from batch_score import feature_matrix, iter_chunks
+    start, taken = 0, set()
+    for df in iter_chunks(input_path, chunk_rows, id_col=id_col):
+        if limit is not None and start >= limit:
+            return
+        if limit is not None:
+            df = df.iloc[:limit - start]
+        ids = (df[id_col].astype(str).tolist() if id_col
+               else [f"patient-{r:06d}" for r in range(start, start + len(df))])
+        yield {"X": feature_matrix(df), "ids": ids, "names": unique_names(ids, taken),
+               "out_dir": out_dir}
+        start += len(df)
+
+
+def run(input_path, out_dir, tree, workers=None, fmt="html", chunk_rows=64,
+        id_col=None, limit=None, log=sys.stderr):
+    """Write one report per cohort row into `out_dir`; returns (reports, seconds)."""
+    from parallel_score import share_tree
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {sorted(FORMATS)}, got {fmt!r}")
+    workers = workers or os.cpu_count()
+    os.makedirs(out_dir, exist_ok=True)
+
+    t0 = time.perf_counter()
+    shm, layout = share_tree(tree)
+    reports = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(shm.name, layout, fmt)) as pool:
+            # At most two chunks per worker in flight, so memory stays flat
+            # however long the cohort is (pool.map would submit it all).
+            pending = set()
+            for task in iter_tasks(input_path, out_dir, chunk_rows, id_col, limit):
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    reports += sum(f.result()[0] for f in done)
+                pending.add(pool.submit(_render_chunk, task))
+            reports += sum(f.result()[0] for f in pending)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    elapsed = time.perf_counter() - t0
+    rate    = reports / elapsed * 60 if elapsed > 0 else float("inf")
+    print(f"✅  {reports:,} {fmt} reports in {elapsed:.2f}s with {workers} workers "
+          f"({rate:,.0f} reports/min)  →  {out_dir}", file=log)
+    return reports, elapsed
+
+
+def bench(input_path, out_dir, tree, worker_counts, fmt="html", limit=1000, id_col=None):
+    """reports/min per worker count, plus reused vs fresh figures in one process."""
+    X = np.array([[54, 1, 0, 130, 240, 0, 0, 150, 0, 1.0, 1, 0, 2]], dtype=float)
+    res  = tree.score(X)
+    data = report_data(X[0], res.pred[0], res.proba[0],
+                       get_decision_path(tree, X, nodes=res.path[0]), "bench")
+    n = 50
+    make = lambda: ReportRenderer(fmt, tree.max_depth + 1)
+    renderer = make()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        renderer.render(data)
+    reused = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for _ in range(n):
+        make().render(data)
+    fresh = (time.perf_counter() - t0) / n
+    print(f"one process: reused figure {reused * 1e3:.1f} ms/report "
+          f"({60 / reused:,.0f}/min) · new figure per report {fresh * 1e3:.1f} ms "
+          f"({60 / fresh:,.0f}/min)")
+
+    results = []
+    with open(os.devnull, "w") as quiet:
+        for w in worker_counts:
+            reports, elapsed = run(input_path, out_dir, tree, w, fmt, id_col=id_col,
+                                   limit=limit, log=quiet)
+            results.append((w, reports, elapsed))
+    base = results[0][1] / results[0][2]
+    print(f"{'workers':>7} {'reports':>9} {'seconds':>9} {'reports/min':>12} {'speedup':>8}")
+    for w, reports, elapsed in results:
+        rate = reports / elapsed
+        print(f"{w:>7} {reports:>9,} {elapsed:>9.2f} {rate * 60:>12,.0f} {rate / base:>7.2f}×")
+    return results
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    from model_artifact import load_tree
+    ap = argparse.ArgumentParser(description="Write one printable report per cohort row.")
+    ap.add_argument("input", help="CSV or Parquet file with the 13 feature columns")
+    ap.add_argument("out_dir", help="folder to write the reports into")
+    ap.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    ap.add_argument("--format", choices=sorted(FORMATS), default="html")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--chunk-rows", type=int, default=64, help="patients per pool task")
+    ap.add_argument("--id-col", help="column to name the reports by (default: row number)")
+    ap.add_argument("--limit", type=int, help="only the first N patients")
+    ap.add_argument("--bench", help="comma-separated worker counts, e.g. 1,2,4")
+    args = ap.parse_args(argv)
+
+    tree = load_tree(args.model)
+    if args.bench:
+        bench(args.input, args.out_dir, tree, [int(w) for w in args.bench.split(",")],
+              args.format, args.limit or 1000, args.id_col)
+    else:
+        run(args.input, args.out_dir, tree, args.workers, args.format, args.chunk_rows,
+            args.id_col, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
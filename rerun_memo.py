@@ -0,0 +1,118 @@
+"""
+Dependency-keyed memoization of app sections across Streamlit reruns.
+
+Any widget change reruns app.py from the top, but most sections depend on
+a few inputs only: the feature-importance chart on the model, the
+probability bar on the patient's probabilities, and so on.  Each memoized
+value lives in st.session_state next to the dependencies it was computed
+from, and is reused until they change.  Streamlit still needs every
+element emitted on each run, so what is stored is the expensive product
+(PNG bytes, HTML blocks, rule text); emitting it again is cheap.
+
+Sections are timed lap by lap, so the app can show where a rerun went and
+how much the cache saved.
+"""
+import io
+import time
+from collections import deque
+
+import streamlit as st
+
+import metrics
+
+SESSION_KEY = "_rerun_memo"
+
+# st.image / st.pyplot shrink anything wider than this on *every* call.
+MAX_IMAGE_WIDTH = 2 * 730
+
+
+def fit_width(png, max_width=MAX_IMAGE_WIDTH):
+    """Downscale PNG bytes to `max_width` once, exactly as Streamlit would.
+
+    Same bilinear resample, so the page looks the same, but a memoized
+    image then passes through st.image untouched on later reruns.
+    """
+    from PIL import Image
+    img = Image.open(io.BytesIO(png))
+    if img.width <= max_width:
+        return png
+    img = img.resize((max_width, int(1.0 * img.height * max_width / img.width)),
+                     resample=Image.BILINEAR)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def figure_png(fig):
+    """PNG bytes of a pyplot figure, rendered the way st.pyplot does; closes `fig`."""
+    import matplotlib.pyplot as plt
+    buf = io.BytesIO()
+    with metrics.timer("figure_render"):
+        fig.savefig(buf, format="png", bbox_inches="tight", dpi=200,
+                    facecolor=fig.get_facecolor())
+        plt.close(fig)
+        return fit_width(buf.getvalue())
+
+
+def show_image(png):
+    """st.image at container width, timed as st_image."""
+    with metrics.timer("st_image"):
+        st.image(png, use_container_width=True)
+
+
+class RerunMemo:
+    """Per-session store of section outputs plus per-rerun section timings."""
+
+    def __init__(self, history=20):
+        self._values  = {}
+        self.timings  = []
+        self.history  = deque(maxlen=history)
+        self._section = None
+        self._t0      = None
+        self._run_t0  = None
+
+    # ── Memoization ──────────────────────────────────────────────
+    def get(self, key, deps, compute):
+        """Value of `key`, recomputed only when `deps` differ from last time."""
+        held = self._values.get(key)
+        hit  = held is not None and held[0] == deps
+        if not hit:
+            held = self._values[key] = (deps, compute())
+        if self._section is not None:
+            self._section["reused" if hit else "computed"].append(key)
+        return held[1]
+
+    def clear(self):
+        self._values.clear()
+
+    # ── Timing ───────────────────────────────────────────────────
+    def start_run(self):
+        self.timings  = []
+        self._section = None
+        self._run_t0  = time.perf_counter()
+
+    def section(self, name):
+        """Close the running section and start timing `name`."""
+        now = time.perf_counter()
+        if self._section is not None:
+            self._section["ms"] = (now - self._t0) * 1e3
+            self.timings.append(self._section)
+            metrics.observe("app_section", now - self._t0, section=self._section["section"])
+        self._section = {"section": name, "ms": 0.0, "reused": [], "computed": []}
+        self._t0      = now
+
+    def finish(self):
+        """Close the last section; returns this rerun's total in ms."""
+        self.section(None)
+        self._section = None
+        total = (time.perf_counter() - self._run_t0) * 1e3
+        self.history.append(total)
+        metrics.observe("rerun", total / 1e3)
+        return total
+
+
+def session_memo():
+    """This session's RerunMemo, created on first use."""
+    if SESSION_KEY not in st.session_state:
+        st.session_state[SESSION_KEY] = RerunMemo()
+    return st.session_state[SESSION_KEY]
@@ -0,0 +1,122 @@
+"""
+Process-wide resources shared by every Streamlit session and page.
+
+Kept out of app.py so pages/ scripts hit the same st.cache_resource
+entries as the main app.
+"""
+import os
+import threading
+
+import streamlit as st
+
+import core
+import metrics
+from audit_log import AuditLog
+from counterfactual import CounterfactualEngine
+from drift import open_monitor
+from leaf_index import LeafIndex
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from render_cache import RenderCache
+from risk_rules import RULES_PATH, RiskRules
+from shadow import load_shadows, overhead
+
+
+@st.cache_resource
+def load_model_registry():
+    # Watches core.MODEL_PATH and hot-swaps validated retrains; every rerun
+    # takes registry.current() once.  HEART_MODEL_POLL_S=0 disables the watcher.
+    poll = float(os.environ.get("HEART_MODEL_POLL_S", 2.0))
+    return ModelRegistry(core.MODEL_PATH, poll).start()
+
+
+@st.cache_resource(max_entries=1)
+def load_render_cache(fingerprint, _model):
+    # The static image is only drawn on demand now (tree_view is the default),
+    # so rendering depth 3/4/5/Full in the background is opt-in.
+    cache = RenderCache(disk_dir=os.environ.get("HEART_RENDER_CACHE_DIR"))
+    if _model is not None and os.environ.get("HEART_RENDER_PREWARM", "0") == "1":
+        cache.prewarm(_model, fingerprint)
+    return cache
+
+
+@st.cache_resource
+def load_prediction_cache():
+    # One cache for every session; it clears itself when the tree changes.
+    return PredictionCache(int(os.environ.get("HEART_PREDICTION_CACHE_SIZE", 4096)))
+
+
+@st.cache_resource(max_entries=1)
+def load_leaf_index(fingerprint, _tree):
+    return LeafIndex(_tree)
+
+
+@st.cache_resource(max_entries=1)
+def load_counterfactual_engine(fingerprint, _index):
+    return CounterfactualEngine(_index)
+
+
+@st.cache_resource(max_entries=1)
+def load_risk_rules(stamp):
+    # Keyed on the rule file's (path, mtime, size): an edited file is
+    # picked up on the next rerun, no restart needed.
+    return RiskRules.load(stamp[0])
+
+
+def risk_rules_stamp():
+    return core.model_stamp(RULES_PATH)
+
+
+@st.cache_resource
+def _drift_slot():
+    return {"monitor": None, "lock": threading.Lock()}
+
+
+def load_drift_monitor(fingerprint, tree):
+    # Input histograms of every patient scored in the app; persisted when
+    # HEART_DRIFT_STATE is set, compared with HEART_DRIFT_REFERENCE if given.
+    # Bins follow the tree's thresholds, so a hot swap stops (and saves) the
+    # old monitor before the new one resumes from the same state file.
+    slot = _drift_slot()
+    with slot["lock"]:
+        mon = slot["monitor"]
+        if mon is None or mon.fingerprint != fingerprint:
+            if mon is not None:
+                mon.stop()
+            mon = slot["monitor"] = open_monitor(
+                tree, os.environ.get("HEART_DRIFT_STATE"),
+                os.environ.get("HEART_DRIFT_REFERENCE"),
+                int(os.environ.get("HEART_DRIFT_WINDOW", 10_000)))
+    return mon
+
+
+@st.cache_resource
+def load_shadow_models():
+    # Candidate models for pages/shadow_models.py: HEART_SHADOW_MODELS is a
+    # path list separated like PATH (":" on Linux, ";" on Windows).
+    paths = [p for p in os.environ.get("HEART_SHADOW_MODELS", "").split(os.pathsep) if p]
+    return load_shadows(paths)
+
+
+@st.cache_resource(max_entries=4)
+def load_shadow_overhead(fingerprints, _primary, _shadows):
+    return overhead(_primary, _shadows)
+
+
+@st.cache_resource
+def load_audit_log():
+    # Every app prediction goes to HEART_AUDIT_DB (default audit_log.db next
+    # to app.py); set it to an empty string to turn the audit log off.
+    path = os.environ.get("HEART_AUDIT_DB", os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "audit_log.db"))
+    if not path:
+        return None
+    days = os.environ.get("HEART_AUDIT_RETENTION_DAYS")
+    return AuditLog(path, retention_days=float(days) if days else None).start()
+
+
+@st.cache_resource
+def start_metrics_server():
+    # Prometheus scrape endpoint for this Streamlit process, if asked for.
+    port = os.environ.get("HEART_METRICS_PORT")
+    return metrics.start_http_server(int(port)) if port else None
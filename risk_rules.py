@@ -0,0 +1,255 @@
+"""
+Declarative risk-flag rules compiled to NumPy masks.
+
+The clinical risk flags live in a rule file (risk_flags.json by default,
+or HEART_RISK_RULES; YAML works too when PyYAML is installed) instead of
+`if` statements.  Each rule names a flag, a display colour and a
+condition over the FEATURE_NAMES columns:
+
+    {"name": "High Cholesterol", "color": "#f39c12",
+     "when": {"feature": "chol", "op": ">", "value": 240}}
+
+Conditions nest with {"all": [...]}, {"any": [...]} and {"not": {...}};
+ops are > >= < <= == != plus "in" (list of values) and "between"
+([lo, hi], inclusive).  A rule set compiles once into vectorized checks
+that evaluate every flag for a whole batch and pack them into one uint64
+bitset per row (bit i = rule i).  The app, the reports and the batch
+scorers all use it, so they cannot disagree on a patient's flags.
+
+    python risk_rules.py                      # check vs a per-row evaluator, time 5M rows
+    python risk_rules.py --rules my_rules.yaml --rows 1000000
+"""
+import functools
+import json
+import os
+import sys
+
+import numpy as np
+
+from core import FEATURE_DOMAINS, FEATURE_NAMES
+
+RULES_PATH = os.environ.get(
+    "HEART_RISK_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_flags.json"))
+
+MAX_RULES = 64           # one uint64 bitset per row
+BLOCK     = 1 << 12      # rows per pass; the transposed block stays in L1/L2
+
+COMPARE = {">":  np.greater,       ">=": np.greater_equal,
+           "<":  np.less,          "<=": np.less_equal,
+           "==": np.equal,         "!=": np.not_equal}
+
+
+# ─────────────────────────────────────────────────────────────────
+# COMPILE
+# ─────────────────────────────────────────────────────────────────
+def _number(v, where):
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        raise ValueError(f"{where}: value must be a number, got {v!r}")
+    return float(v)
+
+
+def _compile(cond, where, used):
+    """Condition dict → fn(cols) returning a boolean mask.
+
+    `cols[f]` is feature f's column; `used` collects the feature indices
+    the condition reads.
+    """
+    if not isinstance(cond, dict) or not cond:
+        raise ValueError(f"{where}: condition must be a non-empty object, got {cond!r}")
+    for key in ("all", "any"):
+        if key in cond:
+            parts = cond[key]
+            if len(cond) != 1 or not isinstance(parts, list) or not parts:
+                raise ValueError(f"{where}: '{key}' takes a non-empty list and nothing else")
+            fns    = [_compile(c, f"{where}.{key}[{i}]", used) for i, c in enumerate(parts)]
+            reduce = np.logical_and if key == "all" else np.logical_or
+
+            def combined(cols, fns=fns, reduce=reduce):
+                mask = fns[0](cols)
+                for fn in fns[1:]:
+                    reduce(mask, fn(cols), out=mask)
+                return mask
+            return combined
+    if "not" in cond:
+        if len(cond) != 1:
+            raise ValueError(f"{where}: 'not' takes one condition and nothing else")
+        inner = _compile(cond["not"], f"{where}.not", used)
+        return lambda cols: ~inner(cols)
+
+    unknown = set(cond) - {"feature", "op", "value"}
+    if unknown or "feature" not in cond or "op" not in cond or "value" not in cond:
+        raise ValueError(f"{where}: expected feature/op/value, got {sorted(cond)}")
+    if cond["feature"] not in FEATURE_NAMES:
+        raise ValueError(f"{where}: unknown feature {cond['feature']!r}; "
+                         f"expected one of {FEATURE_NAMES}")
+    f, op, value = FEATURE_NAMES.index(cond["feature"]), cond["op"], cond["value"]
+    used.add(f)
+    if op in COMPARE:
+        v, cmp = _number(value, where), COMPARE[op]
+        return lambda cols: cmp(cols[f], v)
+    if op == "in":
+        if not isinstance(value, list) or not value:
+            raise ValueError(f"{where}: 'in' needs a non-empty list of values")
+        vs = np.array([_number(v, where) for v in value])
+        return lambda cols: np.isin(cols[f], vs)
+    if op == "between":
+        if not isinstance(value, list) or len(value) != 2:
+            raise ValueError(f"{where}: 'between' needs [low, high]")
+        lo, hi = (_number(v, where) for v in value)
+        return lambda cols: (cols[f] >= lo) & (cols[f] <= hi)
+    raise ValueError(f"{where}: unknown op {op!r}; expected one of "
+                     f"{sorted(COMPARE) + ['between', 'in']}")
+
+
+def _evaluate(cond, row):
+    """Plain-Python evaluation of one condition on one row (for checking)."""
+    if "all" in cond:
+        return all(_evaluate(c, row) for c in cond["all"])
+    if "any" in cond:
+        return any(_evaluate(c, row) for c in cond["any"])
+    if "not" in cond:
+        return not _evaluate(cond["not"], row)
+    x, op, v = row[FEATURE_NAMES.index(cond["feature"])], cond["op"], cond["value"]
+    if op == "in":
+        return x in v
+    if op == "between":
+        return v[0] <= x <= v[1]
+    return {">": x > v, ">=": x >= v, "<": x < v, "<=": x <= v,
+            "==": x == v, "!=": x != v}[op]
+
+
+# ─────────────────────────────────────────────────────────────────
+# RULE SET
+# ─────────────────────────────────────────────────────────────────
+class RiskRules:
+    def __init__(self, spec, source=None):
+        rules = spec.get("rules") if isinstance(spec, dict) else None
+        if not isinstance(rules, list) or not rules:
+            raise ValueError(f"{source or 'rules'}: expected {{'rules': [...]}} with at "
+                             "least one rule")
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"{source or 'rules'}: {len(rules)} rules; at most {MAX_RULES} "
+                             "fit in a uint64 bitset")
+        names, used, checks = [], set(), []
+        for i, rule in enumerate(rules):
+            where = f"{source or 'rules'}: rule {i}"
+            if not isinstance(rule, dict) or not isinstance(rule.get("name"), str):
+                raise ValueError(f"{where}: needs a 'name'")
+            where = f"{where} ({rule['name']})"
+            if rule["name"] in names:
+                raise ValueError(f"{where}: duplicate name")
+            names.append(rule["name"])
+            checks.append(_compile(rule.get("when"), where, used))
+        self.spec     = spec
+        self.source   = source
+        self.rules    = rules
+        self.names    = names
+        self.colors   = [rule.get("color", "#e74c3c") for rule in rules]
+        self.features = sorted(used)
+        self._checks  = checks
+
+    @classmethod
+    def load(cls, path=RULES_PATH):
+        with open(path) as f:
+            if path.lower().endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("YAML rule files need PyYAML:  pip install pyyaml") from None
+                spec = yaml.safe_load(f)
+            else:
+                spec = json.load(f)
+        return cls(spec, source=os.path.basename(path))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _columns(self, X):
+        # One transpose per block makes every feature a contiguous row;
+        # checks index it as cols[f].
+        return np.ascontiguousarray(X.T)
+
+    def masks(self, X):
+        """(n, n_rules) boolean flag matrix for a 2-D float array."""
+        X   = np.asarray(X, dtype=np.float64)
+        out = np.empty((len(X), len(self)), dtype=bool)
+        for start in range(0, len(X), BLOCK):
+            cols = self._columns(X[start:start + BLOCK])
+            for i, check in enumerate(self._checks):
+                out[start:start + BLOCK, i] = check(cols)
+        return out
+
+    def bitsets(self, X):
+        """uint64 per row with bit i set when rule i fires."""
+        X   = np.asarray(X, dtype=np.float64)
+        out = np.zeros(len(X), dtype=np.uint64)
+        for start in range(0, len(X), BLOCK):
+            cols = self._columns(X[start:start + BLOCK])
+            bits = out[start:start + BLOCK]
+            for i, check in enumerate(self._checks):
+                bits |= check(cols).astype(np.uint64) << np.uint64(i)
+        return out
+
+    def decode(self, bits):
+        """Rule indices set in one bitset."""
+        bits = int(bits)
+        return [i for i in range(len(self)) if bits >> i & 1]
+
+    def flags(self, values):
+        """(name, colour) of the flags one patient's 13 values raise."""
+        bits = self.bitsets(np.asarray(values, dtype=np.float64).reshape(1, -1))[0]
+        return [(self.names[i], self.colors[i]) for i in self.decode(bits)]
+
+    def counts(self, X):
+        """Rows raising each flag, keyed by rule name."""
+        return dict(zip(self.names, self.masks(X).sum(axis=0).tolist()))
+
+
+@functools.lru_cache(maxsize=None)
+def default_rules():
+    """The rule set at RULES_PATH, loaded once per process."""
+    return RiskRules.load(RULES_PATH)
+
+
+def random_rows(n, seed=0):
+    """Rows drawn from FEATURE_DOMAINS, so every rule boundary is exercised."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.choice(FEATURE_DOMAINS[f], n).astype(np.float64)
+                            for f in FEATURE_NAMES])
+
+
+def main(argv=None):
+    import argparse
+    import time
+    ap = argparse.ArgumentParser(description="Validate a rule file and time flag evaluation.")
+    ap.add_argument("--rules", default=RULES_PATH, help="JSON or YAML rule file")
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    args = ap.parse_args(argv)
+
+    rules = RiskRules.load(args.rules)
+    print(f"{rules.source}: {len(rules)} rules over {len(rules.features)} features")
+
+    X = random_rows(20_000, seed=1)
+    bits = rules.bitsets(X)
+    expected = np.array([sum(1 << i for i, r in enumerate(rules.rules)
+                             if _evaluate(r["when"], row)) for row in X.tolist()],
+                        dtype=np.uint64)
+    assert (bits == expected).all(), "vectorized flags disagree with the per-row evaluator"
+    assert (rules.masks(X) == ((bits[:, None] >> np.arange(len(rules), dtype=np.uint64))
+                               & np.uint64(1)).astype(bool)).all()
+    print(f"OK: bitsets match the per-row evaluator on {len(X):,} rows")
+
+    X = random_rows(args.rows, seed=2)
+    rules.bitsets(X[:BLOCK])
+    t0 = time.perf_counter()
+    bits = rules.bitsets(X)
+    secs = time.perf_counter() - t0
+    print(f"{args.rows:,} rows in {secs * 1e3:.0f} ms ({args.rows / secs / 1e6:.1f}M rows/sec)")
+    for name, n in rules.counts(X[:1_000_000]).items():
+        print(f"  {name:<24} {n / min(args.rows, 1_000_000):>6.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""
+Local HTTP prediction service (asyncio, standard library only).
+
+Concurrent requests are coalesced into micro-batches: the batcher waits at
+most --max-wait-us for up to --max-batch patients, then scores the whole
+batch with one compiled-tree traversal.  Repeat patients are answered from
+a PredictionCache, and with a lookup table (the default when the tree is
+small enough) a cache miss is a single table index, so the batcher only
+handles trees too large to tabulate.
+
+The model comes from a ModelRegistry: a retrained file is validated and
+swapped in without a restart (--watch), each request is scored start to
+finish on the version it began with, and every response names that
+version in `model_version`.
+
+With --shadow, every request is also scored by candidate models in a
+background thread (see shadow.ShadowMonitor); responses still come from
+the primary, and disagreements show up under /stats and --shadow-log.
+
+With --audit-log, every prediction is appended to a SQLite audit log by a
+background writer (see audit_log.py); an optional "session_id" and
+"patient_id" in the request body are recorded with it.
+
+    python service.py --port 8000 --max-batch 64 --max-wait-us 500
+    python service.py --shadow retrained.pkl --shadow-log shadow.jsonl
+    python service.py --drift-state drift_state.npz --drift-reference drift_reference.npz
+    python service.py --audit-log audit_log.db --audit-retention-days 365
+
+    POST /predict        {"age": 54, "sex": 1, ...}  → class, label, disease_p, risk_label, leaf
+    POST /probability    same body                   → per-class probabilities
+    POST /decision-path  same body                   → get_decision_path steps
+    GET  /health, /stats
+    GET  /drift                                      → PSI / KS of recent inputs (see drift.py)
+    GET  /metrics                                    → Prometheus text
+"""
+import asyncio
+import json
+import sys
+
+import numpy as np
+
+import metrics
+from audit_log import AuditLog
+from core import CLASS_NAMES, MODEL_PATH, patient_vector, risk_label
+from drift import open_monitor
+from lookup_table import load_table
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, make_entry
+from shadow import ShadowMonitor, load_shadows
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Content Too Large",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+# One patient is ~250 bytes of JSON; anything past these limits is refused
+# before it is buffered.
+MAX_BODY        = 8 * 1024
+MAX_HEADERS     = 64
+MAX_HEADER_LINE = 8 * 1024
+
+
+# ─────────────────────────────────────────────────────────────────
+# MICRO-BATCHING
+# ─────────────────────────────────────────────────────────────────
+class MicroBatcher:
+    """Queue of pending rows flushed as one vectorized score() per model version."""
+
+    def __init__(self, max_batch=64, max_wait_us=500):
+        self.max_batch = max_batch
+        self.max_wait  = max_wait_us / 1e6
+        self.queue     = asyncio.Queue()
+        self.batches   = 0
+        self.rows      = 0
+
+    async def submit(self, tree, values):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((tree, values, fut))
+        return await fut
+
+    async def _collect(self):
+        loop  = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _flush(self, tree, items):
+        X = np.array([values for _, values, _ in items], dtype=np.float64)
+        try:
+            res = tree.score(X)
+        except Exception as e:
+            for _, _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.batches += 1
+        self.rows    += len(items)
+        for i, (_, _, fut) in enumerate(items):
+            if not fut.done():
+                fut.set_result((X[i:i + 1], res.pred[i], res.proba[i],
+                                res.leaf[i], res.path[i]))
+
+    async def run(self):
+        while True:
+            batch = await self._collect()
+            # Rows queued across a model swap are scored by their own version.
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[0]), []).append(item)
+            for items in groups.values():
+                self._flush(items[0][0], items)
+
+
+# ─────────────────────────────────────────────────────────────────
+# ENDPOINTS
+# ─────────────────────────────────────────────────────────────────
+class PredictionService:
+    def __init__(self, registry, max_batch=64, max_wait_us=500, cache_size=4096,
+                 use_table=True, pinned_table=None, shadow=None, drift_options=None,
+                 audit=None):
+        self.registry     = registry
+        self.shadow       = shadow
+        self.audit        = audit
+        self.drift_options = drift_options or {}
+        self.drift        = None
+        self.batcher      = MicroBatcher(max_batch, max_wait_us)
+        self.cache        = PredictionCache(cache_size)
+        self.use_table    = use_table
+        self.pinned_table = pinned_table
+
+    def _table(self, version):
+        if not self.use_table:
+            return None
+        pinned = self.pinned_table
+        if pinned is not None and pinned.fingerprint == version.tree.fingerprint():
+            return pinned
+        return version.table
+
+    async def _score(self, body):
+        """prediction_cache entry for the request's patient."""
+        try:
+            patient = json.loads(body or b"null")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}") from None
+        ids = {}
+        if isinstance(patient, dict):
+            ids = {k: str(patient.pop(k)) for k in ("session_id", "patient_id") if k in patient}
+        values  = patient_vector(patient)
+        version = self.registry.current()
+        tree    = version.tree
+        entry   = self.cache.get(tree, values)
+        if entry is None:
+            table = self._table(version)
+            if table is not None:
+                entry = make_entry(tree, *table.score_one(values))
+            else:
+                entry = make_entry(tree, *await self.batcher.submit(tree, values))
+            self.cache.put(tree, values, entry)
+        if self.shadow is not None:
+            self.shadow.submit(tree, values)
+        self._drift(tree).update(values, entry["pred"], entry["leaf"])
+        if self.audit is not None:
+            self.audit.record(values, entry["pred"], entry["proba"][1], entry["leaf"],
+                              entry["model"], ids.get("session_id"), ids.get("patient_id"))
+        return entry
+
+    def _drift(self, tree):
+        # Bins follow the tree's thresholds, so a new model version starts a new monitor.
+        mon = self.drift
+        if mon is None or mon.tree is not tree:
+            if mon is not None:
+                mon.stop()
+            mon = self.drift = open_monitor(tree, **self.drift_options)
+        return mon
+
+    async def predict(self, body):
+        e = await self._score(body)
+        return {"class": int(e["pred"]), "label": CLASS_NAMES[int(e["pred"])],
+                "disease_p": float(e["proba"][1]), "risk_label": risk_label(e["proba"][1]),
+                "leaf": e["leaf"], "model_version": e["model"]}
+
+    async def probability(self, body):
+        e = await self._score(body)
+        return {"proba": dict(zip(CLASS_NAMES, e["proba"].tolist())),
+                "disease_p": float(e["proba"][1]), "risk_label": risk_label(e["proba"][1]),
+                "model_version": e["model"]}
+
+    async def decision_path(self, body):
+        e = await self._score(body)
+        return {"path": e["path"], "model_version": e["model"]}
+
+    async def stats(self, body):
+        b     = self.batcher
+        table = self._table(self.registry.current())
+        out   = {"batches": b.batches, "rows": b.rows,
+                 "mean_batch": b.rows / b.batches if b.batches else 0.0,
+                 "max_batch": b.max_batch, "max_wait_us": b.max_wait * 1e6,
+                 "lookup_cells": len(table) if table is not None else 0,
+                 "cache": self.cache.stats(), "model": self.registry.stats()}
+        if self.shadow is not None:
+            out["shadow"] = self.shadow.stats()
+        if self.audit is not None:
+            out["audit"] = self.audit.stats()
+        return out
+
+    async def drift_report(self, body):
+        return self._drift(self.registry.current().tree).report()
+
+    async def health(self, body):
+        return {"status": "ok", "model_version": self.registry.current().version}
+
+    async def prometheus(self, body):
+        return metrics.prometheus_text()
+
+    def routes(self):
+        return {("POST", "/predict"):       self.predict,
+                ("POST", "/probability"):   self.probability,
+                ("POST", "/decision-path"): self.decision_path,
+                ("GET",  "/stats"):         self.stats,
+                ("GET",  "/drift"):         self.drift_report,
+                ("GET",  "/health"):        self.health,
+                ("GET",  "/metrics"):       self.prometheus}
+
+
+# ─────────────────────────────────────────────────────────────────
+# HTTP
+# ─────────────────────────────────────────────────────────────────
+def _jsonable(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+async def _handle(routes, reader, writer):
+    try:
+        while True:
+            try:
+                request_line = await reader.readline()
+            except ValueError:                  # longer than MAX_HEADER_LINE
+                break
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers, refused = {}, None
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    refused = 431, "header line too long"
+                    break
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                if len(headers) >= MAX_HEADERS:
+                    refused = 431, f"more than {MAX_HEADERS} headers"
+                    break
+                k, _, v = line.decode("latin-1").partition(":")
+                headers[k.strip().lower()] = v.strip()
+            if refused is None:
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    refused = 400, f"invalid Content-Length: {headers['content-length']!r}"
+                else:
+                    if length > MAX_BODY:
+                        refused = 413, f"body of {length:,} bytes; at most {MAX_BODY:,}"
+            body = await reader.readexactly(length) if refused is None else b""
+
+            path    = target.split("?", 1)[0]
+            handler = routes.get((method, path))
+            if refused is not None:
+                # The rest of the request is not read, so answer and close.
+                status, error = refused
+                result = {"error": error}
+            elif handler is None:
+                known  = any(p == path for _, p in routes)
+                status = 405 if known else 404
+                result = {"error": REASONS[status]}
+            else:
+                try:
+                    with metrics.timer("http_request", route=path):
+                        status, result = 200, await handler(body)
+                except ValueError as e:
+                    status, result = 400, {"error": str(e)}
+                except Exception as e:
+                    status, result = 500, {"error": f"{type(e).__name__}: {e}"}
+            metrics.count("http_responses", status=status)
+
+            if isinstance(result, str):
+                payload, ctype = result.encode(), metrics.CONTENT_TYPE
+            else:
+                payload, ctype = json.dumps(result, default=_jsonable).encode(), "application/json"
+            keep_alive = (refused is None and version == "HTTP/1.1"
+                          and headers.get("connection", "").lower() != "close")
+            writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                          f"Content-Type: {ctype}\r\n"
+                          f"Content-Length: {len(payload)}\r\n"
+                          f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                          f"\r\n").encode() + payload)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(registry, host="127.0.0.1", port=8000, max_batch=64, max_wait_us=500,
+                cache_size=4096, use_table=True, pinned_table=None, shadow=None,
+                drift_options=None, audit=None):
+    service = PredictionService(registry, max_batch, max_wait_us, cache_size,
+                                use_table, pinned_table, shadow, drift_options, audit)
+    routes  = service.routes()
+    batcher = asyncio.create_task(service.batcher.run())
+    server  = await asyncio.start_server(lambda r, w: _handle(routes, r, w), host, port,
+                                         limit=MAX_HEADER_LINE)
+    print(f"🫀  serving on http://{host}:{port}  "
+          f"(model={registry.current().version}, max_batch={max_batch}, "
+          f"max_wait_us={max_wait_us}, lookup_table={'on' if use_table else 'off'}, "
+          f"shadows={list(shadow.shadows) if shadow is not None else []})",
+          file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+        if service.drift is not None:
+            service.drift.stop()
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    ap = argparse.ArgumentParser(description="Serve predictions over HTTP.")
+    ap.add_argument("--model", default=MODEL_PATH, help=".pkl or .hdt model")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--max-wait-us", type=int, default=500)
+    ap.add_argument("--cache-size", type=int, default=4096,
+                    help="prediction cache entries (0 disables)")
+    ap.add_argument("--lookup-table", metavar="PATH",
+                    help="precompiled table from lookup_table.py (default: build at startup)")
+    ap.add_argument("--no-lookup-table", action="store_true",
+                    help="score every cache miss through the micro-batcher")
+    ap.add_argument("--watch", type=float, default=2.0, metavar="SECONDS",
+                    help="poll the model file and hot-swap retrains (0 disables)")
+    ap.add_argument("--shadow", action="append", default=[], metavar="PATH",
+                    help="candidate model scored alongside the primary (repeatable)")
+    ap.add_argument("--shadow-log", metavar="PATH",
+                    help="append each shadow disagreement here as a JSON line")
+    ap.add_argument("--drift-state", metavar="PATH",
+                    help="resume drift histograms from here and save them periodically")
+    ap.add_argument("--drift-reference", metavar="PATH",
+                    help="reference counts from `python drift.py reference`")
+    ap.add_argument("--drift-window", type=int, default=10_000, help="rows in the drift window")
+    ap.add_argument("--drift-save-s", type=float, default=30.0,
+                    help="seconds between drift state saves")
+    ap.add_argument("--audit-log", metavar="PATH",
+                    help="record every prediction in this SQLite audit log")
+    ap.add_argument("--audit-retention-days", type=float,
+                    help="delete audit rows older than this (checked hourly)")
+    args = ap.parse_args(argv)
+
+    use_table = not args.no_lookup_table
+    registry  = ModelRegistry(args.model, args.watch, build_table=use_table)
+    pinned    = None
+    if args.lookup_table and use_table:
+        # Used while it matches the served model; a swap falls back to a fresh table.
+        pinned = load_table(args.lookup_table, registry.current().tree)
+    shadow = None
+    if args.shadow:
+        shadow = ShadowMonitor(load_shadows(args.shadow), args.shadow_log)
+        for name, cost in shadow.calibrate(registry.current().tree).items():
+            print(f"shadow {name}: +{cost['single_us']:.1f} µs per request, "
+                  f"+{cost['batch_ns_per_row']:.0f} ns/row batched", file=sys.stderr)
+        shadow.start()
+    audit = None
+    if args.audit_log:
+        audit = AuditLog(args.audit_log, retention_days=args.audit_retention_days).start()
+    registry.start()
+    try:
+        drift_options = {"state_path": args.drift_state, "reference_path": args.drift_reference,
+                         "window": args.drift_window, "interval": args.drift_save_s}
+        asyncio.run(serve(registry, args.host, args.port, args.max_batch, args.max_wait_us,
+                          args.cache_size, use_table, pinned, shadow, drift_options, audit))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.stop()
+        if shadow is not None:
+            shadow.stop()
+        if audit is not None:
+            audit.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""
+Shadow / A-B scoring of candidate trees against the production model.
+
+ModelStack packs several compiled trees into one set of node arrays (each
+tree's node ids offset past the previous one), so a batch is scored by
+every model in a single vectorized traversal.  ShadowMonitor keeps that
+off the request path: the service answers from the primary model as
+before and only enqueues the patient; a background thread drains the
+queue, scores primary + shadows in one stacked pass, and accumulates
+disagreement statistics (optionally logging each disagreement as a JSON
+line).
+
+`disagreement_regions` intersects the leaf boxes of two trees (see
+leaf_index) and keeps the pieces where they predict different classes,
+with the share of the sidebar input space each piece covers.
+
+    python shadow.py                       # self-check against a leaf-flipped copy
+    python shadow.py candidate.pkl         # compare a retrained model
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+
+import metrics
+from core import CLASS_NAMES, FEATURE_DOMAINS, FEATURE_LABELS, FEATURE_NAMES, MODEL_PATH
+
+
+class ModelStack:
+    """Trees packed end to end for one traversal over all of them."""
+
+    def __init__(self, trees, names=None):
+        if not trees:
+            raise ValueError("need at least one tree")
+        n_classes = {len(t.classes) for t in trees}
+        if len(n_classes) != 1:
+            raise ValueError(f"trees disagree on the number of classes: {sorted(n_classes)}")
+        self.trees     = list(trees)
+        self.names     = list(names) if names is not None else [t.fingerprint()[:12] for t in trees]
+        counts         = np.array([t.node_count for t in trees])
+        self.offsets   = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.intp)
+        self.feature   = np.concatenate([t.feature for t in trees])
+        self.threshold = np.concatenate([t.threshold for t in trees])
+        self.children_left  = np.concatenate([t.children_left + o
+                                              for t, o in zip(trees, self.offsets)])
+        self.children_right = np.concatenate([t.children_right + o
+                                              for t, o in zip(trees, self.offsets)])
+        self.proba     = np.concatenate([t.proba for t in trees])
+        self.classes   = trees[0].classes
+        self.max_depth = max(t.max_depth for t in trees)
+
+    def __len__(self):
+        return len(self.trees)
+
+    def apply(self, X):
+        """(k, n) leaf ids, each in its own tree's node numbering."""
+        X    = self.trees[0].validate(X)
+        n, k = len(X), len(self.trees)
+        rows = np.tile(np.arange(n), k)
+        node = np.repeat(self.offsets, n)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.children_left[node], self.children_right[node])
+        return node.reshape(k, n) - self.offsets[:, None]
+
+    def score(self, X):
+        """(pred (k, n), proba (k, n, classes), leaf (k, n)) for every model."""
+        leaf  = self.apply(X)
+        proba = self.proba[leaf + self.offsets[:, None]]
+        pred  = self.classes.take(np.argmax(proba, axis=2))
+        return pred, proba, leaf
+
+
+# ─────────────────────────────────────────────────────────────────
+# OVERHEAD
+# ─────────────────────────────────────────────────────────────────
+def _best_us(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def overhead(primary, shadows, batch=1024, repeat=200, seed=0):
+    """Added cost of scoring each shadow alongside the primary.
+
+    {name: {"single_us", "batch_ns_per_row"}}: a stacked [primary, shadow]
+    pass minus the primary alone, for one row and for `batch` rows.
+    """
+    from model_registry import canary_batch
+    X   = canary_batch(batch, seed)
+    one = X[:1]
+    base_one   = _best_us(lambda: primary.score(one, return_path=False), repeat)
+    base_batch = _best_us(lambda: primary.score(X, return_path=False), max(3, repeat // 20))
+    out = {}
+    for name, tree in shadows.items():
+        stack = ModelStack([primary, tree])
+        one_us   = _best_us(lambda: stack.score(one), repeat)
+        batch_us = _best_us(lambda: stack.score(X), max(3, repeat // 20))
+        out[name] = {"single_us": one_us - base_one,
+                     "batch_ns_per_row": (batch_us - base_batch) / batch * 1e3}
+    return out
+
+
+# ─────────────────────────────────────────────────────────────────
+# LIVE MONITOR
+# ─────────────────────────────────────────────────────────────────
+class _ShadowStats:
+    def __init__(self):
+        self.rows          = 0
+        self.disagreements = 0
+        self.abs_dp_sum    = 0.0
+        self.max_abs_dp    = 0.0
+        self.confusion     = np.zeros((len(CLASS_NAMES), len(CLASS_NAMES)), dtype=np.int64)
+        self.leaf_pairs    = Counter()
+
+    def as_dict(self, top=5):
+        return {"rows": self.rows, "disagreements": self.disagreements,
+                "disagreement_rate": self.disagreements / self.rows if self.rows else 0.0,
+                "mean_abs_dp": self.abs_dp_sum / self.rows if self.rows else 0.0,
+                "max_abs_dp": self.max_abs_dp,
+                "confusion": self.confusion.tolist(),
+                "top_leaf_pairs": [{"primary_leaf": a, "shadow_leaf": b, "rows": c}
+                                   for (a, b), c in self.leaf_pairs.most_common(top)]}
+
+
+class ShadowMonitor:
+    """Scores enqueued patients with primary + shadows off the request path.
+
+    `shadows` maps a name to a CompiledTree.  `submit` never blocks: when
+    the queue is full the row is dropped and counted.
+    """
+
+    def __init__(self, shadows, log_path=None, max_batch=256, max_queue=65_536):
+        self.shadows   = dict(shadows)
+        self.log_path  = log_path
+        self.max_batch = max_batch
+        self.queue     = queue.Queue(max_queue)
+        self.dropped   = 0
+        self.batches   = 0
+        self.pass_us   = 0.0
+        self.per_model = {name: _ShadowStats() for name in self.shadows}
+        self.overhead  = {}
+        self._stack    = None
+        self._lock     = threading.Lock()
+        self._thread   = None
+        self._log      = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    def submit(self, primary, values):
+        """Queue one patient scored by `primary` (a CompiledTree) for comparison."""
+        if not self.shadows:
+            return
+        try:
+            self.queue.put_nowait((primary, values))
+        except queue.Full:
+            self.dropped += 1
+            metrics.count("shadow_dropped")
+
+    def _stack_for(self, primary):
+        stack = self._stack
+        if stack is None or stack.trees[0] is not primary:
+            stack = self._stack = ModelStack([primary, *self.shadows.values()],
+                                             ["primary", *self.shadows])
+        return stack
+
+    def _drain(self):
+        items = [self.queue.get()]
+        while len(items) < self.max_batch:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _compare(self, primary, rows):
+        stack = self._stack_for(primary)
+        X     = np.array(rows, dtype=np.float64)
+        t0    = time.perf_counter()
+        pred, proba, leaf = stack.score(X)
+        elapsed = time.perf_counter() - t0
+        metrics.observe("shadow_pass", elapsed, models=str(len(stack)))
+        records = []
+        with self._lock:
+            self.batches += 1
+            self.pass_us += elapsed * 1e6
+            for k, name in enumerate(stack.names[1:], start=1):
+                st   = self.per_model[name]
+                dp   = np.abs(proba[k, :, 1] - proba[0, :, 1])
+                diff = np.flatnonzero(pred[k] != pred[0])
+                st.rows          += len(X)
+                st.disagreements += len(diff)
+                st.abs_dp_sum    += float(dp.sum())
+                st.max_abs_dp     = max(st.max_abs_dp, float(dp.max()))
+                np.add.at(st.confusion, (pred[0], pred[k]), 1)
+                st.leaf_pairs.update(zip(leaf[0, diff].tolist(), leaf[k, diff].tolist()))
+                if len(diff):
+                    metrics.count("shadow_disagreements", len(diff), model=name)
+                for i in diff if self._log is not None else ():
+                    records.append({"shadow": name, "primary": primary.fingerprint()[:12],
+                                    "values": rows[i],
+                                    "primary_pred": int(pred[0, i]), "shadow_pred": int(pred[k, i]),
+                                    "primary_p": float(proba[0, i, 1]),
+                                    "shadow_p": float(proba[k, i, 1]),
+                                    "primary_leaf": int(leaf[0, i]),
+                                    "shadow_leaf": int(leaf[k, i])})
+        if records:
+            ts = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+            self._log.write("".join(json.dumps({"ts": ts, **r}) + "\n" for r in records))
+            self._log.flush()
+
+    def _run(self):
+        while True:
+            items = self._drain()
+            # submit() can race stop(), so the sentinel may sit mid-batch.
+            stop  = None in items
+            if stop:
+                items = [item for item in items if item is not None]
+            # Rows queued across a model swap are compared against their own primary.
+            groups = {}
+            for primary, values in items:
+                groups.setdefault(id(primary), (primary, []))[1].append(values)
+            for primary, rows in groups.values():
+                try:
+                    self._compare(primary, rows)
+                except Exception as e:           # never let the monitor die
+                    print(f"shadow: {type(e).__name__}: {e}", file=sys.stderr)
+            if stop:
+                return
+
+    def calibrate(self, primary):
+        """Measure per-shadow overhead against `primary`; kept for stats()."""
+        self.overhead = overhead(primary, self.shadows)
+        return self.overhead
+
+    def start(self):
+        if self.shadows and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shadow-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Score what is queued, then stop the thread."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def stats(self):
+        with self._lock:
+            rows = sum(s.rows for s in self.per_model.values()) // max(len(self.per_model), 1)
+            return {"models": list(self.shadows), "rows": rows, "batches": self.batches,
+                    "queued": self.queue.qsize(), "dropped": self.dropped,
+                    "stacked_pass_us_per_row": self.pass_us / rows if rows else 0.0,
+                    "overhead": self.overhead,
+                    "shadows": {name: s.as_dict() for name, s in self.per_model.items()}}
+
+
+# ─────────────────────────────────────────────────────────────────
+# LEAF-REGION DISAGREEMENT
+# ─────────────────────────────────────────────────────────────────
+def _domain_span(lo, hi):
+    """(first, stop) positions per feature of sidebar values with lo < x <= hi.
+
+    Positions index each feature's domain sorted as float32; both (m, 13).
+    """
+    first = np.empty(lo.shape, dtype=np.intp)
+    stop  = np.empty(lo.shape, dtype=np.intp)
+    for f, name in enumerate(FEATURE_NAMES):
+        dom = np.sort(FEATURE_DOMAINS[name].astype(np.float32))
+        first[:, f] = np.searchsorted(dom, lo[:, f], side="right")
+        stop[:, f]  = np.searchsorted(dom, hi[:, f], side="right")
+    return first, stop
+
+
+def disagreement_regions(index_a, index_b, min_share=0.0):
+    """Boxes where tree A and tree B predict different classes.
+
+    Every (leaf of A, leaf of B) pair whose boxes overlap is a region on
+    which both trees are constant; pairs with different classes are kept.
+    `share` is the fraction of sidebar inputs in the region, `features`
+    the feature indices it constrains and `point` a sidebar patient inside
+    it (the middle value on every feature).  Sorted by share, largest first.
+    """
+    lo = np.maximum(index_a.lo[:, None, :], index_b.lo[None, :, :])
+    hi = np.minimum(index_a.hi[:, None, :], index_b.hi[None, :, :])
+    ia, ib = np.nonzero((lo < hi).all(axis=2)
+                        & (index_a.pred[:, None] != index_b.pred[None, :]))
+    lo, hi = lo[ia, ib], hi[ia, ib]
+    total  = np.prod([float(len(FEATURE_DOMAINS[f])) for f in FEATURE_NAMES])
+    first, stop = _domain_span(lo, hi)
+    share  = (stop - first).astype(np.float64).prod(axis=1) / total
+    doms   = [np.sort(FEATURE_DOMAINS[f].astype(np.float64)) for f in FEATURE_NAMES]
+    out = []
+    for r in np.argsort(-share, kind="stable"):
+        if share[r] <= min_share:
+            continue
+        a, b  = ia[r], ib[r]
+        terms, feats = [], []
+        for f in range(len(FEATURE_NAMES)):
+            l, h = lo[r, f], hi[r, f]
+            if np.isfinite(l) or np.isfinite(h):
+                feats.append(f)
+            if np.isfinite(l) and np.isfinite(h):
+                terms.append(f"{l:.2f} < {FEATURE_LABELS[f]} ≤ {h:.2f}")
+            elif np.isfinite(l):
+                terms.append(f"{FEATURE_LABELS[f]} > {l:.2f}")
+            elif np.isfinite(h):
+                terms.append(f"{FEATURE_LABELS[f]} ≤ {h:.2f}")
+        out.append({"leaf_a": int(index_a.leaves[a]), "leaf_b": int(index_b.leaves[b]),
+                    "class_a": CLASS_NAMES[int(index_a.pred[a])],
+                    "class_b": CLASS_NAMES[int(index_b.pred[b])],
+                    "p_a": float(index_a.proba[a, 1]), "p_b": float(index_b.proba[b, 1]),
+                    "share": float(share[r]), "region": terms, "features": feats,
+                    "point": [float(doms[f][(first[r, f] + stop[r, f] - 1) // 2])
+                              for f in range(len(FEATURE_NAMES))]})
+    return out
+
+
+def slice_grid(values, fx, fy):
+    """Sidebar grid over features `fx` × `fy` with the rest fixed to `values`.
+
+    Returns (xs, ys, X) with X row-major over (ys, xs).
+    """
+    xs = FEATURE_DOMAINS[FEATURE_NAMES[fx]].astype(np.float64)
+    ys = FEATURE_DOMAINS[FEATURE_NAMES[fy]].astype(np.float64)
+    X  = np.tile(np.asarray(values, dtype=np.float64), (len(xs) * len(ys), 1))
+    X[:, fx] = np.tile(xs, len(ys))
+    X[:, fy] = np.repeat(ys, len(xs))
+    return xs, ys, X
+
+
+def load_shadows(paths):
+    """{name: CompiledTree} for .pkl / .hdt paths; names are file stems."""
+    from model_artifact import load_tree
+    out = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in out:
+            name = f"{name}-{len(out)}"
+        out[name] = load_tree(path)
+    return out
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    from leaf_index import LeafIndex
+    from model_artifact import load_tree
+    from tree_engine import CompiledTree, check_grid, exhaustive_grid
+    ap = argparse.ArgumentParser(description="Compare candidate models against the primary.")
+    ap.add_argument("candidates", nargs="*", help=".pkl / .hdt candidates "
+                                                  "(default: a leaf-flipped copy of --model)")
+    ap.add_argument("--model", default=MODEL_PATH, help="primary model")
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--top", type=int, default=5, help="disagreement regions to print")
+    args = ap.parse_args(argv)
+
+    primary = load_tree(args.model)
+    if args.candidates:
+        shadows = load_shadows(args.candidates)
+    else:
+        leaf  = int(np.flatnonzero(primary.is_leaf)[0])
+        proba = primary.proba.copy()
+        proba[leaf] = proba[leaf][::-1]
+        shadows = {"flipped": CompiledTree(primary.feature, primary.threshold,
+                                           primary.children_left, primary.children_right,
+                                           proba, primary.n_node_samples, primary.classes,
+                                           primary.meta)}
+
+    # The stacked pass must match each tree scored on its own.
+    stack = ModelStack([primary, *shadows.values()], ["primary", *shadows])
+    X     = check_grid(primary, args.rows)
+    pred, proba, leaf = stack.score(X)
+    ok = True
+    for k, tree in enumerate(stack.trees):
+        res  = tree.score(X, return_path=False)
+        same = ((res.pred == pred[k]).all() and (res.leaf == leaf[k]).all()
+                and (res.proba == proba[k]).all())
+        ok  &= bool(same)
+        print(f"{'OK ' if same else 'MISMATCH'}  stacked pass vs {stack.names[k]} alone "
+              f"({len(X):,} rows)")
+
+    cost = overhead(primary, shadows)
+    index_p = LeafIndex(primary)
+    grid    = exhaustive_grid(primary)
+    for name, tree in shadows.items():
+        pair  = ModelStack([primary, tree]).score(grid)[0]
+        rate  = float((pair[0] != pair[1]).mean())
+        regions = disagreement_regions(index_p, LeafIndex(tree))
+        if regions:
+            pts = np.array([r["point"] for r in regions])
+            in_region = ModelStack([primary, tree]).score(pts)[0]
+            ok &= bool((in_region[0] != in_region[1]).all())
+        print(f"\n{name}: +{cost[name]['single_us']:.1f} µs per single request · "
+              f"+{cost[name]['batch_ns_per_row']:.0f} ns/row batched · "
+              f"disagrees on {rate * 100:.2f}% of bin combinations · "
+              f"{len(regions)} disagreement regions covering "
+              f"{sum(r['share'] for r in regions) * 100:.2f}% of sidebar inputs")
+        for r in regions[:args.top]:
+            print(f"  {r['share'] * 100:6.2f}%  leaf {r['leaf_a']} {r['class_a']} "
+                  f"({r['p_a']:.2f}) vs leaf {r['leaf_b']} {r['class_b']} ({r['p_b']:.2f})  "
+                  + " · ".join(r["region"]))
+
+    # Live path: enqueue the check rows, let the monitor compare them.
+    monitor = ShadowMonitor(shadows).start()
+    for row in X[:5000].tolist():
+        monitor.submit(primary, row)
+    monitor.stop()
+    live = monitor.stats()
+    for name, s in live["shadows"].items():
+        expect = int((pred[0, :5000] != pred[list(shadows).index(name) + 1, :5000]).sum())
+        ok &= s["disagreements"] == expect
+        print(f"\nmonitor {name}: {s['rows']:,} rows · {s['disagreements']} disagreements "
+              f"(expected {expect}) · mean |Δp| {s['mean_abs_dp']:.4f}")
+    print("✅  shadow scoring OK" if ok else "❌  shadow scoring failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Startup profiler and cold-import budget check.
+
+Every measurement runs in a fresh interpreter so module caches do not hide
+cold-start cost.  Reports per-module import time (from -X importtime) and
+model load / compile time; with --budget-ms it exits non-zero when a cold
+import of the prediction core (core + tree_engine) goes over budget.
+
+    python startup_profile.py
+    python startup_profile.py --budget-ms 250      # exit 1 over budget
+"""
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CORE_MODULES = ["core", "tree_engine"]
+# What app.py used to pull in before the first paint.
+HEAVY_MODULES = ["streamlit", "pandas", "matplotlib.pyplot", "sklearn.tree"]
+# Cold import of CORE_MODULES, enforced by tests/test_startup.py; ~80 ms today.
+CORE_IMPORT_BUDGET_MS = 250
+
+
+def _fresh(code, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    proc = subprocess.run(cmd, cwd=HERE, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return proc
+
+
+def import_profile(modules):
+    """Cold import of `modules`: wall-clock ms and per-module (self, cumulative) µs."""
+    code = ("import time; t = time.perf_counter()\n"
+            f"import {', '.join(modules)}\n"
+            "print((time.perf_counter() - t) * 1e3)")
+    proc = _fresh(code, importtime=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({"module": name.strip(), "self_us": int(self_us),
+                     "cumulative_us": int(cum_us), "depth": depth})
+    return float(proc.stdout.strip().splitlines()[-1]), rows
+
+
+def model_load_profile(model_path):
+    code = ("import json, time, warnings\n"
+            "warnings.filterwarnings('ignore')\n"
+            "t0 = time.perf_counter()\n"
+            "import core, tree_engine\n"
+            "t1 = time.perf_counter()\n"
+            f"model = core.load_model({model_path!r})\n"
+            "t2 = time.perf_counter()\n"
+            "tree = tree_engine.compile_model(model)\n"
+            "t3 = time.perf_counter()\n"
+            "print(json.dumps({'import_core_ms': (t1 - t0) * 1e3,\n"
+            "                  'load_model_ms':  (t2 - t1) * 1e3,\n"
+            "                  'compile_ms':     (t3 - t2) * 1e3}))")
+    return json.loads(_fresh(code).stdout.strip().splitlines()[-1])
+
+
+def core_import_ms(repeat=3):
+    """Median cold-import wall time of the prediction core."""
+    times = sorted(import_profile(CORE_MODULES)[0] for _ in range(repeat))
+    return times[len(times) // 2]
+
+
+def report(model_path, top=15):
+    wall, rows = import_profile(CORE_MODULES + HEAVY_MODULES)
+    top_level  = sorted((r for r in rows if r["depth"] == 0),
+                        key=lambda r: r["cumulative_us"], reverse=True)
+    print(f"Cold import of core + heavy UI modules: {wall:,.1f} ms")
+    print(f"{'module':<40} {'self ms':>9} {'cumul ms':>9}")
+    for r in top_level[:top]:
+        print(f"{r['module']:<40} {r['self_us'] / 1e3:>9.1f} {r['cumulative_us'] / 1e3:>9.1f}")
+    print()
+    for name, ms in model_load_profile(model_path).items():
+        print(f"{name:<40} {ms:>9.1f}")
+
+
+def main(argv=None):
+    import argparse
+    from core import MODEL_PATH
+    ap = argparse.ArgumentParser(description="Profile cold start of the app's modules.")
+    ap.add_argument("--model", default=MODEL_PATH)
+    ap.add_argument("--budget-ms", type=float,
+                    help="fail if cold import of the prediction core exceeds this")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    if args.budget_ms is None:
+        report(args.model)
+        return 0
+    ms = core_import_ms(args.repeat)
+    ok = ms <= args.budget_ms
+    print(f"{'✅' if ok else '❌'}  cold import of {' + '.join(CORE_MODULES)}: "
+          f"{ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
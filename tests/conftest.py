@@ -0,0 +1,37 @@
+import os
+import sys
+import warnings
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import MODEL_PATH, load_model          # noqa: E402
+from tree_engine import compile_model, exhaustive_grid   # noqa: E402
+
+
+def pytest_configure(config):
+    # Plain arrays into a model fitted on a DataFrame, as the app does.
+    config.addinivalue_line("filterwarnings",
+                            "ignore:X does not have valid feature names:UserWarning")
+
+
+@pytest.fixture(scope="session")
+def model():
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip(f"{os.path.basename(MODEL_PATH)} not found")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return load_model()
+
+
+@pytest.fixture(scope="session")
+def tree(model):
+    return compile_model(model)
+
+
+@pytest.fixture(scope="session")
+def grid(tree):
+    # Every bin-edge combination over the sidebar domains (~2.7M rows).
+    return exhaustive_grid(tree)
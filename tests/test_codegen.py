@@ -0,0 +1,42 @@
+import ast
+
+import numpy as np
+import pytest
+
+from codegen import generate, load_generated, verify
+
+
+@pytest.fixture(scope="module")
+def gen(tree, tmp_path_factory):
+    path = tmp_path_factory.mktemp("codegen") / "heart_tree_generated.py"
+    path.write_text(generate(tree))
+    return load_generated(str(path))
+
+
+def test_generated_module_is_standalone(gen):
+    with open(gen.__file__) as f:
+        source = ast.parse(f.read())
+    imported = {alias.name.split(".")[0] for node in ast.walk(source)
+                if isinstance(node, ast.Import) for alias in node.names}
+    imported |= {node.module.split(".")[0] for node in ast.walk(source)
+                 if isinstance(node, ast.ImportFrom)}
+    assert imported <= {"numpy"}, imported
+
+
+def test_predict_batch_matches_sklearn_on_exhaustive_grid(gen, model, grid):
+    pred, proba, leaf = gen.predict_batch(grid)
+    np.testing.assert_array_equal(pred, model.predict(grid))
+    np.testing.assert_array_equal(proba, model.predict_proba(grid))
+    np.testing.assert_array_equal(leaf, model.apply(grid))
+
+
+def test_predict_one_matches_sklearn_on_exhaustive_grid(gen, model, tree):
+    n, bad_batch, bad_one = verify(gen, model, tree)
+    assert (bad_batch, bad_one) == (0, 0), f"{bad_batch} / {bad_one} of {n:,} rows disagree"
+
+
+def test_predict_one_returns_python_values(gen, model):
+    x = [54, 1, 0, 130, 240, 0, 0, 150, 0, 1.0, 1, 0, 2]
+    c, p, leaf = gen.predict_one(*x)
+    assert c == model.predict([x])[0] and leaf == model.apply([x])[0]
+    assert p == tuple(model.predict_proba([x])[0])
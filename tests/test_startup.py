@@ -0,0 +1,18 @@
+import json
+
+from startup_profile import (CORE_IMPORT_BUDGET_MS, CORE_MODULES, HEAVY_MODULES, _fresh,
+                             core_import_ms)
+
+
+def test_core_import_within_budget():
+    ms = core_import_ms(repeat=3)
+    assert ms <= CORE_IMPORT_BUDGET_MS, (
+        f"cold import of {' + '.join(CORE_MODULES)} took {ms:.1f} ms "
+        f"(budget {CORE_IMPORT_BUDGET_MS} ms); see `python startup_profile.py`")
+
+
+def test_core_does_not_import_ui_modules():
+    code = (f"import sys, json, {', '.join(CORE_MODULES)}\n"
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    loaded = json.loads(_fresh(code).stdout.strip().splitlines()[-1])
+    assert loaded == [], f"the prediction core now imports {loaded} at startup"
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from core import FEATURE_NAMES, get_decision_path
+from tree_engine import check_grid, verify
+
+
+def sklearn_path(model, X, i):
+    dp = model.decision_path(X).tocsr()
+    return dp.indices[dp.indptr[i]:dp.indptr[i + 1]]
+
+
+def test_matches_sklearn_on_exhaustive_grid(model, tree, grid):
+    verify(model, tree, grid)
+
+
+def test_matches_sklearn_on_boundary_sample(model, tree):
+    verify(model, tree, check_grid(tree, 20_000, seed=1))
+
+
+def test_single_row(model, tree):
+    x = [54, 1, 0, 130, 240, 0, 0, 150, 0, 1.0, 1, 0, 2]
+    for X in (x, np.array([x], dtype=float)):
+        res = tree.score(X)
+        assert res.pred.shape == (1,) and res.proba.shape == (1, 2)
+        np.testing.assert_array_equal(res.pred, model.predict([x]))
+        np.testing.assert_array_equal(res.proba, model.predict_proba([x]))
+        np.testing.assert_array_equal(res.leaf, model.apply([x]))
+        np.testing.assert_array_equal(res.path[0][res.path[0] >= 0],
+                                      sklearn_path(model, np.array([x], dtype=float), 0))
+    leaf, path = tree.apply(x)
+    assert path is None and leaf[0] == res.leaf[0]
+    steps = get_decision_path(tree, np.array([x], dtype=float))
+    assert [s["node"] for s in steps] == res.path[0][res.path[0] >= 0].tolist()
+    assert steps[-1]["leaf"] and steps[-1]["node"] == res.leaf[0]
+
+
+def test_batch_paths(model, tree):
+    X = check_grid(tree, 500, seed=2)
+    res = tree.score(X)
+    leaf, path = tree.apply(X, return_path=True)
+    np.testing.assert_array_equal(leaf, res.leaf)
+    np.testing.assert_array_equal(path, res.path)
+    assert path.shape == (len(X), tree.max_depth + 1)
+    for i in range(len(X)):
+        nodes = path[i][path[i] >= 0]
+        np.testing.assert_array_equal(nodes, sklearn_path(model, X, i))
+        assert nodes[-1] == leaf[i] and tree.is_leaf[leaf[i]]
+    np.testing.assert_array_equal(tree.predict(X), model.predict(X))
+    np.testing.assert_array_equal(tree.predict_proba(X), model.predict_proba(X))
+
+
+def test_empty_batch(tree):
+    res = tree.score(np.empty((0, len(FEATURE_NAMES))))
+    assert res.pred.shape == (0,) and res.proba.shape == (0, 2) and res.path.shape[0] == 0
+
+
+@pytest.mark.parametrize("X", [np.zeros((2, 12)), [[np.nan] * 13], [[np.inf] * 13]])
+def test_rejects_bad_input(tree, X):
+    with pytest.raises(ValueError):
+        tree.score(X)
@@ -0,0 +1,221 @@
+"""
+Compiled flat-array scorer for the fitted DecisionTreeClassifier.
+
+`model.tree_` is packed once into contiguous NumPy arrays; a single
+vectorized traversal then yields class, probabilities, leaf id and the
+node path for one row or millions, bit-for-bit identical to sklearn.
+
+    python tree_engine.py            # self-check against the pickled model
+"""
+import hashlib
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from core import CLASS_NAMES, FEATURE_NAMES, FEATURE_DOMAINS, MODEL_PATH, load_model
+from metrics import timed
+
+TreeScore = namedtuple("TreeScore", ["pred", "proba", "leaf", "path"])
+
+
+class CompiledTree:
+    """Node arrays of a fitted tree, laid out for vectorized traversal.
+
+    Leaves point to themselves in `children_left` / `children_right`, so a
+    fixed `max_depth` loop leaves finished rows parked on their leaf.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right,
+                 proba, n_node_samples, classes, meta=None):
+        self.feature        = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold      = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children_left  = np.ascontiguousarray(children_left, dtype=np.intp)
+        self.children_right = np.ascontiguousarray(children_right, dtype=np.intp)
+        self.proba          = np.ascontiguousarray(proba, dtype=np.float64)
+        self.n_node_samples = np.ascontiguousarray(n_node_samples, dtype=np.int64)
+        self.classes        = np.asarray(classes)
+        self.meta           = dict(meta or {})
+        self.node_count     = len(self.feature)
+        self.is_leaf        = self.children_left == np.arange(self.node_count)
+        self.max_depth      = self._depth()
+        self._fingerprint   = None
+
+    @classmethod
+    def from_model(cls, model):
+        t      = model.tree_
+        nodes  = np.arange(t.node_count)
+        leaf   = t.children_left == -1
+        left   = np.where(leaf, nodes, t.children_left)
+        right  = np.where(leaf, nodes, t.children_right)
+        # Leaves never branch; park them on feature 0 so gathers stay in bounds.
+        feature = np.where(leaf, 0, t.feature)
+        # sklearn >= 1.4 stores class fractions and returns them as-is from
+        # predict_proba; older versions store counts and normalise on the fly.
+        value  = t.value[:, 0, :model.n_classes_].astype(np.float64)
+        norm   = value.sum(axis=1, keepdims=True)
+        if not np.allclose(norm, 1.0):
+            norm[norm == 0.0] = 1.0
+            value = value / norm
+        meta = {"feature_names":       [str(f) for f in getattr(model, "feature_names_in_", FEATURE_NAMES)],
+                "class_names":         list(CLASS_NAMES),
+                "max_depth":           int(model.get_depth()),
+                "feature_importances": model.feature_importances_.tolist()}
+        return cls(feature, t.threshold, left, right, value,
+                   t.n_node_samples, model.classes_, meta)
+
+    def fingerprint(self):
+        """SHA-256 over the node arrays; changes whenever the fitted tree does."""
+        if self._fingerprint is None:
+            h = hashlib.sha256()
+            for arr in (self.feature, self.threshold, self.children_left,
+                        self.children_right, self.proba, self.n_node_samples, self.classes):
+                h.update(np.ascontiguousarray(arr).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def _depth(self):
+        depth = np.zeros(self.node_count, dtype=np.intp)
+        for node in range(self.node_count):
+            if not self.is_leaf[node]:
+                depth[self.children_left[node]]  = depth[node] + 1
+                depth[self.children_right[node]] = depth[node] + 1
+        return int(depth.max())
+
+    # ── Scoring ──────────────────────────────────────────────────
+    def validate(self, X):
+        """Return `X` as a 2-D float32 array, the dtype sklearn splits on."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(FEATURE_NAMES):
+            raise ValueError(f"expected {len(FEATURE_NAMES)} features "
+                             f"{FEATURE_NAMES}, got shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("input contains NaN or infinity")
+        return X
+
+    def apply(self, X, return_path=False):
+        """Leaf id per row and, optionally, the (n, max_depth+1) node path.
+
+        Path rows are padded with -1 after the leaf is reached.
+        """
+        X    = self.validate(X)
+        n    = X.shape[0]
+        rows = np.arange(n)
+        node = np.zeros(n, dtype=np.intp)
+        path = None
+        if return_path:
+            path = np.full((n, self.max_depth + 1), -1, dtype=np.int32)
+            path[:, 0] = 0
+        for d in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            nxt = np.where(go_left, self.children_left[node],
+                           self.children_right[node])
+            if return_path:
+                moved = nxt != node
+                path[moved, d + 1] = nxt[moved]
+            node = nxt
+        return node, path
+
+    @timed("tree_score")
+    def score(self, X, return_path=True):
+        leaf, path = self.apply(X, return_path=return_path)
+        proba = self.proba[leaf]
+        pred  = self.classes.take(np.argmax(proba, axis=1), axis=0)
+        return TreeScore(pred, proba, leaf, path)
+
+    def predict(self, X):
+        return self.score(X, return_path=False).pred
+
+    def predict_proba(self, X):
+        return self.score(X, return_path=False).proba
+
+
+def compile_model(model):
+    return CompiledTree.from_model(model)
+
+
+# ─────────────────────────────────────────────────────────────────
+# SELF-CHECK
+# ─────────────────────────────────────────────────────────────────
+def check_grid(tree, n_rows=200_000, seed=0):
+    """Sidebar-domain inputs concentrated on the tree's split boundaries.
+
+    Per feature: the domain ends plus every domain value adjacent to a
+    threshold used on that feature; rows are drawn from these sets.
+    """
+    rng  = np.random.default_rng(seed)
+    cols = []
+    for fidx, name in enumerate(FEATURE_NAMES):
+        dom  = FEATURE_DOMAINS[name].astype(np.float64)
+        used = ~tree.is_leaf & (tree.feature == fidx)
+        cand = {dom[0], dom[-1]}
+        for thr in tree.threshold[used]:
+            pos = np.searchsorted(dom, thr)
+            cand.update(dom[max(pos - 1, 0):pos + 2])
+        cand = np.array(sorted(cand))
+        cols.append(rng.choice(cand, size=n_rows))
+    return np.column_stack(cols)
+
+
+def split_thresholds(tree, fidx):
+    """Sorted unique thresholds the tree uses on feature `fidx`."""
+    return np.unique(tree.threshold[~tree.is_leaf & (tree.feature == fidx)])
+
+
+def exhaustive_grid(tree):
+    """Every combination of bin edges over the sidebar domains.
+
+    The thresholds on a feature cut its domain into bins whose values all
+    take the same branches, so the first and last domain value of every bin
+    stand in for the whole bin.  Checking the full product of these is an
+    exhaustive check over every input the sidebar can produce.
+    """
+    reps = []
+    for fidx, name in enumerate(FEATURE_NAMES):
+        dom  = np.sort(FEATURE_DOMAINS[name].astype(np.float64))
+        bins = np.searchsorted(split_thresholds(tree, fidx), dom.astype(np.float32))
+        edge = np.flatnonzero(np.diff(bins, prepend=-1, append=bins[-1] + 1))
+        keep = np.unique(np.concatenate([edge[:-1], edge[1:] - 1]))
+        reps.append(dom[keep])
+    mesh = np.meshgrid(*reps, indexing="ij")
+    return np.column_stack([m.ravel() for m in mesh])
+
+
+def verify(model, tree, X):
+    """Raise AssertionError if `tree` disagrees with sklearn anywhere on `X`."""
+    res = tree.score(X)
+    np.testing.assert_array_equal(res.pred, model.predict(X))
+    np.testing.assert_array_equal(res.proba, model.predict_proba(X))
+    np.testing.assert_array_equal(res.leaf, model.apply(X))
+    dp = model.decision_path(X).tocsr()
+    for i in range(0, X.shape[0], max(1, X.shape[0] // 1000)):
+        nodes = res.path[i][res.path[i] >= 0]
+        np.testing.assert_array_equal(nodes, dp.indices[dp.indptr[i]:dp.indptr[i + 1]])
+    return res
+
+
+def main(argv=None):
+    import argparse
+    import warnings
+    warnings.filterwarnings("ignore")
+    ap = argparse.ArgumentParser(description="Check the compiled tree against sklearn.")
+    ap.add_argument("--model", default=MODEL_PATH)
+    ap.add_argument("--rows", type=int, default=200_000)
+    args = ap.parse_args(argv)
+
+    model = load_model(args.model)
+    tree  = compile_model(model)
+    X     = check_grid(tree, args.rows)
+    try:
+        verify(model, tree, X)
+    except AssertionError as e:
+        print(f"MISMATCH on {len(X):,} rows:\n{e}")
+        return 1
+    print(f"OK  {len(X):,} rows · {tree.node_count} nodes · depth {tree.max_depth}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
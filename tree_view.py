@@ -0,0 +1,135 @@
+"""
+Client-side decision-tree renderer for the Tree Visualization tab.
+
+`tree_payload` serializes the compiled tree once into compact JSON:
+parallel arrays (feature, threshold, children, samples, class fractions)
+rather than one object per node.  The `tree_view` Streamlit component
+(tree_view_frontend/) lays it out in the browser as a zoomable, collapsible
+SVG and highlights the patient's path.  Across reruns only the path node
+ids change, so a new patient moves the highlight without the server
+rendering anything.
+
+Works from a .hdt artifact too: everything comes from the CompiledTree,
+not from the scikit-learn model.
+
+    python tree_view.py              # payload and draw time vs the plot_tree PNG
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from core import CLASS_NAMES, FEATURE_LABELS, MODEL_PATH
+from metrics import timed
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tree_view_frontend")
+
+_component = None
+
+
+@timed("tree_payload")
+def tree_payload(tree, digits=4):
+    """Compact JSON of `tree` for the component; leaves have left = right = -1."""
+    leaf = tree.is_leaf
+    payload = {
+        "fingerprint": tree.fingerprint()[:12],
+        "features":    FEATURE_LABELS,
+        "classes":     CLASS_NAMES,
+        "feature":     np.where(leaf, -1, tree.feature).tolist(),
+        "threshold":   np.where(leaf, 0.0, tree.threshold).round(digits).tolist(),
+        "left":        np.where(leaf, -1, tree.children_left).tolist(),
+        "right":       np.where(leaf, -1, tree.children_right).tolist(),
+        "samples":     tree.n_node_samples.tolist(),
+        "value":       tree.proba.round(digits).tolist(),
+    }
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def path_nodes(path):
+    """Node ids along a get_decision_path result, root first."""
+    return [int(step["node"]) for step in path]
+
+
+def tree_view(payload, path=(), depth=None, height=620, key="tree_view"):
+    """Draw `payload` (from tree_payload) with `path` highlighted.
+
+    `depth` folds every node at that depth on first draw (None shows all);
+    folds on the patient's path are always opened.
+    """
+    global _component
+    if _component is None:
+        import streamlit.components.v1 as components
+        _component = components.declare_component("tree_view", path=FRONTEND_DIR)
+    return _component(tree=payload, path=list(path), depth=depth, height=height,
+                      key=key, default=None)
+
+
+def main(argv=None):
+    import argparse
+    import gzip
+    import shutil
+    import subprocess
+    import tempfile
+    import time
+    import warnings
+    warnings.filterwarnings("ignore")
+    from model_artifact import load_any
+    from render_cache import render_tree
+    from rerun_memo import fit_width
+    ap = argparse.ArgumentParser(description="Compare the JSON tree payload with the "
+                                             "plot_tree PNG it replaces.")
+    ap.add_argument("--model", default=MODEL_PATH)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    model, tree = load_any(args.model)
+
+    def best(fn, repeat):
+        out, secs = None, float("inf")
+        for _ in range(repeat):
+            t0  = time.perf_counter()
+            out = fn()
+            secs = min(secs, time.perf_counter() - t0)
+        return out, secs
+
+    payload, json_s = best(lambda: tree_payload(tree), 200)
+    raw  = payload.encode()
+    rows = [("JSON payload (tree_view)", json_s, len(raw), len(gzip.compress(raw)))]
+
+    node = shutil.which("node")
+    draw = None
+    if node:
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            f.write(payload)
+        try:
+            out  = subprocess.run([node, os.path.join(FRONTEND_DIR, "tree_view.js"), f.name],
+                                  capture_output=True, text=True, check=True)
+            draw = json.loads(out.stdout)
+        finally:
+            os.unlink(f.name)
+
+    if model is not None:
+        png, png_s = best(lambda: render_tree(model, None), args.repeat)
+        sent, fit_s = best(lambda: fit_width(png), args.repeat)
+        rows.append(("plot_tree PNG, full depth", png_s + fit_s, len(sent),
+                     len(gzip.compress(sent))))
+        svg, svg_s = best(lambda: render_tree(model, None, "svg"), args.repeat)
+        rows.append(("plot_tree SVG, full depth", svg_s, len(svg), len(gzip.compress(svg))))
+
+    print(f"{'renderer':<28} {'server ms':>10} {'bytes':>10} {'gzip':>9}")
+    for name, secs, size, gz in rows:
+        print(f"{name:<28} {secs * 1e3:>10.2f} {size:>10,} {gz:>9,}")
+    if draw:
+        print(f"\nclient layout + SVG markup in node: {draw['draw_ms']:.2f} ms "
+              f"({draw['svg_bytes']:,} bytes of SVG built in the browser)")
+    else:
+        print("\nnode not found: client draw time not measured")
+    if model is not None:
+        print(f"time to first paint, server side: {rows[0][1] * 1e3:.2f} ms vs "
+              f"{rows[1][1] * 1e3:.0f} ms · payload {rows[1][2] / rows[0][2]:.0f}× smaller")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
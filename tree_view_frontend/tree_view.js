@@ -0,0 +1,262 @@
+// Client-side renderer for tree_view.py: lays out the compact tree JSON
+// and draws it as one SVG.  Zoom, pan, collapse and path highlighting all
+// happen here; the server only sends the JSON once and the path node ids.
+"use strict";
+
+const NODE_W = 148, NODE_H = 64, GAP_X = 18, GAP_Y = 46;
+const COLORS = ["#3498db", "#e67e22"];          // No Disease · Heart Disease
+
+function parseTree(json) {
+  const t = JSON.parse(json);
+  t.n = t.feature.length;
+  t.parent = new Array(t.n).fill(-1);
+  t.depth = new Array(t.n).fill(0);
+  for (let i = 0; i < t.n; i++) {
+    if (t.left[i] >= 0) {
+      t.parent[t.left[i]] = i;
+      t.parent[t.right[i]] = i;
+    }
+  }
+  for (let i = 0; i < t.n; i++) {               // parents precede children (sklearn order)
+    if (t.parent[i] >= 0) t.depth[i] = t.depth[t.parent[i]] + 1;
+  }
+  return t;
+}
+
+function isLeaf(t, i) { return t.left[i] < 0; }
+
+// Collapsed set for "expand to `depth`": every internal node at that depth.
+function collapseAtDepth(t, depth) {
+  const c = new Set();
+  if (depth === null || depth === undefined) return c;
+  for (let i = 0; i < t.n; i++) {
+    if (!isLeaf(t, i) && t.depth[i] >= depth) c.add(i);
+  }
+  return c;
+}
+
+// Collapse everything off the path: each path node keeps both children
+// visible, but the sibling subtrees stay folded.
+function collapseOffPath(t, path) {
+  const on = new Set(path), c = new Set();
+  for (let i = 0; i < t.n; i++) {
+    if (!isLeaf(t, i) && !on.has(i)) c.add(i);
+  }
+  return c;
+}
+
+// Tidy layout: visible leaves take consecutive slots left to right,
+// parents sit centred over their children.  O(n).
+function layout(t, collapsed) {
+  const x = new Array(t.n).fill(null), y = new Array(t.n).fill(null);
+  let slot = 0, maxDepth = 0;
+  const visit = (i) => {
+    y[i] = t.depth[i] * (NODE_H + GAP_Y);
+    maxDepth = Math.max(maxDepth, t.depth[i]);
+    if (isLeaf(t, i) || collapsed.has(i)) {
+      x[i] = slot++ * (NODE_W + GAP_X);
+      return;
+    }
+    visit(t.left[i]);
+    visit(t.right[i]);
+    x[i] = (x[t.left[i]] + x[t.right[i]]) / 2;
+  };
+  visit(0);
+  return {x, y, width: Math.max(slot, 1) * (NODE_W + GAP_X) - GAP_X,
+          height: (maxDepth + 1) * (NODE_H + GAP_Y) - GAP_Y};
+}
+
+function subtreeSize(t, i) {
+  return isLeaf(t, i) ? 1 : 1 + subtreeSize(t, t.left[i]) + subtreeSize(t, t.right[i]);
+}
+
+function esc(s) {
+  return String(s).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+}
+
+function fmt(v) { return Number.isInteger(v) ? String(v) : String(+v.toFixed(2)); }
+
+// Same shading rule as sklearn's plot_tree: alpha grows with purity.
+function fill(p) {
+  const k = p.indexOf(Math.max(...p));
+  const sorted = [...p].sort((a, b) => b - a);
+  const alpha = sorted[0] === 1 ? 1 : (sorted[0] - sorted[1]) / (1 - sorted[1]);
+  return {color: COLORS[k] || "#888", alpha: 0.15 + 0.75 * alpha, cls: k};
+}
+
+// SVG markup for the visible tree; highlight classes are toggled later
+// without rebuilding it.
+function svgMarkup(t, lay, collapsed) {
+  const out = [];
+  for (let i = 0; i < t.n; i++) {
+    if (lay.x[i] === null || t.parent[i] < 0) continue;
+    const p = t.parent[i];
+    const x1 = lay.x[p] + NODE_W / 2, y1 = lay.y[p] + NODE_H;
+    const x2 = lay.x[i] + NODE_W / 2, y2 = lay.y[i];
+    const my = (y1 + y2) / 2;
+    out.push(`<path class="edge" data-node="${i}" d="M${x1},${y1} C${x1},${my} ${x2},${my} ${x2},${y2}"/>`);
+  }
+  for (let i = 0; i < t.n; i++) {
+    if (lay.x[i] === null) continue;
+    const f = fill(t.value[i]);
+    const leaf = isLeaf(t, i), folded = collapsed.has(i);
+    const gini = 1 - t.value[i].reduce((s, v) => s + v * v, 0);
+    const lines = leaf ? [] : [`${esc(t.features[t.feature[i]])} ≤ ${fmt(t.threshold[i])}`];
+    lines.push(`gini ${gini.toFixed(3)} · n ${t.samples[i]}`);
+    lines.push(`${esc(t.classes[f.cls])} ${(t.value[i][f.cls] * 100).toFixed(0)}%`);
+    const ty = NODE_H / 2 - (lines.length - 1) * 7.5 + 4;
+    out.push(`<g class="node${leaf ? " leaf" : ""}${folded ? " folded" : ""}" data-node="${i}" ` +
+             `transform="translate(${lay.x[i]},${lay.y[i]})">` +
+             `<title>node ${i}${folded ? ` · ${subtreeSize(t, i) - 1} hidden` : ""}</title>` +
+             `<rect width="${NODE_W}" height="${NODE_H}" rx="8" fill="${f.color}" ` +
+             `fill-opacity="${f.alpha.toFixed(2)}"/>` +
+             lines.map((s, k) => `<text x="${NODE_W / 2}" y="${ty + k * 15}"` +
+                       `${k === 0 && !leaf ? ' class="split"' : ""}>${s}</text>`).join("") +
+             (folded ? `<text class="badge" x="${NODE_W - 8}" y="${NODE_H - 6}">+${subtreeSize(t, i) - 1}</text>` : "") +
+             `</g>`);
+  }
+  return out.join("");
+}
+
+if (typeof module !== "undefined") {
+  module.exports = {parseTree, layout, svgMarkup, collapseAtDepth, collapseOffPath, fill};
+  // `node tree_view.js payload.json`: time parse + layout + markup, as tree_view.py reports.
+  if (require.main === module) {
+    const json = require("fs").readFileSync(process.argv[2], "utf8");
+    const runs = 200;
+    let best = Infinity, markup = "";
+    for (let r = 0; r < runs; r++) {
+      const t0 = process.hrtime.bigint();
+      const t = parseTree(json);
+      const c = new Set();
+      markup = svgMarkup(t, layout(t, c), c);
+      best = Math.min(best, Number(process.hrtime.bigint() - t0) / 1e6);
+    }
+    console.log(JSON.stringify({draw_ms: best, svg_bytes: Buffer.byteLength(markup)}));
+  }
+}
+
+// ── Browser / Streamlit component ───────────────────────────────────
+if (typeof window !== "undefined") {
+  const state = {json: null, t: null, collapsed: new Set(), path: [], depth: null,
+                 view: null, lay: null};
+  const svg = document.getElementById("tree");
+  const info = document.getElementById("info");
+
+  const send = (type, data) =>
+    window.parent.postMessage(Object.assign({isStreamlitMessage: true, type}, data), "*");
+
+  const setView = (v) => {
+    state.view = v;
+    svg.setAttribute("viewBox", `${v.x} ${v.y} ${v.w} ${v.h}`);
+  };
+
+  const fit = () => {
+    const pad = 20, lay = state.lay;
+    setView({x: -pad, y: -pad, w: lay.width + 2 * pad, h: lay.height + 2 * pad});
+  };
+
+  const highlight = () => {
+    const on = new Set(state.path);
+    svg.classList.toggle("has-path", on.size > 0);
+    svg.querySelectorAll("[data-node]").forEach((el) => {
+      el.classList.toggle("on-path", on.has(+el.dataset.node));
+    });
+  };
+
+  const draw = (refit) => {
+    const t0 = performance.now();
+    state.lay = layout(state.t, state.collapsed);
+    svg.innerHTML = svgMarkup(state.t, state.lay, state.collapsed);
+    highlight();
+    if (refit || !state.view) fit();
+    const shown = state.lay.x.filter((v) => v !== null).length;
+    info.textContent = `${shown} of ${state.t.n} nodes · drawn in ` +
+                       `${(performance.now() - t0).toFixed(1)} ms · click a node to fold it`;
+  };
+
+  // Folds on the patient's path are opened so the whole path stays visible.
+  const unfoldPath = () => {
+    let opened = false;
+    state.path.forEach((i) => { opened = state.collapsed.delete(i) || opened; });
+    return opened;
+  };
+
+  const onRender = (args) => {
+    state.path = args.path || [];
+    if (args.tree !== state.json) {               // new model: parse and lay out once
+      state.json = args.tree;
+      state.t = parseTree(args.tree);
+      state.depth = args.depth;
+      state.collapsed = collapseAtDepth(state.t, args.depth);
+      unfoldPath();
+      draw(true);
+    } else if (args.depth !== state.depth) {
+      state.depth = args.depth;
+      state.collapsed = collapseAtDepth(state.t, args.depth);
+      unfoldPath();
+      draw(true);
+    } else if (unfoldPath()) {
+      draw(false);
+    } else {                                      // same tree: only the highlight moves
+      highlight();
+    }
+    send("streamlit:setFrameHeight", {height: args.height});
+  };
+
+  window.addEventListener("message", (e) => {
+    if (e.data && e.data.type === "streamlit:render") onRender(e.data.args);
+  });
+
+  // Fold / unfold on click (ignored at the end of a drag).
+  let drag = null;
+  svg.addEventListener("click", (e) => {
+    if (drag && drag.moved) return;
+    const g = e.target.closest("g.node");
+    if (!g || g.classList.contains("leaf")) return;
+    const i = +g.dataset.node;
+    if (state.collapsed.has(i)) state.collapsed.delete(i); else state.collapsed.add(i);
+    draw(false);
+  });
+
+  // Pan by dragging, zoom with the wheel around the cursor.
+  const toTree = (e) => {
+    const r = svg.getBoundingClientRect(), v = state.view;
+    const s = Math.max(v.w / r.width, v.h / r.height);
+    return {s, x: v.x + (e.clientX - r.left - (r.width - v.w / s) / 2) * s,
+            y: v.y + (e.clientY - r.top - (r.height - v.h / s) / 2) * s};
+  };
+  svg.addEventListener("pointerdown", (e) => {
+    drag = {x: e.clientX, y: e.clientY, view: {...state.view}, moved: false};
+  });
+  window.addEventListener("pointermove", (e) => {
+    if (!drag || e.buttons === 0) return;
+    const r = svg.getBoundingClientRect();
+    const s = Math.max(drag.view.w / r.width, drag.view.h / r.height);
+    const dx = (e.clientX - drag.x) * s, dy = (e.clientY - drag.y) * s;
+    if (Math.abs(dx) + Math.abs(dy) > 3 * s) drag.moved = true;
+    setView({...drag.view, x: drag.view.x - dx, y: drag.view.y - dy});
+  });
+  window.addEventListener("pointerup", () => setTimeout(() => { drag = null; }, 0));
+  const zoom = (factor, at) => {
+    const v = state.view;
+    const cx = at ? at.x : v.x + v.w / 2, cy = at ? at.y : v.y + v.h / 2;
+    setView({x: cx - (cx - v.x) * factor, y: cy - (cy - v.y) * factor,
+             w: v.w * factor, h: v.h * factor});
+  };
+  svg.addEventListener("wheel", (e) => {
+    e.preventDefault();
+    zoom(e.deltaY > 0 ? 1.15 : 1 / 1.15, toTree(e));
+  }, {passive: false});
+
+  document.getElementById("zoom-in").onclick = () => zoom(1 / 1.3);
+  document.getElementById("zoom-out").onclick = () => zoom(1.3);
+  document.getElementById("fit").onclick = fit;
+  document.getElementById("expand").onclick = () => { state.collapsed = new Set(); draw(true); };
+  document.getElementById("path-only").onclick = () => {
+    state.collapsed = collapseOffPath(state.t, state.path);
+    draw(true);
+  };
+
+  send("streamlit:componentReady", {apiVersion: 1});
+}